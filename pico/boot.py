@@ -1,4 +1,9 @@
 import usb_cdc
+import storage
+
+CONFIG_WRITABLE = False  # Let code.py save settings (lib/config.py); the drive turns read-only over USB
 
 usb_cdc.enable(console=True, data=True)
+if CONFIG_WRITABLE:
+    storage.remount("/", readonly=False)
 # Write your code here :-)
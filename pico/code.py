@@ -1,15 +1,49 @@
 # main.py
 
-from lib.solar_simulator import SolarSimulator
+from time import monotonic_ns
+BOOT_NS = monotonic_ns()  # Before the other imports, for the boot timeline
+
+from lib.boot_timeline import boot_timeline
+from lib.solar_simulator import SolarSimulator, HeadConfig
 from lib.app import SolarSimulatorApp
+from lib.profiler import profiler
+from lib.gc_monitor import gc_monitor
+from lib.config import load_config
+from lib.hardware import board, SIMULATED
+
+PROFILE = False  # Time setLEDs, thermistor reads, status and serial parsing; type 'p' to dump
+GC_REPORT_TICKS = 0  # Print allocation and gc collections every N loop ticks, 0 disables
+BOOT_TIMELINE = False  # Print milliseconds per boot phase, up to the first setpoint a mode applies
+# One HeadConfig per light head, e.g. [HeadConfig(), HeadConfig(mcp_address=0x61, ads_address=0x49,
+# halogen_pin=board.GP21)]; None drives a single head at the default addresses
+HEADS = None
+I2C_FREQUENCY = 100000  # I2C clock in Hz: 100000, 400000 or 1000000
+THERMAL_ALERT_PIN = None  # GPIO wired to the ADS1015 ALERT/RDY pin (e.g. board.GP22), None disables
 
 def main():
+    if SIMULATED:
+        from lib.sim_hardware import install_stdin
+        install_stdin()  # Console reads straight from the terminal, see sim_hardware.py
+    boot_timeline.enabled = BOOT_TIMELINE
+    boot_timeline.start(BOOT_NS)
+    boot_timeline.mark("imports")
+    profiler.enabled = PROFILE
+    gc_monitor.every = GC_REPORT_TICKS
+    # Saved settings and calibration (lib/config.py), the defaults if nothing was saved
+    config = load_config()
+    boot_timeline.mark("config")
     # Initialize SolarSimulator
-    sim = SolarSimulator(verbose=0)
+    sim = SolarSimulator(verbose=0, pwm_freq=config.pwm_freq, heads=HEADS, i2c_frequency=I2C_FREQUENCY)
+    config.apply(sim)
     sim.setLEDs(0, 0, 0, 0, 0)  # Ensure all LEDs are turned off initially
+    if THERMAL_ALERT_PIN is not None:
+        sim.enableThermalAlert(THERMAL_ALERT_PIN)
+    boot_timeline.mark("bus init")
 
-    # Run the application
-    app = SolarSimulatorApp(sim)
+    # Run the application, the selected (or boot) mode is only imported now
+    app = SolarSimulatorApp(sim, config)
+    boot_timeline.mark("app")
+    boot_timeline.wait_for_setpoint()
     app.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+# Desktop over-temperature alert demo
+# Overheats the simulated LED thermistor at a random point in the output loop and measures the
+# time from the fault to the halogen PWM going dark, with the ADS1015 comparator alert
+# (lib/thermal_alert.py) and with the polled safety check alone
+# Usage: python host-demos/alert_sim.py --trials 20 --rate 50 --safety-rate 20
+
+# Import dependencies
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.safety import SafetyMonitor
+from lib.hardware import board
+
+parser = argparse.ArgumentParser(description='Measure fault-to-blank latency with and without the comparator alert')
+parser.add_argument('-n', '--trials', type=int, help='faults to inject per configuration', default=20)
+parser.add_argument('-r', '--rate', type=float, help='setLEDs() calls per second', default=50)
+parser.add_argument('-s', '--safety-rate', type=float, help='safety checks per second', default=20)
+parser.add_argument('-t', '--temperature', type=float, help='fault temperature in C', default=120)
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0)
+sim.i2c.realtime = False
+period = 1 / args.rate
+
+
+# Returns the fault-to-blank latency of each trial in milliseconds
+def measure(alert):
+    if alert:
+        sim.enableThermalAlert(board.GP22, channels=(0,))
+    safety = SafetyMonitor(sim, rate=args.safety_rate)
+    latencies = []
+    for _ in range(args.trials):
+        sim.ads.set_temperature(0, 25)
+        safety.check()  # Resumes from the previous trial's shutdown
+        sim.setLEDs(1000, 1000, 1000, 0, 20000)
+        next_ns = time.monotonic_ns() + int(period * 1e9)
+        time.sleep(random.uniform(0, period))  # The fault lands anywhere in the loop period
+        sim.ads.set_temperature(0, args.temperature)
+        fault_ns = time.monotonic_ns()
+        while sim.therm_safe:
+            # The rest of the period is spent waiting, as the modes' schedulers do
+            while sim.therm_safe and time.monotonic_ns() < next_ns:
+                safety.service()
+                time.sleep(0.001)
+            sim.setLEDs(1000, 1000, 1000, 0, 20000)
+            next_ns += int(period * 1e9)
+        blank_ns = next(t for t, duty in sim.hal.log if t >= fault_ns and duty == 0)
+        latencies.append((blank_ns - fault_ns) / 1e6)
+    if alert:
+        print(f"  {sim.thermal_alert.report()}")
+        sim.thermal_alert.deinit()
+        sim.thermal_alert = None
+    return latencies
+
+
+print(f"Fault at {args.temperature}C, setLEDs at {args.rate}Hz, safety check at {args.safety_rate}Hz")
+for name, alert in (("polled", False), ("alert", True)):
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        latencies = measure(alert)
+    for line in log.getvalue().splitlines():
+        if line.startswith("  "):
+            print(line)
+    latencies.sort()
+    print(f"{name:>7}: median {latencies[len(latencies) // 2]:.2f}ms, worst {latencies[-1]:.2f}ms fault to blank")
@@ -0,0 +1,48 @@
+# Desktop tick-rate benchmark
+# Runs the Pico control code against the simulated hardware (lib/sim_hardware.py) and reports
+# how many light/thermal ticks per second it sustains, how much I2C bus time they use and how
+# many setpoint bursts the per-tick bus budget deferred
+# Usage: python host-demos/bench_sim.py --ticks 2000 --frequency 400000
+
+# Import dependencies
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.utils import get_intensity_table, check_temperature
+
+parser = argparse.ArgumentParser(description='Benchmark the solar simulator control loop on simulated hardware')
+parser.add_argument('-t', '--ticks', type=int, help='light ticks to run', default=2000)
+parser.add_argument('-f', '--frequency', type=int, help='simulated I2C clock in Hz', default=100000)
+parser.add_argument('-b', '--budget', type=float, help='fraction of each 10ms bus tick for transactions', default=0.8)
+parser.add_argument('-e', '--thermal-every', type=int, help='run a thermal check every N ticks', default=5)
+parser.add_argument('--no-realtime', help='do not wait for modeled bus time', action='store_true')
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0, i2c_frequency=args.frequency, bus_budget=args.budget)
+sim.i2c.realtime = not args.no_realtime
+table = get_intensity_table()
+
+start = time.monotonic_ns()
+bus_start = sim.i2c.busy_ns
+for tick in range(args.ticks):
+    # Ramp up and down so every tick changes the setpoints
+    fraction = 1 - abs(2 * tick / args.ticks - 1)
+    violet, white, cyan, uv, halogen = table.levels_for(fraction)
+    sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
+    if tick % args.thermal_every == 0:
+        sim.getThermals(force=True)
+        check_temperature(sim)
+elapsed = time.monotonic_ns() - start
+bus = sim.i2c.busy_ns - bus_start
+
+print(f"{args.ticks} ticks in {elapsed / 1e9:.3f}s -> {args.ticks / (elapsed / 1e9):.0f} ticks/s")
+print(f"I2C at {args.frequency // 1000}kHz: {sim.i2c.transactions} transactions, "
+      f"{bus / 1e6:.1f}ms modeled bus time ({100 * bus / elapsed:.0f}% of wall time), "
+      f"{sim.ads.conversions} ADC conversions")
+print(f"DAC writes logged: {len([entry for entry in sim.i2c.log if entry[1] == 0x60])}, "
+      f"last DAC codes: {sim.mcp.codes}, halogen duty: {sim.hal.duty_cycle}")
+print(sim.busReport())
@@ -0,0 +1,29 @@
+# Basilisk output converter
+# Packs a Basilisk `out.json` ({"0": [...], "1": [...], ...}, one list per face) into the
+# binary trajectory format read by lib/trajectory.py on the Pico
+# Usage: python host-demos/convert_trajectory.py out.json out.traj --period 0.1
+
+# Import dependencies
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.trajectory import write_trajectory, SAMPLE_UINT8, SAMPLE_UINT16
+
+parser = argparse.ArgumentParser(description='Convert Basilisk JSON output to a binary trajectory')
+parser.add_argument('input', type=str, help='Basilisk JSON file')
+parser.add_argument('output', type=str, help='trajectory file to write')
+parser.add_argument('-p', '--period', type=float, help='seconds between samples', default=0.1)
+parser.add_argument('-w', '--wide', help='store 16-bit samples instead of 8-bit', action='store_true')
+args = parser.parse_args()
+
+with open(args.input, 'r') as jsonfile:
+    bsk_dict = json.load(jsonfile)
+
+# One channel per face, in key order
+faces = [bsk_dict[key] for key in sorted(bsk_dict, key=int)]
+frames = list(zip(*faces))
+write_trajectory(args.output, frames, args.period, SAMPLE_UINT16 if args.wide else SAMPLE_UINT8)
+print(f"Wrote {len(frames)} frames x {len(faces)} channels to {args.output}")
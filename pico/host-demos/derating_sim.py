@@ -0,0 +1,60 @@
+# Desktop predictive derating demo
+# Heats a simulated LED thermistor with a first-order model driven by the applied light output
+# and runs utils.check_temperature() on simulated time, to show the derating holding the LEDs
+# under their shutdown temperature where the hard cutoff alone would shut the lights off
+# Usage: python host-demos/derating_sim.py --minutes 30 --rise 110 --tau 120
+
+# Import dependencies
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.utils import get_intensity_table, check_temperature
+
+parser = argparse.ArgumentParser(description='Simulate predictive thermal derating')
+parser.add_argument('-m', '--minutes', type=float, help='simulated minutes to run', default=30)
+parser.add_argument('-r', '--rise', type=float, help='LED temperature rise in C at full drive', default=110)
+parser.add_argument('-t', '--tau', type=float, help='LED thermal time constant in seconds', default=120)
+parser.add_argument('-a', '--ambient', type=float, help='ambient temperature in C', default=25)
+parser.add_argument('-i', '--intensity', type=float, help='commanded intensity fraction', default=1.0)
+parser.add_argument('--no-derating', help='rely on the hard cutoff only', action='store_true')
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0)
+sim.i2c.realtime = False
+sim.derating.enabled = not args.no_derating
+table = get_intensity_table()
+sim.setLEDs(*table.levels_for(args.intensity))
+# The commanded drive at full table intensity is below 1, so scale the rise to reach `rise` there
+full = table.levels_at(table.levels - 1)
+full_drive = sum(full) / (5 * 65535)
+
+dt = 0.05  # Thermal checks at 20Hz like the modes
+temp = args.ambient
+clock = {'now': 1}
+sim.derating.clock = lambda: clock['now']  # Run the derating engine on simulated time
+off_seconds = 0.0
+peak = temp
+light_seconds = 0.0
+for step in range(int(args.minutes * 60 / dt)):
+    settled = args.ambient + args.rise * sim.appliedDrive() / full_drive
+    temp += (settled - temp) * dt / args.tau
+    peak = max(peak, temp)
+    sim.ads.set_temperature(0, temp)
+    sim.getThermals(force=True)
+    check_temperature(sim)
+    if not sim.therm_safe:
+        off_seconds += dt
+    if sim.commandedDrive():
+        light_seconds += dt * sim.appliedDrive() / sim.commandedDrive()
+    clock['now'] += int(dt * 1e9)
+    if step % int(60 / dt) == 0:
+        print(f"t={step * dt / 60:4.0f}min LED {temp:6.1f}C scale {sim.derating.scale:.2f}"
+              f"{' SHUTDOWN' if not sim.therm_safe else ''}")
+
+total = args.minutes * 60
+print(f"Peak LED temperature {peak:.1f}C (shutdown at {sim.therm_led_shutdown}C), "
+      f"lights off for {off_seconds:.0f}s of {total:.0f}s, "
+      f"mean output {100 * light_seconds / total:.0f}% of commanded")
@@ -0,0 +1,51 @@
+# Desktop halogen driver demo
+# Compares the light of a modeled filament (output ~ duty cycle ** gamma) from a linear duty
+# cycle and from the halogen curve, then steps the simulated halogen from off to full and
+# reports how the slew limit spreads the step and where the PWM frequency changes band
+# Usage: python host-demos/halogen_sim.py --lamp-gamma 2.0 --slew 5
+
+# Import dependencies
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.halogen import HalogenCurve, LAMP_GAMMA
+
+parser = argparse.ArgumentParser(description='Show the halogen correction curve, slew limit and PWM bands')
+parser.add_argument('-g', '--lamp-gamma', type=float, help='exponent of the modeled lamp, output ~ duty ** gamma', default=LAMP_GAMMA)
+parser.add_argument('-s', '--slew', type=float, help='slew limit in full scales per second', default=5.0)
+parser.add_argument('-r', '--rate', type=float, help='ramp service calls per second', default=100)
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0)
+sim.i2c.realtime = False
+sim.setHalogenCurve(HalogenCurve(gamma=args.lamp_gamma))
+curve = sim.halogen_curve
+print(f"{'setpoint':>8} {'linear light':>13} {'corrected light':>16} {'duty':>6}")
+for percent in (1, 5, 10, 25, 50, 75, 100):
+    setpoint = percent * 65535 // 100
+    duty = curve.duty(setpoint)
+    print(f"{percent:>7}% {100 * (setpoint / 65535) ** args.lamp_gamma:>12.2f}% "
+          f"{100 * (duty / 65535) ** args.lamp_gamma:>15.2f}% {duty:>6}")
+
+halogen = sim.heads[0].halogen
+halogen.slew = args.slew
+clock = {'now': 1}
+halogen.clock = lambda: clock['now']  # Ramp on simulated time
+sim.setLEDs(h=65535)
+step = int(1e9 / args.rate)
+ticks = 0
+bands = []
+while halogen.ramping:
+    clock['now'] += step
+    sim.serviceHalogen()
+    ticks += 1
+    if not bands or bands[-1][1] != sim.hal.frequency:
+        bands.append((ticks * step / 1e6, sim.hal.frequency))
+print(f"Off to full in {ticks * step / 1e6:.0f}ms ({ticks} steps at {args.rate:.0f}Hz), "
+      f"largest step {max(b - a for (_, a), (_, b) in zip(sim.hal.log, sim.hal.log[1:]))} counts")
+print("PWM frequency: " + ", ".join(f"{freq}Hz from {ms:.0f}ms" for ms, freq in bands))
+sim.setLEDs(h=65535 // 2)
+print(f"Down to half at once: duty {sim.hal.duty_cycle}")
@@ -0,0 +1,85 @@
+# Desktop closed-loop irradiance demo
+# Runs the irradiance controller against the simulated hardware (lib/sim_hardware.py) with a
+# photodiode model whose LED efficiency drops as the LEDs heat up, and reports how quickly the
+# loop reaches and holds the target compared with the open-loop intensity table
+# Usage: python host-demos/irradiance_sim.py --target 0.8 --seconds 60 --droop 0.25
+
+# Import dependencies
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.controller import PIDController
+from lib.utils import get_intensity_table
+from lib.halogen import HalogenCurve, LAMP_GAMMA
+
+parser = argparse.ArgumentParser(description='Simulate the closed-loop irradiance controller')
+parser.add_argument('-t', '--target', type=float, help='target irradiance in suns', default=0.8)
+parser.add_argument('-s', '--seconds', type=float, help='simulated seconds to run', default=60)
+parser.add_argument('-r', '--rate', type=float, help='controller updates per second', default=50)
+parser.add_argument('-d', '--droop', type=float, help='fraction of LED output lost when fully warm', default=0.25)
+parser.add_argument('--full', type=float, help='irradiance in suns at full intensity with cold LEDs', default=1.2)
+parser.add_argument('--tau', type=float, help='LED warm-up time constant in seconds', default=20)
+parser.add_argument('--kp', type=float, default=0.2)
+parser.add_argument('--ki', type=float, default=1.0)
+parser.add_argument('--max-rate', type=float, help='largest output change per second', default=0.5)
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0)
+sim.i2c.realtime = False
+table = get_intensity_table()
+dt = 1 / args.rate
+state = {'heat': 0.0, 'now': 1}  # 0 = cold LEDs, 1 = fully warm
+for head in sim.heads:
+    head.halogen.clock = lambda: state['now']  # Ramp the halogen on simulated time
+sim.setHalogenCurve(HalogenCurve(gamma=LAMP_GAMMA))  # Matches the lamp model below
+
+
+# Photodiode output before scaling, from the DAC codes and halogen duty; LED output droops as they warm up
+def raw_light(codes, duty, heat):
+    leds = sum(codes[:3]) / (3 * 4095)
+    halogen = (duty / 65535) ** 2  # Filament light ~ power^2, which the halogen curve corrects
+    return 0.8 * leds * (1 - args.droop * heat) + 0.4 * halogen
+
+
+full = table.levels_at(table.levels - 1)
+full_raw = raw_light([code >> 4 for code in full[:4]], full[4], 0.0)
+
+
+def photodiode():
+    light = raw_light(sim.mcp.codes, sim.hal.duty_cycle, state['heat'])
+    return sim.photodiode_volts_per_sun * args.full * light / full_raw
+
+
+sim.ads.set_source(3, photodiode)
+
+
+# Returns the last time the reading was outside 2% of the target (None if it never got in) and the final reading
+def simulate(closed_loop):
+    state['heat'] = 0.0
+    controller = PIDController(args.kp, args.ki, out_min=0.0, out_max=1.0, max_rate=args.max_rate)
+    outside = 0.0
+    # Open loop: the table fraction that gives the target with cold LEDs
+    fraction = min(1.0, args.target / args.full)
+    for step in range(int(args.seconds * args.rate)):
+        t = step * dt
+        measured = sim.readIrradiance()
+        if closed_loop:
+            fraction = controller.update(args.target, measured, dt)
+        sim.setLEDs(*table.levels_for(fraction))
+        state['now'] += int(dt * 1e9)
+        sim.serviceHalogen()
+        state['heat'] += (fraction - state['heat']) * dt / args.tau
+        if abs(measured - args.target) > 0.02 * args.target:
+            outside = t
+    settled = None if outside >= t else outside
+    return settled, measured
+
+
+print(f"Target {args.target} suns, LED output droops {100 * args.droop:.0f}% when warm (tau {args.tau}s)")
+for name, closed_loop in (("open loop", False), ("closed loop", True)):
+    settled, final = simulate(closed_loop)
+    settle_text = f"within 2% from {settled:.2f}s on" if settled is not None else "not within 2% at the end"
+    print(f"{name:>11}: {settle_text}, final {final:.3f} suns")
@@ -0,0 +1,43 @@
+# Measurement Mode dump receiver
+# Waits for a dump on the Pico's usb_cdc data port (type 'dump' in Measurement Mode), checks it
+# and writes one CSV row per sample with the setpoints it was taken under
+# Usage: python host-demos/measurement_dump.py /dev/ttyACM1 capture.csv
+
+# Import dependencies
+import argparse
+import csv
+import os
+import struct
+import sys
+import serial as ser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.measurement_format import DUMP_MAGIC, DUMP_HEADER, SETPOINT_RECORD, decode_dump, rise_time
+
+parser = argparse.ArgumentParser(description='Receive a Measurement Mode dump and write it as CSV')
+parser.add_argument('port', type=str, help='data serial port of the Pico (the second CDC device)')
+parser.add_argument('output', type=str, help='CSV file to write')
+args = parser.parse_args()
+
+port = ser.Serial(args.port)
+print("Waiting for a dump, type 'dump' on the Pico console")
+# Find the magic, then read the rest of the header to learn the dump's length
+data = bytearray()
+while not data.endswith(DUMP_MAGIC):
+    data += port.read(1)
+data = bytearray(DUMP_MAGIC) + port.read(struct.calcsize(DUMP_HEADER) - len(DUMP_MAGIC))
+_, _, _, count, setpoint_count, _, _ = struct.unpack(DUMP_HEADER, data)
+data += port.read(setpoint_count * struct.calcsize(SETPOINT_RECORD) + count * 8 + 4)
+port.close()
+
+info, setpoints, samples = decode_dump(bytes(data))
+with open(args.output, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(['t_us', 'channel', 'code', 'volts', 'violet', 'white', 'cyan', 'uv', 'halogen'])
+    for t, channel, code, tag in samples:
+        writer.writerow([t, channel, code, f"{code * info['volts_per_code']:.4f}", *setpoints[tag][1]])
+print(f"{len(samples)} samples at {info['data_rate']} samples/s, {len(setpoints)} setpoints -> {args.output}")
+for tag in range(1, len(setpoints)):
+    measured = rise_time(samples, tag)
+    if measured is not None:
+        print(f"setpoints {setpoints[tag][1]}: photodiode 10-90% in {measured / 1000:.2f}ms")
@@ -0,0 +1,73 @@
+# Desktop Measurement Mode demo
+# Records the simulated photodiode at the ADS1015's continuous rate while the violet LEDs step
+# up, dumps the ring as Measurement Mode does, decodes it and compares the measured 10-90% rise
+# time with the modeled LED time constant (10-90% of a first-order rise is 2.2 tau)
+# Usage: python host-demos/measurement_sim.py --tau 0.005 --frequency 400000
+
+# Import dependencies
+import argparse
+import io
+import math
+import os
+import sys
+from time import monotonic, monotonic_ns
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator
+from lib.measurement import MeasurementRecorder
+from lib.measurement_format import decode_dump, rise_time
+
+parser = argparse.ArgumentParser(description='Measure a simulated LED rise time with the measurement recorder')
+parser.add_argument('-t', '--tau', type=float, help='LED output time constant in seconds', default=0.005)
+parser.add_argument('-f', '--frequency', type=int, help='simulated I2C clock in Hz', default=400000)
+parser.add_argument('-r', '--rate', type=int, help='ADS1015 data rate', default=3300)
+parser.add_argument('-n', '--samples', type=int, help='ring length', default=2048)
+parser.add_argument('-l', '--level', type=float, help='violet step as a fraction of full scale', default=0.5)
+args = parser.parse_args()
+
+sim = SolarSimulator(verbose=0, i2c_frequency=args.frequency)
+state = {'from': 0.0, 'to': 0.0, 'at': 0.0}
+
+
+# Photodiode volts: a first-order response to the violet DAC code
+def photodiode():
+    target = sim.mcp.codes[0] / 4095
+    now = monotonic()
+    if target != state['to']:
+        state['from'] = output(now)
+        state['to'] = target
+        state['at'] = now
+    return 2.0 * output(now)
+
+
+def output(now):
+    return state['to'] + (state['from'] - state['to']) * math.exp(-(now - state['at']) / args.tau)
+
+
+sim.ads.set_source(3, photodiode)
+recorder = MeasurementRecorder(sim, capacity=args.samples, data_rate=args.rate, post_trigger=0.5)
+recorder.arm()
+stepped = False
+while not recorder.frozen:
+    now = monotonic_ns()
+    recorder.service(now)
+    if not stepped and recorder.count >= args.samples // 2:
+        level = int(args.level * 65535)
+        sim.setLEDs(v=level, w=0, c=0, uv=0, h=0)
+        recorder.mark_setpoint(level, 0, 0, 0, 0)
+        stepped = True
+
+dump = io.BytesIO()
+size = recorder.dump(dump)
+info, setpoints, samples = decode_dump(dump.getvalue())
+photodiode_times = [s[0] for s in samples if s[1] == 3]
+span = ((photodiode_times[-1] - photodiode_times[0]) & 0xFFFFFFFF) / 1e6
+print(f"{len(samples)} samples in {span * 1000:.0f}ms ({(len(samples) - 1) / span:.0f} samples/s, "
+      f"{recorder.missed} missed), dump {size} bytes")
+measured = rise_time(samples, 1)
+if measured is None:
+    print("The recording does not cover the step")
+else:
+    print(f"10-90% rise: measured {measured / 1000:.2f}ms, modeled {2.2 * args.tau * 1000:.2f}ms "
+          f"(sample period {1000 / info['data_rate']:.2f}ms)")
+print(f"ADC reads took {recorder.bus_ns / 1e6:.1f}ms of the {span * 1000:.0f}ms")
@@ -0,0 +1,60 @@
+# Desktop multi-head demo
+# Drives several simulated light heads, split over two I2C buses, with a different intensity
+# per face, and measures the spread between the first and last face's DAC write in each tick
+# when every head is refreshed in one batch and when each head is refreshed on its own
+# Usage: python host-demos/multihead_sim.py --heads 4 --ticks 500 --frequency 400000
+
+# Import dependencies
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.solar_simulator import SolarSimulator, HeadConfig, I2C_PINS
+from lib.hardware import board
+from lib.utils import get_intensity_table, check_temperature
+
+parser = argparse.ArgumentParser(description='Measure inter-face timing with several light heads')
+parser.add_argument('-n', '--heads', type=int, help='light heads, 1 to 4', default=4)
+parser.add_argument('-t', '--ticks', type=int, help='setpoint updates to send', default=500)
+parser.add_argument('-f', '--frequency', type=int, help='I2C clock in Hz', default=400000)
+args = parser.parse_args()
+
+# Heads alternate between I2C1 (GP27/GP26) and I2C0 (GP5/GP4), each with its own halogen pin
+halogen_pins = (board.GP28, board.GP21, board.GP20, board.GP19)
+heads = [HeadConfig(mcp_address=0x60 + i // 2, ads_address=0x48 + i // 2, halogen_pin=halogen_pins[i], bus=i % 2)
+         for i in range(args.heads)]
+sim = SolarSimulator(verbose=0, heads=heads, i2c_pins=I2C_PINS + ((board.GP5, board.GP4),),
+                     i2c_frequency=args.frequency, bus_budget=1.0)
+table = get_intensity_table()
+
+
+# Returns the mean and worst spread in microseconds between the first and last DAC write of a tick
+def measure(batched):
+    spreads = []
+    for tick in range(args.ticks):
+        for bus in sim.buses:
+            bus.log.clear()
+        for i in range(len(sim.heads)):
+            # A different, changing level per face so every head writes every tick
+            fraction = ((tick + 50 * i) % 200) / 200
+            sim.setHeadLEDs(i, *table.levels_for(fraction))
+            if not batched:
+                sim.refreshLEDs()
+        if batched:
+            sim.refreshLEDs()
+        times = [entry[0] for bus in sim.buses for entry in bus.log]
+        spreads.append((max(times) - min(times)) / 1000)
+    return sum(spreads) / len(spreads), max(spreads)
+
+
+print(f"{len(sim.heads)} heads on {len(sim.buses)} buses at {args.frequency // 1000}kHz")
+for name, batched in (("per head", False), ("batched", True)):
+    mean, worst = measure(batched)
+    print(f"{name:>8}: first-to-last face write mean {mean:.0f}us, worst {worst:.0f}us")
+
+# A hot thermistor on any head blanks every head
+sim.heads[-1].ads.set_temperature(0, 120)
+sim.checkThermals()
+check_temperature(sim)
+print(f"Head {len(sim.heads) - 1} LED at 120C -> halogen duty per head {[head.hal.duty_cycle for head in sim.heads]}")
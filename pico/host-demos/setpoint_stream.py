@@ -0,0 +1,53 @@
+# Setpoint streaming demo
+# Sends binary setpoint frames to the Pico's usb_cdc data port while BasiliskMode is running
+# Usage: python host-demos/setpoint_stream.py /dev/ttyACM1 --rate 200
+#        python host-demos/setpoint_stream.py /dev/ttyACM1 --rate 200 --ahead 0.25
+
+# Import dependencies
+import argparse
+import math
+import os
+import sys
+import time
+import serial as ser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.setpoint_link import encode_setpoints, encode_timed_setpoints, encode_stream_start
+
+MAX_VALUE = 65535
+
+parser = argparse.ArgumentParser(description='Stream a slow sine sweep to the solar simulator data port')
+parser.add_argument('port', type=str, help='data serial port of the Pico (the second CDC device)')
+parser.add_argument('-r', '--rate', type=float, help='frames per second', default=200)
+parser.add_argument('-p', '--period', type=float, help='seconds per sine period', default=10)
+parser.add_argument('-l', '--limit', type=float, help='peak value as a fraction of full scale', default=0.3)
+parser.add_argument('-a', '--ahead', type=float, default=0,
+                    help='send timed frames up to this many seconds ahead (keep below the Pico queue length)')
+args = parser.parse_args()
+
+port = ser.Serial(args.port)
+seq = 0
+start = time.monotonic()
+next_frame = start
+if args.ahead:
+    port.write(encode_stream_start(seq))
+    seq += 1
+try:
+    while True:
+        if args.ahead:
+            # Timed frames carry their own deadline, so they can be sent early in bursts
+            t = next_frame - start
+            level = abs(math.sin(math.pi * t / args.period))
+            value = int(level * args.limit * MAX_VALUE)
+            port.write(encode_timed_setpoints(seq, int(t * 1e6), v=value, w=value, c=value, uv=0, h=value))
+        else:
+            level = abs(math.sin(math.pi * (time.monotonic() - start) / args.period))
+            value = int(level * args.limit * MAX_VALUE)
+            port.write(encode_setpoints(seq, v=value, w=value, c=value, uv=0, h=value))
+        seq = (seq + 1) & 0xFF
+
+        next_frame += 1 / args.rate
+        time.sleep(max(0, next_frame - args.ahead - time.monotonic()))
+except KeyboardInterrupt:
+    port.write(encode_setpoints(seq))  # Lights off
+    port.close()
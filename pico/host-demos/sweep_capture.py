@@ -0,0 +1,40 @@
+# Channel sweep receiver
+# Reads the result frames of a Manual Mode channel sweep from the Pico's usb_cdc data port and
+# writes one CSV row per point, until the sweep ends
+# Usage: python host-demos/sweep_capture.py /dev/ttyACM1 sweep.csv
+#        then type e.g. 'sweep vwch 0:100:1' on the Pico console
+
+# Import dependencies
+import argparse
+import csv
+import os
+import sys
+import serial as ser
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from lib.sweep import CHANNEL_NAMES, decode_results
+
+parser = argparse.ArgumentParser(description='Receive channel sweep results and write them as CSV')
+parser.add_argument('port', type=str, help='data serial port of the Pico (the second CDC device)')
+parser.add_argument('output', type=str, help='CSV file to write')
+args = parser.parse_args()
+
+port = ser.Serial(args.port, timeout=0.1)
+data = bytearray()
+points, end = [], None
+print("Waiting for sweep results")
+while end is None:
+    data += port.read(256)
+    points, end = decode_results(data)
+    print(f"\r{len(points)} points", end="")
+port.close()
+print()
+
+with open(args.output, 'w', newline='') as f:
+    writer = csv.writer(f)
+    writer.writerow(['point', 'channel', 'setpoint', 'samples', 'volts', 'min_volts', 'max_volts',
+                     'led_c', 'heatsink_c', 'cell_c', 'flags'])
+    for p in points:
+        writer.writerow([p['point'], CHANNEL_NAMES[p['channel']], p['setpoint'], p['samples'],
+                         p['volts'], p['min_volts'], p['max_volts'], *p['temps'], p['flags']])
+print(f"{len(points)} points{' (stopped early)' if end[1] else ''} -> {args.output}")
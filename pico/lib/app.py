@@ -1,22 +1,53 @@
 # lib/app.py
 
-from .utils import input_with_default
-from .modes.auto_mode import AutoMode
-from .modes.manual_mode import ManualMode
-from .modes.basilisk_mode import BasiliskMode
+from .utils import input_with_default, get_intensity_table
+from .boot_timeline import boot_timeline
+
+# Mode menu numbers that start a mode; each mode's module is only imported when it is chosen
+MODE_NUMBERS = (1, 2, 3, 5)
 
 
 class SolarSimulatorApp:
     """
     Main application class for the Solar Simulator.
+    Settings changed in the setup menu are saved to `config` (lib/config.py) when one is given,
+    and a config with a boot mode starts that mode directly, without the menu.
     """
 
-    def __init__(self, sim):
+    def __init__(self, sim, config=None):
         self.sim = sim
+        self.config = config
+        # Build the intensity lookup table once at boot so no mode pays for it per tick
+        get_intensity_table()
         # Thermal monitoring settings
 
     def run(self):
-        self.mode_selection()
+        if self.config is not None and self.config.boot_mode in MODE_NUMBERS:
+            print(f"Starting mode {self.config.boot_mode} (boot mode, change it in the thermal setup)")
+            self.run_mode(self.config.boot_mode)
+        else:
+            self.mode_selection()
+
+    def run_mode(self, mode):
+        """
+        Import and run the mode with menu number `mode`.
+        """
+        if mode == 1:
+            from .modes.auto_mode import AutoMode
+            boot_timeline.mark("mode import")
+            AutoMode(self.sim).run()
+        elif mode == 2:
+            from .modes.manual_mode import ManualMode
+            boot_timeline.mark("mode import")
+            ManualMode(self.sim).run()
+        elif mode == 3:
+            from .modes.basilisk_mode import BasiliskMode
+            boot_timeline.mark("mode import")
+            BasiliskMode(self.sim).run()
+        elif mode == 5:
+            from .modes.irradiance_mode import IrradianceMode
+            boot_timeline.mark("mode import")
+            IrradianceMode(self.sim).run()
 
     def setup(self):
         # Thermal monitoring setting
@@ -24,6 +55,7 @@ class SolarSimulatorApp:
         default_settings_summary = (
                 "\nDefault settings are:\n"
                 "  - Thermal Monitoring: " + ("Enabled" if self.sim.enable_therm_monitoring else "Disabled") + "\n" +
+                "  - Predictive Derating: " + ("Enabled" if self.sim.derating.enabled else "Disabled") + "\n" +
                 "  - UV Light (**abandon**): " + ("Disabled" if self.sim.uv_safety else "Enabled") + "\n" +
                 "  - LED Shutdown Temperature: " + str(self.sim.therm_led_shutdown) + "°C\n" +
                 "  - Heatsink Shutdown Temperature: " + str(self.sim.therm_heatsink_shutdown) + "°C\n" +
@@ -46,27 +78,46 @@ class SolarSimulatorApp:
             )
             self.sim.enable_therm_monitoring = enable_therm_monitoring_input == "yes"
 
+            # Predictive derating setting
+            enable_derating_input = input_with_default(
+                "Would you like to dim the lights ahead of forecast overheating? (yes/no, default is yes): ",
+                default_value="yes",
+                valid_values=["yes", "no"]
+            )
+            self.sim.derating.enabled = enable_derating_input == "yes"
+
             # Thermal shutdown temperatures
             self.sim.therm_led_shutdown = input_with_default(
-                "Set LED shutdown temperature (default is 100°C): ",
-                default_value=100,
+                f"Set LED shutdown temperature (current is {self.sim.therm_led_shutdown}°C): ",
+                default_value=self.sim.therm_led_shutdown,
                 value_type=int
             )
             self.sim.therm_heatsink_shutdown = input_with_default(
-                "Set Heatsink shutdown temperature (default is 60°C): ",
-                default_value=60,
+                f"Set Heatsink shutdown temperature (current is {self.sim.therm_heatsink_shutdown}°C): ",
+                default_value=self.sim.therm_heatsink_shutdown,
                 value_type=int
             )
             self.sim.therm_cell_shutdown = input_with_default(
-                "Set Cell shutdown temperature (default is 80°C): ",
-                default_value=80,
+                f"Set Cell shutdown temperature (current is {self.sim.therm_cell_shutdown}°C): ",
+                default_value=self.sim.therm_cell_shutdown,
                 value_type=int
             )
             self.sim.therm_resume_temp = input_with_default(
-                "Set temperature to resume operation (default is 45°C): ",
-                default_value=45,
+                f"Set temperature to resume operation (current is {self.sim.therm_resume_temp}°C): ",
+                default_value=self.sim.therm_resume_temp,
                 value_type=int
             )
+            if self.config is not None:
+                self.config.boot_mode = input_with_default(
+                    f"Mode to start at boot without the menu, 1, 2, 3 or 5, 0 for the menu "
+                    f"(current is {self.config.boot_mode}): ",
+                    default_value=self.config.boot_mode,
+                    valid_values=(0,) + MODE_NUMBERS,
+                    value_type=int
+                )
+                self.config.update_from(self.sim)
+                if self.config.save():
+                    print("Settings saved for the next boot.")
         else:
             print("Using default settings. No changes were made.")
 
@@ -76,28 +127,21 @@ class SolarSimulatorApp:
         print("2. Manual Mode")
         print("3. Basilisk Mode")
         print("4. Thermal setup, if you need")
+        print("5. Irradiance Control")
         while True:
-            mode = input("Your mode (input 1, 2, 3 or 4 if you need change default): ")
-            if mode in ["1", "2", "3","4"]:
+            mode = input("Your mode (input 1, 2, 3, 5 or 4 if you need change default): ")
+            if mode in ["1", "2", "3", "4", "5"]:
                 mode = int(mode)
             else:
-                print("Invalid input. Please enter 1, 2, or 3.")
+                print("Invalid input. Please enter 1, 2, 3 or 5.")
 
-            if mode == 1:
-                auto_mode = AutoMode(self.sim)
-                auto_mode.run()
-                break
-            elif mode == 2:
-                manual_mode = ManualMode(self.sim)
-                manual_mode.run()
-                break
-            elif mode == 3:
-                basilisk_mode = BasiliskMode(self.sim)
-                basilisk_mode.run()
+            if mode in MODE_NUMBERS:
+                boot_timeline.mark("menu")
+                self.run_mode(mode)
                 break
             elif mode == 4:
                 self.setup()
                 print("Thermal setup completed. Returning to mode selection.\n")
                 continue
         else:
-            print("Invalid selection, please restart the program and choose 1, 2, or 3.")
+            print("Invalid selection, please restart the program and choose 1, 2, 3 or 5.")
@@ -0,0 +1,63 @@
+# lib/boot_timeline.py
+# Boot phase timing
+#
+# code.py records when it starts running, before any import, then marks the end of each boot
+# phase. The last phase ends at the first setpoint a mode applies after boot (see
+# SolarSimulator.setLEDs), which is when the panel lights up again after a reset. The shared
+# `boot_timeline` does nothing until `boot_timeline.enabled = True` (see BOOT_TIMELINE in code.py).
+
+from time import monotonic_ns
+
+
+class BootTimeline:
+    """
+    Milliseconds per named boot phase, printed once the first setpoint is applied.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.waiting = False  # True between wait_for_setpoint() and the first setpoint
+        self.start_ns = 0
+        self.names = []
+        self.times = []
+
+    def start(self, start_ns: int = None):
+        """
+        Restart the timeline at `start_ns` (monotonic_ns(), default now).
+        """
+        self.start_ns = monotonic_ns() if start_ns is None else start_ns
+        self.names.clear()
+        self.times.clear()
+
+    def mark(self, name: str):
+        """
+        End the current phase, naming it `name`.
+        """
+        if self.enabled:
+            self.names.append(name)
+            self.times.append(monotonic_ns())
+
+    def wait_for_setpoint(self):
+        """
+        End the timeline at the next setpoint() call.
+        """
+        self.waiting = self.enabled
+
+    def setpoint(self):
+        """
+        Called with every setpoint; the first one after wait_for_setpoint() ends the timeline.
+        """
+        if self.waiting:
+            self.waiting = False
+            self.mark("first setpoint")
+            print(self.report())
+
+    def report(self) -> str:
+        parts = []
+        last = self.start_ns
+        for i in range(len(self.names)):
+            parts.append(f"{self.names[i]} {(self.times[i] - last) / 1e6:.1f}ms")
+            last = self.times[i]
+        return f"boot: {', '.join(parts)} (total {(last - self.start_ns) / 1e6:.1f}ms)"
+
+
+boot_timeline = BootTimeline()
@@ -0,0 +1,110 @@
+# lib/bus_scheduler.py
+# Per-tick I2C bus budget
+#
+# Time on each I2C bus is divided into fixed tick frames (10ms by default), and a fraction of
+# each frame (the budget) may be spent on bus transactions. Safety traffic, the thermistor
+# reads, comparator arming and blanking writes, always goes out and is only accounted.
+# Setpoint writes ask admit() first: when the frame's remaining budget cannot fit them they
+# stay staged and go out in a later frame, so safety reads win whenever the bus is tight.
+# A frame whose transactions ran past the budget counts as an overrun. Utilization, overruns
+# and deferred setpoints are kept per second.
+
+from time import monotonic_ns
+
+I2C_FREQUENCIES = (100000, 400000, 1000000)  # Standard, fast and fast-mode plus
+I2C_OVERHEAD_BITS = 2  # Start and stop conditions
+
+
+class BusScheduler:
+    """
+    Budget accounting for one I2C bus. Call admit() before a deferrable transaction and
+    record() after every transaction. All state is preallocated integers.
+    """
+    def __init__(self, frequency: int = 100000, tick: float = 0.01, budget: float = 0.8):
+        if frequency not in I2C_FREQUENCIES:
+            raise ValueError(f"I2C frequency must be one of {I2C_FREQUENCIES}")
+        if tick <= 0:
+            raise ValueError("Tick must be positive")
+        if not (0 < budget <= 1):
+            raise ValueError("Budget must be a fraction between 0 and 1")
+        self.frequency = frequency
+        self.tick_ns = int(tick * 1e9)
+        self.budget_ns = int(tick * budget * 1e9)  # Bus time allowed per frame
+        self.reset()
+
+    def reset(self):
+        now = monotonic_ns()
+        self.busy_ns = 0      # Total bus time recorded
+        self.overruns = 0     # Frames that went past the budget
+        self.deferred = 0     # Setpoint bursts pushed to a later frame
+        self.utilization = 0.0    # Over the last full second
+        self.overrun_rate = 0.0   # Per second, over the last full second
+        self.deferred_rate = 0.0  # Per second, over the last full second
+        self._frame_end_ns = now + self.tick_ns
+        self._used_ns = 0
+        self._overrun = False
+        self._window_start_ns = now
+        self._window_busy_ns = 0
+        self._window_overruns = 0
+        self._window_deferred = 0
+
+    def transfer_ns(self, nbytes: int) -> int:
+        """
+        Bus time of one transaction with `nbytes` data bytes, plus the address byte.
+        """
+        return (9 * (nbytes + 1) + I2C_OVERHEAD_BITS) * 1000000000 // self.frequency
+
+    def conversion_ns(self, data_rate: int) -> int:
+        """
+        Bus time of one ADS1015 single-shot read: config write, conversion wait and result read.
+        """
+        return self.transfer_ns(3) + 1000000000 // data_rate + self.transfer_ns(1) + self.transfer_ns(2)
+
+    def admit(self, cost_ns: int) -> bool:
+        """
+        Return True if a deferrable transaction of `cost_ns` fits in the current frame.
+        A refusal counts as a deferral; keep the work staged and try again later.
+        """
+        self._roll(monotonic_ns())
+        if self._used_ns + cost_ns <= self.budget_ns:
+            return True
+        self.deferred += 1
+        self._window_deferred += 1
+        return False
+
+    def record(self, start_ns: int):
+        """
+        Account the bus time from `start_ns` (monotonic_ns() before the transaction) to now.
+        """
+        now = monotonic_ns()
+        self._roll(start_ns)
+        spent = now - start_ns
+        self._used_ns += spent
+        self.busy_ns += spent
+        self._window_busy_ns += spent
+        if self._used_ns > self.budget_ns and not self._overrun:
+            self._overrun = True
+            self.overruns += 1
+            self._window_overruns += 1
+
+    def report(self) -> str:
+        return (f"{self.frequency // 1000}kHz, {self.utilization * 100:.0f}% busy, "
+                f"{self.overrun_rate:.1f} overruns/s, {self.deferred_rate:.1f} deferred/s "
+                f"(totals: {self.overruns} overruns, {self.deferred} deferred)")
+
+    # Starts a new frame once the current one has ended, and the per-second figures every second
+    def _roll(self, now: int):
+        if now < self._frame_end_ns:
+            return
+        self._frame_end_ns = now + self.tick_ns
+        self._used_ns = 0
+        self._overrun = False
+        elapsed = now - self._window_start_ns
+        if elapsed >= 1000000000:
+            self.utilization = self._window_busy_ns / elapsed
+            self.overrun_rate = self._window_overruns * 1e9 / elapsed
+            self.deferred_rate = self._window_deferred * 1e9 / elapsed
+            self._window_start_ns = now
+            self._window_busy_ns = 0
+            self._window_overruns = 0
+            self._window_deferred = 0
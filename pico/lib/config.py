@@ -0,0 +1,211 @@
+# lib/config.py
+# Persistent configuration store
+#
+# Settings and the light calibration live in two slot files on the flash. Every save writes
+# the slot not holding the current config, with a sequence number one higher and a CRC32 of
+# the record, so a save cut short by a reset leaves the previous config intact. Loading reads
+# both slots and keeps the valid one with the highest sequence number.
+#
+# A record is a fixed binary layout read with struct, and it includes the intensity table
+# built from the calibration. Loading is a file read and a few unpacks, not the table build,
+# so the Pico is ready for setpoints as soon as the hardware is up.
+#
+# CircuitPython mounts the flash read-only to code while USB can write it; save() reports
+# when the store cannot be written (see boot.py).
+
+import os
+import struct
+from binascii import crc32
+from .hardware import SIMULATED
+from .utils import LIGHT_COEFFICIENTS, INTENSITY_LEVELS, IntensityTable, set_calibration
+try:
+    from ulab import numpy as np  # Use ulab when running on Pico
+except ImportError:
+    import numpy as np  # Use numpy when running on PC
+
+CONFIG_VERSION = 2
+CONFIG_MAGIC = b"SSCF"
+CONFIG_DIR = os.environ.get("SOLAR_CONFIG_DIR", ".") if SIMULATED else ""
+CONFIG_SLOTS = (CONFIG_DIR + "/config_a.bin", CONFIG_DIR + "/config_b.bin")
+
+# Magic, version, sequence number, payload length and CRC32 of the payload
+HEADER = "<4sHIII"
+# Flags, PWM frequency, LED, heatsink and cell shutdown, resume temperature, photodiode volts per
+# sun and (from version 2) the mode to start at boot; older versions load with the newer fields
+# at their defaults
+SETTINGS = {1: "<BIfffff", 2: "<BIfffffB"}
+FLAG_THERM_MONITORING = 0x01
+FLAG_DERATING = 0x02
+FLAG_UV_SAFETY = 0x04
+# Slope and offset of each light channel, then the table's levels and the uint16 rows
+COEFFICIENT = "<ff"
+TABLE_LEVELS = "<H"
+
+
+class Config:
+    """
+    The settings applied to the simulator at boot, with their defaults.
+    """
+    def __init__(self):
+        self.therm_monitoring = True
+        self.derating = True
+        self.uv_safety = True
+        self.pwm_freq = 5000
+        self.led_shutdown = 100
+        self.heatsink_shutdown = 60
+        self.cell_shutdown = 80
+        self.resume_temp = 45
+        self.photodiode_volts_per_sun = 1.0
+        self.boot_mode = 0  # Mode menu number to enter at boot without the menu, 0 shows the menu
+        self.light_coefficients = LIGHT_COEFFICIENTS
+        self.table = None  # IntensityTable for light_coefficients, built on demand
+        self.sequence = 0  # Of the slot this config was loaded from, 0 for defaults
+        self.source = "defaults"
+
+    def apply(self, sim):
+        """
+        Apply the settings and calibration to a SolarSimulator.
+        """
+        sim.enable_therm_monitoring = self.therm_monitoring
+        sim.derating.enabled = self.derating
+        sim.uv_safety = self.uv_safety
+        sim.therm_led_shutdown = self.led_shutdown
+        sim.therm_heatsink_shutdown = self.heatsink_shutdown
+        sim.therm_cell_shutdown = self.cell_shutdown
+        sim.therm_resume_temp = self.resume_temp
+        sim.photodiode_volts_per_sun = self.photodiode_volts_per_sun
+        set_calibration(self.light_coefficients, self.table)
+
+    def update_from(self, sim):
+        """
+        Take the current settings back from a SolarSimulator, e.g. after the setup menu.
+        """
+        self.therm_monitoring = sim.enable_therm_monitoring
+        self.derating = sim.derating.enabled
+        self.uv_safety = sim.uv_safety
+        self.pwm_freq = sim.PWM_FREQ
+        self.led_shutdown = sim.therm_led_shutdown
+        self.heatsink_shutdown = sim.therm_heatsink_shutdown
+        self.cell_shutdown = sim.therm_cell_shutdown
+        self.resume_temp = sim.therm_resume_temp
+        self.photodiode_volts_per_sun = sim.photodiode_volts_per_sun
+
+    def set_light_coefficients(self, coefficients):
+        """
+        Replace the calibration with (name, slope, offset) per channel; the table is rebuilt.
+        """
+        if len(coefficients) != len(LIGHT_COEFFICIENTS):
+            raise ValueError(f"Calibration needs {len(LIGHT_COEFFICIENTS)} channels")
+        self.light_coefficients = tuple(coefficients)
+        self.table = None
+
+    def save(self) -> bool:
+        """
+        Write the config to the older slot. Returns False if the flash is not writable.
+        """
+        if self.table is None:
+            self.table = IntensityTable(coefficients=self.light_coefficients)
+        payload = self._encode()
+        sequence = self.sequence + 1
+        path = CONFIG_SLOTS[sequence % 2]
+        header = struct.pack(HEADER, CONFIG_MAGIC, CONFIG_VERSION, sequence, len(payload), crc32(payload))
+        try:
+            with open(path, "wb") as f:
+                f.write(header)
+                f.write(payload)
+                f.flush()
+            os.sync()
+        except OSError as e:
+            print(f"Config not saved, {path} is not writable ({e}). See boot.py.")
+            return False
+        self.sequence = sequence
+        self.source = path
+        return True
+
+    def _encode(self) -> bytes:
+        flags = ((FLAG_THERM_MONITORING if self.therm_monitoring else 0)
+                 | (FLAG_DERATING if self.derating else 0)
+                 | (FLAG_UV_SAFETY if self.uv_safety else 0))
+        parts = [struct.pack(SETTINGS[CONFIG_VERSION], flags, self.pwm_freq, self.led_shutdown,
+                             self.heatsink_shutdown, self.cell_shutdown, self.resume_temp,
+                             self.photodiode_volts_per_sun, self.boot_mode)]
+        for _, slope, offset in self.light_coefficients:
+            parts.append(struct.pack(COEFFICIENT, slope, offset))
+        parts.append(struct.pack(TABLE_LEVELS, self.table.levels))
+        parts.append(self.table.table.tobytes())
+        return b"".join(parts)
+
+    def _decode(self, payload, version: int):
+        settings = struct.unpack_from(SETTINGS[version], payload, 0)
+        flags, self.pwm_freq, led, heatsink, cell, resume, self.photodiode_volts_per_sun = settings[:7]
+        if version >= 2:
+            self.boot_mode = settings[7]
+        self.therm_monitoring = bool(flags & FLAG_THERM_MONITORING)
+        self.derating = bool(flags & FLAG_DERATING)
+        self.uv_safety = bool(flags & FLAG_UV_SAFETY)
+        # The setup menu takes whole degrees, stored as floats
+        self.led_shutdown = _number(led)
+        self.heatsink_shutdown = _number(heatsink)
+        self.cell_shutdown = _number(cell)
+        self.resume_temp = _number(resume)
+
+        offset = struct.calcsize(SETTINGS[version])
+        coefficients = []
+        for name, _, _ in LIGHT_COEFFICIENTS:
+            slope, intercept = struct.unpack_from(COEFFICIENT, payload, offset)
+            coefficients.append((name, slope, intercept))
+            offset += struct.calcsize(COEFFICIENT)
+        self.light_coefficients = tuple(coefficients)
+
+        levels = struct.unpack_from(TABLE_LEVELS, payload, offset)[0]
+        offset += struct.calcsize(TABLE_LEVELS)
+        count = levels * len(LIGHT_COEFFICIENTS)
+        if levels == INTENSITY_LEVELS and len(payload) - offset == 2 * count:
+            table = np.frombuffer(payload, dtype=np.uint16, count=count, offset=offset)
+            self.table = IntensityTable(levels, self.light_coefficients, table=table)
+
+
+def _number(value: float):
+    return int(value) if value == int(value) else value
+
+
+def _read_slot(path):
+    """
+    Return (sequence, version, payload) of a valid slot, or None if it is missing, corrupt or
+    from a version this firmware does not understand.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    size = struct.calcsize(HEADER)
+    if len(data) < size:
+        return None
+    magic, version, sequence, length, checksum = struct.unpack_from(HEADER, data, 0)
+    if magic != CONFIG_MAGIC or len(data) != size + length:
+        return None
+    payload = memoryview(data)[size:]
+    if crc32(payload) != checksum:
+        return None
+    if version not in SETTINGS:
+        print(f"Ignoring {path}: config version {version}, this firmware reads up to {CONFIG_VERSION}")
+        return None
+    return sequence, version, payload
+
+
+def load_config() -> Config:
+    """
+    Load the newest valid config slot, or the defaults if there is none.
+    """
+    config = Config()
+    best = None
+    for path in CONFIG_SLOTS:
+        slot = _read_slot(path)
+        if slot is not None and (best is None or slot[0] > best[0]):
+            best = slot + (path,)
+    if best is None:
+        return config
+    config.sequence, version, payload, config.source = best
+    config._decode(payload, version)
+    return config
@@ -0,0 +1,67 @@
+# lib/controller.py
+# PID controller for closing loops on the simulator's sensors
+
+class PIDController:
+    """
+    PID controller with output clamping, conditional-integration anti-windup and an optional
+    output rate limit. The integral is kept in output units, so changing `ki` while running
+    does not bump the output. The derivative acts on the measurement instead of the error,
+    so a setpoint step does not kick the output.
+    """
+    def __init__(self, kp: float, ki: float = 0.0, kd: float = 0.0,
+                 out_min: float = 0.0, out_max: float = 1.0, max_rate=None):
+        if out_min >= out_max:
+            raise ValueError("Controller output minimum must be below its maximum")
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.out_min = out_min
+        self.out_max = out_max
+        self.max_rate = max_rate  # Largest output change per second, None for no limit
+        self.reset()
+
+    def reset(self, output: float = 0.0):
+        """
+        Forget the loop history and continue smoothly from `output`.
+        """
+        output = min(max(output, self.out_min), self.out_max)
+        self.integral = output
+        self.output = output
+        self.error = 0.0
+        self.saturated = False  # True while the last output was clamped or rate limited
+        self._last_measurement = None
+
+    def update(self, setpoint: float, measurement: float, dt: float, ceiling=None) -> float:
+        """
+        Advance the loop by `dt` seconds and return the new output. `ceiling`, if given, caps
+        the output for this update like `out_max` does, e.g. while something downstream limits
+        what the output can achieve, so the integral does not wind up against it.
+        """
+        if dt <= 0:
+            return self.output
+        error = setpoint - measurement
+        derivative = 0.0
+        if self._last_measurement is not None:
+            derivative = -(measurement - self._last_measurement) / dt
+        self._last_measurement = measurement
+
+        integral = self.integral + self.ki * error * dt
+        output = self.kp * error + integral + self.kd * derivative
+
+        # Clamp to the output range and the rate limit
+        low = self.out_min
+        high = self.out_max if ceiling is None else max(low, min(self.out_max, ceiling))
+        if self.max_rate is not None:
+            step = self.max_rate * dt
+            low = max(low, self.output - step)
+            high = min(high, self.output + step)
+        limited = min(max(output, low), high)
+
+        # Anti-windup: only integrate when the output is free or the error pulls it back in range
+        self.saturated = limited != output
+        if not self.saturated or (output > high and error < 0) or (output < low and error > 0):
+            self.integral = min(max(integral, self.out_min), self.out_max)
+
+        self.error = error
+        self.output = limited
+        return limited
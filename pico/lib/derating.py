@@ -0,0 +1,193 @@
+# lib/derating.py
+# Predictive thermal derating
+#
+# Each thermistor gets a first-order thermal model fitted online by recursive least squares:
+#     T[n+1] = a * T[n] + b * u[n] + c
+# where n counts model periods and u is the drive, the mean applied output of all channels (0-1).
+# From the model, the steady-state temperature for a drive is (b * u + c) / (1 - a), and a
+# reading relaxes toward it by a factor of `a` every period. When the commanded drive would
+# take a channel past its shutdown temperature (less a margin) within the forecast horizon,
+# every output is scaled down to the drive that settles at that limit. The scale moves at a
+# limited rate so the lights dim and recover smoothly. The hard shutdown in
+# utils.check_temperature() stays as the backstop.
+
+import math
+from time import monotonic_ns
+
+MAX_TRACE = 1e6  # Stop forgetting once the covariance is this large (no excitation to learn from)
+
+
+class ThermalModel:
+    """
+    First-order model of one thermistor, fitted by recursive least squares with forgetting.
+    All state is preallocated; update() does not build lists.
+    """
+    def __init__(self, forgetting: float = 0.99, min_samples: int = 30):
+        self.forgetting = forgetting
+        self.min_samples = min_samples
+        self.theta = [1.0, 0.0, 0.0]  # a, b, c
+        self.P = [0.0] * 9            # 3x3 covariance, row-major
+        self._phi = [0.0, 0.0, 1.0]
+        self._pphi = [0.0] * 3
+        self.reset()
+
+    def reset(self):
+        self.theta[0] = 1.0
+        self.theta[1] = 0.0
+        self.theta[2] = 0.0
+        for i in range(9):
+            self.P[i] = 1000.0 if i % 4 == 0 else 0.0
+        self.samples = 0
+
+    def update(self, temp_prev: float, drive: float, temp: float):
+        phi = self._phi
+        phi[0] = temp_prev
+        phi[1] = drive
+        P = self.P
+        pphi = self._pphi
+        for i in range(3):
+            pphi[i] = P[3 * i] * phi[0] + P[3 * i + 1] * phi[1] + P[3 * i + 2] * phi[2]
+        lam = self.forgetting if P[0] + P[4] + P[8] < MAX_TRACE else 1.0
+        denom = lam + phi[0] * pphi[0] + phi[1] * pphi[1] + phi[2] * pphi[2]
+        theta = self.theta
+        error = temp - (theta[0] * phi[0] + theta[1] * phi[1] + theta[2] * phi[2])
+        for i in range(3):
+            theta[i] += pphi[i] / denom * error
+        for i in range(3):
+            k = pphi[i] / denom
+            for j in range(3):
+                P[3 * i + j] = (P[3 * i + j] - k * pphi[j]) / lam
+        self.samples += 1
+
+    @property
+    def valid(self) -> bool:
+        a, b, _ = self.theta
+        return self.samples >= self.min_samples and 0 < a < 1 and b > 0
+
+    def steady_state(self, drive: float) -> float:
+        a, b, c = self.theta
+        return (b * drive + c) / (1 - a)
+
+    # Model periods until a reading of `temp` held at `drive` reaches `limit`, None if it never does
+    def periods_to(self, temp: float, drive: float, limit: float):
+        if temp >= limit:
+            return 0.0
+        settled = self.steady_state(drive)
+        if settled <= limit:
+            return None
+        return math.log((settled - limit) / (settled - temp)) / math.log(self.theta[0])
+
+    # Largest drive whose steady state stays at or below `limit`
+    def max_drive(self, limit: float) -> float:
+        a, b, c = self.theta
+        return (limit * (1 - a) - c) / b
+
+
+class ThermalDerating:
+    """
+    Scales the simulator's outputs down ahead of forecast thermal limit crossings.
+    Call update() with every fresh thermistor reading; the models are fitted once per `period`.
+    """
+    def __init__(self, sim, period: float = 1.0, horizon: float = 120.0, margin: float = 5.0,
+                 down_rate: float = 0.1, up_rate: float = 0.02):
+        self.sim = sim
+        self.enabled = True
+        self.clock = monotonic_ns  # Replace to run the models on simulated time
+        self.period = period      # Seconds between model samples
+        self.horizon = horizon    # Seconds ahead a forecast crossing starts derating
+        self.margin = margin      # Degrees below each shutdown temperature to hold
+        self.down_rate = down_rate  # Largest scale decrease per second
+        self.up_rate = up_rate      # Largest scale increase per second
+        self.models = [ThermalModel() for _ in range(3)]
+        self.scale = 1.0
+        self.limiting = -1        # Thermistor index setting the scale, -1 when not derating
+        self.crossing = None      # Seconds to the limiting channel's forecast crossing
+        self._last_temps = [None] * 3
+        self._last_ns = 0
+        self._drive_sum = 0.0
+        self._drive_count = 0
+
+    def limits(self):
+        sim = self.sim
+        return (sim.therm_led_shutdown, sim.therm_heatsink_shutdown, sim.therm_cell_shutdown)
+
+    def update(self, temps) -> float:
+        """
+        Feed a thermistor reading and return the output scale, which is also applied to sim.
+        """
+        if not self.enabled:
+            if self.scale != 1.0:
+                self._apply(1.0)
+            return 1.0
+        sim = self.sim
+        self._drive_sum += sim.appliedDrive()
+        self._drive_count += 1
+        now = self.clock()
+        if self._last_ns == 0:
+            self._start(temps, now)
+            return self.scale
+        elapsed = (now - self._last_ns) / 1e9
+        if elapsed < self.period:
+            return self.scale
+
+        # Fit each model with the mean drive over the period that just ended
+        drive = self._drive_sum / self._drive_count
+        for i in range(3):
+            if temps[i] is not None and self._last_temps[i] is not None:
+                self.models[i].update(self._last_temps[i], drive, temps[i])
+
+        # Forecast at the commanded drive, so derating does not hide the crossing it prevents
+        commanded = sim.commandedDrive()
+        target = 1.0
+        self.limiting = -1
+        self.crossing = None
+        limits = self.limits()
+        for i in range(3):
+            model = self.models[i]
+            if temps[i] is None or not model.valid or commanded <= 0:
+                continue
+            limit = limits[i] - self.margin
+            periods = model.periods_to(temps[i], commanded, limit)
+            if periods is None or periods * self.period > self.horizon:
+                continue
+            allowed = min(max(model.max_drive(limit) / commanded, 0.0), 1.0)
+            if allowed < target:
+                target = allowed
+                self.limiting = i
+                self.crossing = periods * self.period
+
+        # Move toward the target scale at the limited rates
+        if target < self.scale:
+            scale = max(target, self.scale - self.down_rate * elapsed)
+        else:
+            scale = min(target, self.scale + self.up_rate * elapsed)
+        self._start(temps, now)
+        if scale != self.scale:
+            self._apply(scale)
+        return self.scale
+
+    def reset(self):
+        for model in self.models:
+            model.reset()
+        self._last_ns = 0
+        self.limiting = -1
+        self.crossing = None
+        self._apply(1.0)
+
+    def report(self) -> str:
+        if self.limiting < 0:
+            return f"derating: off (scale {self.scale:.2f})"
+        names = ("LED", "Heatsink", "Cell")
+        return (f"derating: {names[self.limiting]} forecast to cross in {self.crossing:.0f}s, "
+                f"scale {self.scale:.2f}")
+
+    def _start(self, temps, now):
+        for i in range(3):
+            self._last_temps[i] = temps[i]
+        self._last_ns = now
+        self._drive_sum = 0.0
+        self._drive_count = 0
+
+    def _apply(self, scale):
+        self.scale = scale
+        self.sim.setDerating(scale)
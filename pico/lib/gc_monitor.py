@@ -0,0 +1,67 @@
+# lib/gc_monitor.py
+# Allocation and garbage collection instrumentation for the mode loops
+#
+# Call gc_monitor.tick() once per loop tick. Every `every` ticks it prints how many bytes the
+# ticks allocated (from gc.mem_free() deltas), how many collections ran and the longest tick
+# with and without a collection, which is where GC pauses show up as stutter.
+# Free memory only goes up when the collector runs, so a rise between two ticks counts as one
+# collection. The shared `gc_monitor` is disabled until `gc_monitor.every` is set (see
+# GC_REPORT_TICKS in code.py). CPython has no gc.mem_free(), so there tick() does nothing.
+
+import gc
+from time import monotonic_ns
+
+
+class GCMonitor:
+    """
+    Tracks gc.mem_free() between ticks and reports allocation and collections per window.
+    """
+    def __init__(self, every: int = 0, write=print):
+        self.every = every  # Ticks per report, 0 disables the monitor
+        self.write = write
+        self.available = hasattr(gc, "mem_free")
+        self.reset()
+
+    def reset(self):
+        self.ticks = 0
+        self.allocated = 0       # Bytes allocated in this window
+        self.collections = 0     # Collections seen in this window
+        self.max_tick_ns = 0     # Longest tick without a collection
+        self.max_gc_tick_ns = 0  # Longest tick with a collection
+        self._last_free = -1
+        self._last_ns = 0
+
+    def tick(self):
+        if not self.every or not self.available:
+            return
+        free = gc.mem_free()
+        now = monotonic_ns()
+        if self._last_free >= 0:
+            elapsed = now - self._last_ns
+            if free > self._last_free:
+                self.collections += 1
+                if elapsed > self.max_gc_tick_ns:
+                    self.max_gc_tick_ns = elapsed
+            else:
+                self.allocated += self._last_free - free
+                if elapsed > self.max_tick_ns:
+                    self.max_tick_ns = elapsed
+        self.ticks += 1
+        if self.ticks >= self.every:
+            self.report(free)
+            self.reset()
+            # Start the next window after the report so its own allocations are not counted
+            self._last_free = gc.mem_free()
+            self._last_ns = monotonic_ns()
+        else:
+            self._last_free = free
+            self._last_ns = now
+
+    def report(self, free: int):
+        self.write(f"gc: {self.ticks} ticks, {self.allocated} bytes allocated "
+                   f"({self.allocated // self.ticks}/tick), {self.collections} collections, "
+                   f"{free} bytes free, longest tick {self.max_tick_ns // 1000}us "
+                   f"(with gc {self.max_gc_tick_ns // 1000}us)")
+
+
+gc_monitor = GCMonitor()
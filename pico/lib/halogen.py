@@ -0,0 +1,195 @@
+# lib/halogen.py
+# Halogen lamp PWM driver
+#
+# A filament's visible output grows much faster than its power (about power^2 from the lamp
+# laws: light ~ V^3.4, power ~ V^1.6), so a linear duty cycle leaves the bottom of the setpoint
+# range nearly dark. HalogenCurve maps setpoints to duty cycles through a table built once,
+# either from a power law or from a measured response (e.g. a halogen channel sweep), so the
+# setpoint becomes the fraction of the lamp's full light output. Each lookup interpolates
+# between two table entries with integer math, so all 16 setpoint bits count.
+#
+# The default curve is the identity (gamma 1): the Halogen intensity coefficients in utils.py
+# were fit against a linear duty cycle, so they stay valid until a measured curve is loaded
+# with SolarSimulator.setHalogenCurve(). HalogenCurve(gamma=LAMP_GAMMA) is the lamp-law guess.
+#
+# HalogenDriver runs one lamp's PWMOut. It follows the table but raises the duty cycle no faster
+# than `slew` of full scale per second, about as fast as the filament heats up. This keeps a
+# cold filament, whose resistance is a fraction of its hot value, from a full-power inrush.
+# A rise writes its first step at once, and no write moves the duty cycle by more than
+# HALOGEN_STEP seconds of slew, however late the next service() call is. Code without a
+# scheduler calls SolarSimulator.settleHalogen() to finish a rise before it moves on.
+# Lower duty cycles go out at once: the filament cools at its own pace anyway, and turning the
+# lamp off, for safety or at the end of a mode, never waits for a loop. The PWM frequency is
+# picked by the duty cycle's band: short pulses at low duty cycles are distorted by the switching edges, so the low band
+# runs at a lower frequency, which also gives the RP2040's PWM counter its full resolution.
+
+from array import array
+from time import monotonic_ns
+
+HALOGEN_GAMMA = 1.0      # Default curve, setpoint = duty cycle
+LAMP_GAMMA = 2.0         # Light output ~ duty cycle ** LAMP_GAMMA for a typical filament
+HALOGEN_SLEW = 5.0       # Largest duty cycle rise per second, in full scales
+HALOGEN_STEP = 0.01      # Seconds of slew in the largest single write, one 100Hz service tick
+# (highest duty cycle as a fraction of full scale, PWM frequency) per band, ascending; None is
+# the simulator's pwm_freq
+HALOGEN_BANDS = ((0.1, 1000), (1.0, None))
+BAND_HYSTERESIS = 0.02   # Duty cycle fraction past a band edge before the frequency changes
+TABLE_BITS = 10          # The table has 2 ** TABLE_BITS + 1 entries
+MAX_VALUE = 65535
+
+
+class HalogenCurve:
+    """
+    Setpoint (0-65535, fraction of full light output) to duty cycle (0-65535) table.
+    By default the duty cycle is threshold + (1 - threshold) * setpoint ** (1 / gamma), where
+    `threshold` is the duty cycle fraction the filament starts to glow at.
+    """
+    def __init__(self, gamma: float = HALOGEN_GAMMA, threshold: float = 0.0, table=None):
+        if table is None:
+            if gamma <= 0 or not 0 <= threshold < 1:
+                raise ValueError("Gamma must be positive and the threshold between 0 and 1")
+            size = 1 << TABLE_BITS
+            table = array('H', [0] * (size + 1))
+            for i in range(1, size + 1):
+                table[i] = int((threshold + (1 - threshold) * (i / size) ** (1 / gamma)) * MAX_VALUE + 0.5)
+        elif len(table) != (1 << TABLE_BITS) + 1:
+            raise ValueError(f"A halogen table has {(1 << TABLE_BITS) + 1} entries")
+        self.gamma = gamma  # None for a measured response
+        self.threshold = threshold
+        self.table = table
+
+    @classmethod
+    def from_response(cls, duties, outputs):
+        """
+        Build the table from a measured response: the light output (any unit, e.g. photodiode
+        volts from a channel sweep) at each duty cycle (0-65535), in ascending duty order.
+        """
+        if len(duties) != len(outputs) or len(duties) < 2:
+            raise ValueError("A response needs at least two duty cycles with their outputs")
+        low = outputs[0]
+        full = max(outputs)
+        if full <= low:
+            raise ValueError("The measured output does not rise with the duty cycle")
+        size = 1 << TABLE_BITS
+        table = array('H', [0] * (size + 1))
+        j = 0
+        for i in range(1, size + 1):
+            # Lowest duty cycle reaching this fraction of the measured range, on the polyline
+            target = low + (full - low) * i / size
+            while j < len(duties) - 2 and outputs[j + 1] < target:
+                j += 1
+            rise = outputs[j + 1] - outputs[j]
+            fraction = (target - outputs[j]) / rise if rise > 0 else 1.0
+            fraction = min(max(fraction, 0.0), 1.0)
+            table[i] = int(duties[j] + (duties[j + 1] - duties[j]) * fraction + 0.5)
+        for i in range(1, size + 1):
+            if table[i] < table[i - 1]:
+                table[i] = table[i - 1]  # Keep it monotonic through measurement noise
+        return cls(gamma=None, table=table)
+
+    def duty(self, setpoint: int) -> int:
+        """
+        Duty cycle for a setpoint, interpolated between the two nearest table entries.
+        """
+        if setpoint == MAX_VALUE:
+            return self.table[-1]  # The last entry is full scale, one count past the last interval
+        shift = 16 - TABLE_BITS
+        i = setpoint >> shift
+        low = self.table[i]
+        return low + ((self.table[i + 1] - low) * (setpoint & ((1 << shift) - 1)) >> shift)
+
+
+class HalogenDriver:
+    """
+    Sets a halogen PWMOut from setpoints through a HalogenCurve, with the slew limit and the
+    frequency bands. set() takes each new setpoint; service() moves a slewed rise on and must
+    be called regularly while `ramping` (see SafetyMonitor.attach() and
+    SolarSimulator.settleHalogen()).
+    """
+    def __init__(self, pwm, curve: HalogenCurve, pwm_freq: int, slew: float = HALOGEN_SLEW,
+                 bands=HALOGEN_BANDS):
+        self.pwm = pwm
+        self.curve = curve
+        self.clock = monotonic_ns  # Replace to ramp on simulated time
+        self.slew = slew
+        self.bands = tuple((int(top * MAX_VALUE), pwm_freq if freq is None else freq) for top, freq in bands)
+        self._hysteresis = int(BAND_HYSTERESIS * MAX_VALUE)
+        self.duty = 0      # Duty cycle on the PWM now
+        self.target = 0    # Duty cycle the ramp is heading for
+        self.ramping = False
+        self.band = -1
+        self._last_ns = 0
+        self._write(0)
+
+    @property
+    def slew(self) -> float:
+        return self._slew
+
+    # Full scales per second, 0 disables the limit
+    @slew.setter
+    def slew(self, rate: float):
+        if rate < 0:
+            raise ValueError("Slew rate cannot be negative")
+        self._slew = rate
+        self._step_ns = int(1e9 / (rate * MAX_VALUE)) if rate else 0  # Time per duty cycle count
+        self._max_step = max(1, int(rate * MAX_VALUE * HALOGEN_STEP))  # Counts per write
+
+    def set(self, setpoint: int, blank: bool = False):
+        """
+        Head for a new setpoint. Only rises are slewed, and a new rise writes its first step
+        here: a lower duty cycle, and `blank` for the safety paths, go out at once.
+        """
+        target = 0 if blank else self.curve.duty(setpoint)
+        if target == self.target and not self.ramping:
+            return
+        self.target = target
+        if not self._step_ns or target <= self.duty:
+            self.ramping = False
+            self._write(target)
+            return
+        if not self.ramping:
+            self.ramping = True
+            self._last_ns = self.clock()
+            self._step(self._max_step)
+            return
+        self.service()
+
+    def service(self):
+        """
+        Raise the duty cycle toward the target as far as the slew limit allows by now, by at
+        most one HALOGEN_STEP. After a longer gap the ramp carries on from now instead of
+        catching up.
+        """
+        if not self.ramping:
+            return
+        now = self.clock()
+        steps = (now - self._last_ns) // self._step_ns
+        if steps <= 0:
+            return
+        if steps > self._max_step:
+            steps = self._max_step
+            self._last_ns = now
+        else:
+            self._last_ns += steps * self._step_ns
+        self._step(steps)
+
+    # Raises the duty cycle by up to `steps` counts toward the target
+    def _step(self, steps: int):
+        duty = min(self.target, self.duty + steps)
+        self.ramping = duty != self.target
+        self._write(duty)
+
+    def _write(self, duty: int):
+        bands = self.bands
+        band = self.band
+        if band < 0 or duty > bands[band][0] + self._hysteresis or (
+                band > 0 and duty < bands[band - 1][0] - self._hysteresis):
+            band = 0
+            while band < len(bands) - 1 and duty > bands[band][0]:
+                band += 1
+        if band != self.band:
+            self.band = band
+            if self.pwm.frequency != bands[band][1]:
+                self.pwm.frequency = bands[band][1]
+        self.duty = duty
+        self.pwm.duty_cycle = duty
@@ -0,0 +1,25 @@
+# lib/hardware.py
+# Hardware backend selection
+#
+# On the Pico this re-exports the CircuitPython modules and Adafruit drivers. Under CPython it
+# exports the simulated devices from sim_hardware instead, so SolarSimulator, the modes and
+# utils run unchanged on a desktop. The choice is made from the interpreter, never from a
+# failed import, so a Pico with a missing library fails loudly instead of simulating.
+
+import sys
+
+SIMULATED = sys.implementation.name != "circuitpython"
+
+if SIMULATED:
+    from .sim_hardware import board, I2C, PWMOut, MCP4728, ADS1015, AnalogIn, supervisor, usb_cdc
+    from .sim_hardware import Counter, Edge
+else:
+    import board
+    import supervisor
+    import usb_cdc
+    from busio import I2C
+    from pwmio import PWMOut
+    from countio import Counter, Edge
+    from adafruit_mcp4728 import MCP4728  # 12-bit DAC
+    from adafruit_ads1x15.ads1015 import ADS1015  # 4-channel ADC
+    from adafruit_ads1x15.analog_in import AnalogIn
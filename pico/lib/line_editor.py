@@ -0,0 +1,121 @@
+# lib/line_editor.py
+# Non-blocking console line editor
+#
+# poll() drains every byte waiting on the console into a preallocated buffer, handles
+# backspace and Ctrl-C, and hands each completed line to the current handler. Modes call it
+# from a scheduler task, so a typed command reaches the lights within one input tick and
+# nothing else reads the console behind its back. The CircuitPython console does not echo
+# sys.stdin reads, so the editor echoes on the Pico; a desktop terminal echoes by itself.
+
+import sys
+import time
+from .hardware import supervisor, SIMULATED
+
+
+class LineEditor:
+    """
+    Console input as whole lines, without blocking. `handler(line)` gets each line, stripped;
+    when it returns False, poll() returns False too, which stops a Scheduler task.
+    """
+    def __init__(self, capacity: int = 80, handler=None):
+        self.buffer = bytearray(capacity)
+        self.length = 0
+        self.handler = handler
+        self.prompt = ""
+        self._overflow = False
+        self._last_cr = False
+
+    def clear(self):
+        self.length = 0
+        self._overflow = False
+
+    def show_prompt(self):
+        """
+        Print the prompt and the part of the line typed so far, e.g. after a status line.
+        """
+        print(self.prompt, end="")
+        if not SIMULATED and self.length:
+            print(str(self.buffer[:self.length], "ascii"), end="")
+        if SIMULATED:
+            sys.stdout.flush()
+
+    def poll(self) -> bool:
+        """
+        Take every waiting byte and dispatch the completed lines. Raises KeyboardInterrupt on
+        Ctrl-C, or when the console is closed (end of a piped input on a desktop).
+        """
+        buffer = self.buffer
+        while supervisor.runtime.serial_bytes_available:
+            c = sys.stdin.read(1)
+            if c == "":
+                raise KeyboardInterrupt  # Nothing more will arrive
+            if c == '\x03':  # Ctrl-C
+                print("\nCtrl-C detected.")
+                raise KeyboardInterrupt
+            if c == '\n' or c == '\r':
+                if c == '\n' and self._last_cr:
+                    self._last_cr = False
+                    continue  # The second half of a CR LF
+                self._last_cr = c == '\r'
+                if self._finish_line() is False:
+                    return False
+                continue
+            self._last_cr = False
+            if c == '\x08' or c == '\x7f':  # Backspace
+                if self.length:
+                    self.length -= 1
+                    if not SIMULATED:
+                        print("\b \b", end="")
+                continue
+            code = ord(c)
+            if code < 32 or code > 126:
+                continue  # Control and non-ASCII characters are not part of any command
+            if self.length < len(buffer):
+                buffer[self.length] = code
+                self.length += 1
+                if not SIMULATED:
+                    print(c, end="")
+            else:
+                self._overflow = True
+        return True
+
+    def read_line(self, prompt: str, idle) -> str:
+        """
+        Like input(), but keeps calling idle() (e.g. the safety monitor's service()) while it
+        waits for the line instead of blocking.
+        """
+        line = [""]
+
+        def take(text):
+            line[0] = text
+            return False
+
+        previous = self.handler, self.prompt
+        self.handler = take
+        self.prompt = prompt
+        self.clear()
+        self.show_prompt()
+        try:
+            while self.poll():
+                idle()
+                time.sleep(0.001)
+        finally:
+            self.handler, self.prompt = previous
+        return line[0]
+
+    def _finish_line(self):
+        if not SIMULATED:
+            print()
+        if self._overflow:
+            print(f"Line longer than {len(self.buffer)} characters ignored.")
+            self.clear()
+            return True
+        line = str(self.buffer[:self.length], "ascii").strip()
+        self.clear()
+        if self.handler is None:
+            return True
+        if self.handler(line) is False:
+            return False
+        if self.prompt:
+            self.show_prompt()
+        return True
@@ -0,0 +1,209 @@
+# lib/measurement.py
+# High-rate photodiode capture for Measurement Mode
+#
+# The ADS1015 is put in continuous mode on the photodiode input at its top data rate with the
+# comparator off, and the conversion register is selected once. Each sample is then a single
+# 2-byte read, with no config write and no conversion wait, so a 400kHz bus keeps up with the
+# 3300 samples per second the ADC produces. Samples go into preallocated arrays used as a ring,
+# each with its time, ADS channel and the tag of the setpoints active when it was taken.
+# Thermistor codes from every safety check go into the same ring, on their own channels.
+#
+# The safety check reads the thermistors through the Adafruit driver, which leaves the ADC in
+# single-shot mode (and the thermal alert, if enabled, on a thermistor). The recorder must be
+# armed again after every check; the comparator alert is not active while it is recording.
+#
+# A setpoint change marked as a trigger records a fixed number of samples after it and then
+# freezes the ring, like an oscilloscope, so the step is still in the buffer when it is dumped.
+#
+# The dump layout and its decoder are in lib/measurement_format.py.
+
+import struct
+from array import array
+from binascii import crc32
+from time import monotonic_ns
+from .thermal_alert import REG_CONFIG, CONFIG_MUX_SINGLE, ADS_PGA, ADS1015_DATA_RATE
+from .solar_simulator import PHOTODIODE_CHANNEL
+from .measurement_format import (DUMP_MAGIC, DUMP_VERSION, DUMP_HEADER, SETPOINT_RECORD,
+                                 SETPOINT_SLOTS, SETPOINT_CHANNELS)
+
+REG_CONVERSION = 0x00
+CONFIG_COMP_DISABLE = 0x0003  # Mode bit clear: continuous conversions
+
+
+class MeasurementRecorder:
+    """
+    Records one head's photodiode at the ADS1015's continuous rate into a preallocated ring,
+    with the thermistor codes of each safety check and a tag for the active setpoints.
+    """
+    def __init__(self, sim, head: int = 0, capacity: int = 4096, data_rate: int = 3300,
+                 post_trigger: float = 0.75):
+        if data_rate not in ADS1015_DATA_RATE:
+            raise ValueError(f"ADS1015 data rate must be one of {tuple(ADS1015_DATA_RATE)}")
+        self.sim = sim
+        self.head = sim.heads[head]
+        self.capacity = capacity
+        self.data_rate = data_rate
+        self.post_trigger = int(capacity * post_trigger)  # Samples kept after a trigger
+        self.period_ns = 1000000000 // data_rate
+        self.times = array('I', [0] * capacity)
+        self.codes = array('h', [0] * capacity)
+        self.channels = bytearray(capacity)
+        self.tags = bytearray(capacity)
+        self.setpoint_times = array('I', [0] * SETPOINT_SLOTS)
+        self.setpoints = array('H', [0] * (SETPOINT_SLOTS * SETPOINT_CHANNELS))
+        self._config = bytearray(3)
+        self._pointer = bytearray((REG_CONVERSION,))
+        self._read = bytearray(2)
+        self.tag = 0
+        self.clear()
+
+    def clear(self):
+        """
+        Empty the ring and the setpoint log and start recording again. The active setpoints
+        stay logged, as tag 0.
+        """
+        base = self.tag * SETPOINT_CHANNELS
+        active = self.setpoints[base:base + SETPOINT_CHANNELS]
+        self.index = 0          # Next slot to write
+        self.count = 0          # Filled slots
+        self.samples = 0        # Photodiode samples since the last clear()
+        self.missed = 0         # Sample periods skipped because the loop was late
+        self.bus_ns = 0         # Time spent in sample reads
+        self.frozen = False
+        self.marks = 0          # Setpoints logged since the last clear()
+        self._remaining = 0     # Samples until the ring freezes, 0 when not triggered
+        self._next_ns = 0
+        self._rate_samples = 0
+        self._rate_ns = monotonic_ns()
+        self.mark_setpoint(*active, trigger=False)
+
+    def arm(self):
+        """
+        Start continuous conversions of the photodiode and select the conversion register.
+        Call it again after anything else has used the ADC, e.g. a safety check.
+        """
+        head = self.head
+        ads = head.ads
+        config = (CONFIG_MUX_SINGLE | (PHOTODIODE_CHANNEL << 12) | ADS_PGA[ads.gain]
+                  | ADS1015_DATA_RATE[self.data_rate] | CONFIG_COMP_DISABLE)
+        frame = self._config
+        frame[0] = REG_CONFIG
+        frame[1] = config >> 8
+        frame[2] = config & 0xFF
+        start = monotonic_ns()
+        with ads.i2c_device as i2c:
+            i2c.write(frame)
+            i2c.write(self._pointer)
+        head.scheduler.record(start)
+        self._next_ns = monotonic_ns() + self.period_ns  # The first conversion is not ready yet
+
+    def service(self, now: int) -> bool:
+        """
+        Take a photodiode sample if one is due at `now` (monotonic_ns()). Returns True if it did.
+        """
+        if self.frozen or now < self._next_ns:
+            return False
+        with self.head.ads.i2c_device as i2c:
+            i2c.readinto(self._read)
+        done = monotonic_ns()
+        self.bus_ns += done - now
+        read = self._read
+        code = (read[0] << 8) | read[1]
+        if code & 0x8000:
+            code -= 0x10000
+        self._store(now, PHOTODIODE_CHANNEL, code >> 4)
+        self.samples += 1
+
+        self._next_ns += self.period_ns
+        if done - self._next_ns > self.period_ns:
+            self.missed += (done - self._next_ns) // self.period_ns
+            self._next_ns = done + self.period_ns
+        if self._remaining:
+            self._remaining -= 1
+            if not self._remaining:
+                self.frozen = True
+        return True
+
+    def record_thermistors(self):
+        """
+        Store the thermistor codes of the head's latest safety check.
+        """
+        if self.frozen:
+            return
+        sampler = self.head.thermistors
+        now = monotonic_ns()
+        for i in range(len(sampler.raw)):
+            self._store(now, i, sampler.raw[i])
+
+    def mark_setpoint(self, v: int, w: int, c: int, uv: int, h: int, trigger: bool = True):
+        """
+        Log newly applied setpoints; the samples after this carry their tag. With `trigger`,
+        the ring freezes `post_trigger` samples later.
+        """
+        self.tag = self.marks % SETPOINT_SLOTS
+        self.marks += 1
+        self.setpoint_times[self.tag] = (monotonic_ns() // 1000) & 0xFFFFFFFF
+        base = self.tag * SETPOINT_CHANNELS
+        values = self.setpoints
+        values[base] = v
+        values[base + 1] = w
+        values[base + 2] = c
+        values[base + 3] = uv
+        values[base + 4] = h
+        if trigger:
+            if self.frozen:
+                self.frozen = False
+                self._next_ns = monotonic_ns()  # Sampling stopped while frozen, nothing was missed
+            self._remaining = self.post_trigger
+
+    def dump(self, serial) -> int:
+        """
+        Write the setpoint log and the ring, oldest sample first, to a serial port (or any
+        object with write()). Returns the number of bytes written.
+        """
+        setpoints = min(self.marks, SETPOINT_SLOTS)
+        full_scale = self.head.thermistors.table.full_scale
+        header = struct.pack(DUMP_HEADER, DUMP_MAGIC, DUMP_VERSION, self.data_rate, self.count,
+                             setpoints, full_scale / 2047, self.sim.photodiode_volts_per_sun)
+        crc = crc32(header)
+        serial.write(header)
+        written = len(header)
+        record = bytearray(struct.calcsize(SETPOINT_RECORD))
+        for i in range(setpoints):
+            base = i * SETPOINT_CHANNELS
+            values = self.setpoints
+            struct.pack_into(SETPOINT_RECORD, record, 0, self.setpoint_times[i], values[base],
+                             values[base + 1], values[base + 2], values[base + 3], values[base + 4])
+            crc = crc32(record, crc)
+            serial.write(record)
+            written += len(record)
+
+        start = self.index if self.count == self.capacity else 0
+        for column, itemsize in ((self.times, 4), (self.codes, 2), (self.channels, 1), (self.tags, 1)):
+            view = memoryview(column)
+            for part in (view[start:self.count], view[:start]):
+                if len(part):
+                    crc = crc32(part, crc)
+                    serial.write(part)
+                    written += len(part) * itemsize
+        serial.write(struct.pack("<I", crc & 0xFFFFFFFF))
+        return written + 4
+
+    def report(self) -> str:
+        now = monotonic_ns()
+        rate = (self.samples - self._rate_samples) * 1e9 / max(1, now - self._rate_ns)
+        self._rate_samples = self.samples
+        self._rate_ns = now
+        state = "frozen" if self.frozen else ("triggered" if self._remaining else "recording")
+        return (f"measurement: {rate:.0f} samples/s of {self.data_rate}, {self.count}/{self.capacity} "
+                f"in the ring, {self.missed} missed, {self.marks} setpoints, {state}")
+
+    def _store(self, now: int, channel: int, code: int):
+        i = self.index
+        self.times[i] = (now // 1000) & 0xFFFFFFFF
+        self.codes[i] = code
+        self.channels[i] = channel
+        self.tags[i] = self.tag
+        self.index = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
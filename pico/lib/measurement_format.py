@@ -0,0 +1,83 @@
+# lib/measurement_format.py
+# Measurement Mode dump format
+#
+# Dump layout, little-endian:
+#   header (DUMP_HEADER) | setpoints: count x (uint32 t_us, 5 uint16 in setLEDs() order) |
+#   sample times: uint32 t_us | codes: int16 12-bit ADC codes | channels: uint8 ADS inputs |
+#   tags: uint8 setpoint index | CRC32 of everything before it (uint32)
+# The sample columns are in time order, oldest first. Times are wrapping microsecond counters.
+# This module only needs the standard library, so host scripts can decode dumps without the
+# device stack that lib/measurement.py pulls in.
+
+import struct
+from binascii import crc32
+
+DUMP_MAGIC = b"SSMD"
+DUMP_VERSION = 1
+# Magic, version, data rate, sample count, setpoint count, volts per ADC code and photodiode
+# volts per sun
+DUMP_HEADER = "<4sHHIHff"
+SETPOINT_RECORD = "<I5H"
+SETPOINT_SLOTS = 256  # Setpoint changes kept, tags are one byte
+SETPOINT_CHANNELS = 5
+
+
+def decode_dump(data):
+    """
+    Decode a dump into (info, setpoints, samples): info is a dict of the header fields,
+    setpoints a list of (t_us, (v, w, c, uv, h)) indexed by tag, and samples a list of
+    (t_us, channel, code, tag), oldest first. Raises ValueError if the dump is damaged.
+    """
+    size = struct.calcsize(DUMP_HEADER)
+    magic, version, data_rate, count, setpoint_count, volts_per_code, volts_per_sun = \
+        struct.unpack_from(DUMP_HEADER, data, 0)
+    if magic != DUMP_MAGIC or version != DUMP_VERSION:
+        raise ValueError("Not a measurement dump of a known version")
+    record = struct.calcsize(SETPOINT_RECORD)
+    end = size + setpoint_count * record + count * 8
+    if len(data) < end + 4:
+        raise ValueError(f"Dump truncated: {len(data)} of {end + 4} bytes")
+    if crc32(data[:end]) & 0xFFFFFFFF != struct.unpack_from("<I", data, end)[0]:
+        raise ValueError("Dump CRC mismatch")
+
+    setpoints = []
+    offset = size
+    for _ in range(setpoint_count):
+        fields = struct.unpack_from(SETPOINT_RECORD, data, offset)
+        setpoints.append((fields[0], fields[1:]))
+        offset += record
+    times = struct.unpack_from(f"<{count}I", data, offset)
+    offset += 4 * count
+    codes = struct.unpack_from(f"<{count}h", data, offset)
+    offset += 2 * count
+    channels = data[offset:offset + count]
+    tags = data[offset + count:offset + 2 * count]
+    samples = [(times[i], channels[i], codes[i], tags[i]) for i in range(count)]
+    info = {"data_rate": data_rate, "volts_per_code": volts_per_code, "volts_per_sun": volts_per_sun}
+    return info, setpoints, samples
+
+
+def rise_time(samples, tag: int, channel: int = 3):
+    """
+    10-90% rise (or fall) time in microseconds of `channel` after the setpoints with `tag`,
+    from the last sample before them to the last sample with them. Returns None if the
+    recording does not cover the step.
+    """
+    before = [s[2] for s in samples if s[1] == channel and s[3] != tag]
+    after = [(s[0], s[2]) for s in samples if s[1] == channel and s[3] == tag]
+    if not before or len(after) < 2 or after[-1][1] == before[-1]:
+        return None
+    start, end = before[-1], after[-1][1]
+    low = start + 0.1 * (end - start)
+    high = start + 0.9 * (end - start)
+    rising = end > start
+    t10 = t90 = None
+    for t, code in after:
+        if t10 is None and (code >= low if rising else code <= low):
+            t10 = t
+        if code >= high if rising else code <= high:
+            t90 = t
+            break
+    if t10 is None or t90 is None:
+        return None
+    return (t90 - t10) & 0xFFFFFFFF
@@ -1,21 +1,32 @@
 # lib/modes/auto_mode.py
 
-from ulab import numpy as np
 import time
 from ..utils import (
-    calculate_light_intensity,
+    get_intensity_table,
     display_status,
-    check_temperature,
     check_for_interrupt
 )
+from ..scheduler import Scheduler
+from ..safety import SafetyMonitor
+from ..gc_monitor import gc_monitor
+from ..waveform import Sine, trapezoid, load_keyframes
 
 class AutoMode:
     """
     Implements the Auto Mode functionality.
+    Lights, thermal safety, console input and status each run as their own scheduled task.
+    The lights follow a waveform (lib/waveform.py), interpolated at every light update.
     """
-    def __init__(self, sim):
+    def __init__(self, sim, light_rate=100, thermal_rate=20, input_rate=10, status_rate=2):
         self.sim = sim
         self.peak = 0.5  # Default peak intensity
+        self.pass_duration = 101  # Seconds per sine pass
+        self.eclipse = (10, 60, 10, 20)  # Eclipse rise, hold, fall and dark seconds
+        self.profile_path = "/profile.csv"  # Keyframe file for the uploaded profile
+        self.light_rate = light_rate      # Setpoint updates per second
+        self.thermal_rate = thermal_rate  # Thermal safety checks per second
+        self.input_rate = input_rate      # Console input polls per second
+        self.status_rate = status_rate    # Status lines per second
 
     def run(self):
         print("Entering Auto Mode")
@@ -29,44 +40,55 @@ class AutoMode:
             print("Invalid input. Please enter a number between 0 and 1.")
             return
 
-        # Generate a sine wave pattern
-        wave = np.sin(np.linspace(0, np.pi, 101))
-        level = 0  # Initialize wave level index
-
-        try:
-            while True:
-                if check_temperature(self.sim):
-                    # Calculate current intensity factor
-                    intensity_factor = wave[level] * self.peak
-
-                    # Calculate light intensities
-                    intensity_values = calculate_light_intensity(intensity_factor)
+        wave = self.select_waveform()
+        if wave is None:
+            return
+        table = get_intensity_table()
+        # Table rows per unit of wave value, scaled by the peak once instead of every tick
+        scale = self.peak * (table.levels - 1)
+        wave.start()
 
-                    # Scale values to PWM range (0 to 65535)
-                    violet = int(intensity_values["Violet"] * 655)
-                    white = int(intensity_values["White"] * 655)
-                    cyan = int(intensity_values["Cyan"] * 655)
-                    halogen = int(intensity_values["Halogen"] * 655)
-                    uv = int(intensity_values["UV"] * 655)  # (**abandon**)
+        def update_lights():
+            gc_monitor.tick()
+            # Wave value from the elapsed time, so the profile does not depend on the task rate
+            row = int(wave.value_at(time.monotonic_ns()) * scale + 0.5)
+            violet, white, cyan, uv, halogen = table.levels_at(row)
+            self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
 
-                    # Set LED intensities
-                    self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
-                    self.sim.current_light_settings = {
-                        'v': violet,
-                        'w': white,
-                        'c': cyan,
-                        'uv': uv,  # (**abandon**)
-                        'h': halogen
-                    }
-                    # Update level index for sine wave
-                    level = (level + 1) % len(wave)
+        # Fresh reading every check; the status task reuses it through the snapshot
+        safety = SafetyMonitor(self.sim, rate=self.thermal_rate)
 
-                    check_for_interrupt()
-                    display_status(self.sim)
-                    time.sleep(1)
-                else:
-                    print("Temperature too high! Lights turned off for safety.")
-                    break
+        scheduler = Scheduler()
+        scheduler.add("lights", update_lights, self.light_rate)
+        safety.attach(scheduler)
+        scheduler.add("input", check_for_interrupt, self.input_rate)
+        scheduler.add("status", lambda: display_status(self.sim), self.status_rate)
+        try:
+            scheduler.run()
         except KeyboardInterrupt:
             print("\nExiting Auto Mode.")
             self.sim.setLEDs(0, 0, 0, 0, 0)
+        print(safety.report())
+        print(self.sim.busReport())
+
+    def select_waveform(self):
+        """
+        Ask for the light profile. Returns the waveform, or None if it could not be built.
+        """
+        choice = input(f"Profile: 1 sine pass ({self.pass_duration}s), 2 eclipse, "
+                       f"3 keyframes from {self.profile_path} [1]: ").strip()
+        try:
+            if choice in ("", "1"):
+                return Sine(self.pass_duration)
+            if choice == "2":
+                return trapezoid(*self.eclipse)
+            if choice == "3":
+                wave = load_keyframes(self.profile_path)
+                print(f"Loaded {len(wave.times)} keyframes, {wave.period}s period")
+                return wave
+            print("Invalid input. Please enter 1, 2 or 3.")
+        except OSError:
+            print(f"Cannot read {self.profile_path}")
+        except ValueError as e:
+            print(f"Invalid profile: {e}")
+        return None
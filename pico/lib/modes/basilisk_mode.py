@@ -1,10 +1,16 @@
 # lib/modes/basilisk_mode.py
 
-import time
-import supervisor
+from ..hardware import supervisor
 import sys
-from lib.modes.manual_mode import check_for_interrupt, check_temperature, display_status
-from ..utils import calculate_light_intensity
+from ..utils import get_intensity_table, check_for_interrupt, display_status
+from ..setpoint_link import SetpointLink
+from ..playback import SetpointQueue, ScheduledPlayback
+from ..scheduler import Scheduler
+from ..safety import SafetyMonitor
+from ..profiler import profiler
+from ..gc_monitor import gc_monitor
+
+STAGE_PARSE = profiler.stage("serial parse")
 
 
 class BasiliskMode:
@@ -12,54 +18,116 @@ class BasiliskMode:
     Implements the Basilisk Mode functionality with UART communication for CircuitPython.
     """
 
-    def __init__(self, sim):
+    def __init__(self, sim, light_rate=500, thermal_rate=20, input_rate=10, status_rate=1,
+                 setpoint_timeout=2.0, text_setpoint_timeout=0):
         self.sim = sim
+        self.light_rate = light_rate      # Link (or text line) polls and playback checks per second
+        self.thermal_rate = thermal_rate  # Thermal safety checks per second
+        self.input_rate = input_rate      # Console input polls per second (binary mode)
+        self.status_rate = status_rate    # Status lines per second
+        self.setpoint_timeout = setpoint_timeout  # Seconds without setpoints before the lights are blanked, 0 to disable
+        self.text_setpoint_timeout = text_setpoint_timeout  # The same for the text protocol, off by default
 
     def run(self):
-        print("Entering Basilisk Mode, wait for data input")
-        pre_data = None
-        data = None
-        buffer = ""
+        link = SetpointLink.open(queue=SetpointQueue())
+        if link is None:
+            self.run_text()
+        else:
+            self.run_binary(link)
+
+    def run_binary(self, link):
+        """
+        Apply binary setpoint frames from the usb_cdc data channel. Immediate frames are applied
+        as soon as they arrive, timed frames at their deadline through the playback queue.
+        The console stays free for status and log output.
+        """
+        print("Entering Basilisk Mode, waiting for setpoint frames on the data serial port")
+        setpoints = link.setpoints
+        playback = ScheduledPlayback(self.sim, link.queue)
+        safety = SafetyMonitor(self.sim, rate=self.thermal_rate, setpoint_timeout=self.setpoint_timeout)
+        frames = [link.frames]
+
+        def update_lights():
+            gc_monitor.tick()
+            immediate = link.poll()
+            if link.frames != frames[0]:
+                frames[0] = link.frames
+                safety.feed()
+            if immediate:
+                self.sim.setLEDs(v=setpoints[0], w=setpoints[1], c=setpoints[2],
+                                 uv=setpoints[3], h=setpoints[4])
+            playback.service()
+
+        def status():
+            display_status(self.sim)
+            print(f"BasiliskMode: frames={link.frames} lost={link.lost} crc_errors={link.crc_errors} "
+                  f"| playback: {playback.report()}")
+
+        scheduler = Scheduler()
+        scheduler.add("lights", update_lights, self.light_rate)
+        safety.attach(scheduler)
+        scheduler.add("input", check_for_interrupt, self.input_rate)
+        scheduler.add("status", status, self.status_rate)
         try:
-            while True:
-                if supervisor.runtime.serial_bytes_available:
-                    data = sys.stdin.read(1)
-                    # print(f"data received: {repr(data)}")
-                    buffer += data
-
-                    if "\n" in buffer:
-                        line, buffer = buffer.split("\n", 1)
-                        line = line.replace("\x00", "").strip()
-                        # print(f"Raw data received: {line}")
+            scheduler.run()
+        except KeyboardInterrupt:
+            print("Keyboard interrupt caught, exiting Basilisk Mode loop.")
+            self.sim.setLEDs(0, 0, 0, 0, 0)
+
+        print(safety.report())
+        print(self.sim.busReport())
+        print("Exiting Basilisk Mode.")
+
+    def run_text(self):
+        """
+        Read one intensity (0-100) per line from the console.
+        """
+        print("Entering Basilisk Mode, wait for data input")
+        table = get_intensity_table()
+        # Text hosts may send only on change, so the watchdog is opt-in here
+        safety = SafetyMonitor(self.sim, rate=self.thermal_rate, setpoint_timeout=self.text_setpoint_timeout)
+        buffer = [""]
+
+        def read_lines():
+            gc_monitor.tick()
+            # Take what has arrived, up to a bounded number of characters per call
+            for _ in range(64):
+                if not supervisor.runtime.serial_bytes_available:
+                    return
+                data = sys.stdin.read(1)
+                # print(f"data received: {repr(data)}")
+                if data != "\n":
+                    buffer[0] += data
+                    continue
+                with profiler.time(STAGE_PARSE):
+                    line = buffer[0].replace("\x00", "").strip()
+                    buffer[0] = ""
+                    # print(f"Raw data received: {line}")
+                    try:
                         intensity = int(line)
+                    except ValueError:
+                        print(f"Invalid intensity value received: {line}")
+                        continue
 
-                        if 0 <= intensity <= 100:
-                            intensity_values = calculate_light_intensity(intensity / 100)
-                            violet = int(intensity_values["Violet"] * 655)
-                            white = int(intensity_values["White"] * 655)
-                            cyan = int(intensity_values["Cyan"] * 655)
-                            halogen = int(intensity_values["Halogen"] * 655)
-                            uv = int(intensity_values["UV"] * 655)  # (**abandon**)
-
-                            self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
-                            self.sim.current_light_settings = {
-                                'v': violet,
-                                'w': white,
-                                'c': cyan,
-                                'uv': uv,  # (**abandon**)
-                                'h': halogen
-                            }
-
-                            print(f"BasiliskMode: Intensity={intensity}", end="\n")
-                            check_temperature(self.sim)
-                            display_status(self.sim)
-                        else:
-                            print(f"Invalid intensity value received: {intensity}")
-
-                        time.sleep(0.1)
-                        buffer = ""
+                if 0 <= intensity <= 100:
+                    level = intensity * (table.levels - 1) // 100
+                    violet, white, cyan, uv, halogen = table.levels_at(level)
+                    safety.feed()
+                    self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
+                    print(f"BasiliskMode: Intensity={intensity}", end="\n")
+                else:
+                    print(f"Invalid intensity value received: {intensity}")
 
+        scheduler = Scheduler()
+        scheduler.add("lines", read_lines, self.light_rate)
+        safety.attach(scheduler)
+        scheduler.add("status", lambda: display_status(self.sim), self.status_rate)
+        try:
+            scheduler.run()
         except KeyboardInterrupt:
             print("Keyboard interrupt caught, exiting Basilisk Mode loop.")
+            self.sim.setLEDs(0, 0, 0, 0, 0)
 
+        print(safety.report())
+        print(self.sim.busReport())
         print("Exiting Basilisk Mode.")
@@ -0,0 +1,91 @@
+# lib/modes/irradiance_mode.py
+
+import time
+from ..utils import (
+    get_intensity_table,
+    display_status,
+    check_for_interrupt
+)
+from ..controller import PIDController
+from ..safety import SafetyMonitor
+from ..scheduler import Scheduler
+from ..gc_monitor import gc_monitor
+from ..solar_simulator import DERATE_ONE
+
+class IrradianceMode:
+    """
+    Holds a commanded irradiance by closing a PID loop on the photodiode.
+    The controller output is the overall intensity fraction, applied through the intensity
+    table, so the spectral mix stays calibrated while feedback corrects the total for LED drift.
+    """
+    def __init__(self, sim, control_rate=50, thermal_rate=20, input_rate=10, status_rate=1,
+                 kp=0.2, ki=1.0, kd=0.0, max_rate=0.5):
+        self.sim = sim
+        self.control_rate = control_rate  # Photodiode samples and controller updates per second
+        self.thermal_rate = thermal_rate  # Thermal safety checks per second
+        self.input_rate = input_rate      # Console input polls per second
+        self.status_rate = status_rate    # Status lines per second
+        # Output is the intensity fraction; max_rate limits how fast it may change per second
+        self.controller = PIDController(kp, ki, kd, out_min=0.0, out_max=1.0, max_rate=max_rate)
+        self.target = 0.0      # Commanded irradiance in suns
+        self.irradiance = 0.0  # Last photodiode reading in suns
+
+    def run(self):
+        print("Entering Irradiance Mode")
+        target_input = input("Please enter the target irradiance in suns (1.0 = AM0): ")
+        try:
+            self.target = float(target_input)
+            if self.target < 0:
+                raise ValueError("Irradiance cannot be negative.")
+            print(f"Target irradiance set to: {self.target} suns")
+        except ValueError:
+            print("Invalid input. Please enter a number of suns, 0 or more.")
+            return
+
+        table = get_intensity_table()
+        controller = self.controller
+        controller.reset()
+        max_dt = 2 / self.control_rate  # Longer gaps (e.g. a thermal shutdown) count as two periods
+        self._last_ns = time.monotonic_ns()
+        held = [False]
+
+        def control():
+            gc_monitor.tick()
+            now = time.monotonic_ns()
+            self.irradiance = self.sim.readIrradiance()
+            dt = min((now - self._last_ns) / 1e9, max_dt)
+            self._last_ns = now
+            scale = self.sim.outputScale()
+            if scale == 0:
+                # Blanked (thermal shutdown, watchdog or alert): the photodiode reads dark, so
+                # hold the loop instead of driving the output and integral up to full
+                held[0] = True
+                return
+            if held[0]:
+                held[0] = False
+                controller.reset(controller.output)  # Resume from the output held before the blank
+            # While derated the output cannot raise the light, so treat it as saturated
+            ceiling = controller.output if scale < DERATE_ONE else None
+            output = controller.update(self.target, self.irradiance, dt, ceiling)
+            violet, white, cyan, uv, halogen = table.levels_for(output)
+            self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
+
+        safety = SafetyMonitor(self.sim, rate=self.thermal_rate)
+
+        def status():
+            display_status(self.sim)
+            print(f"Irradiance: target {self.target:.3f} suns, measured {self.irradiance:.3f} suns, "
+                  f"output {controller.output:.3f}" + (" (limited)" if controller.saturated else ""))
+
+        scheduler = Scheduler()
+        scheduler.add("control", control, self.control_rate)
+        safety.attach(scheduler)
+        scheduler.add("input", check_for_interrupt, self.input_rate)
+        scheduler.add("status", status, self.status_rate)
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            print("\nExiting Irradiance Mode.")
+            self.sim.setLEDs(0, 0, 0, 0, 0)
+        print(safety.report())
+        print(self.sim.busReport())
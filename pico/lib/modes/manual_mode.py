@@ -1,22 +1,38 @@
 # lib/modes/manual_mode.py
 
-import time
-import sys
-import supervisor
-from ulab import numpy as np
+from time import monotonic_ns
+from ..hardware import usb_cdc
 from ..utils import (
-    calculate_light_intensity,
+    get_intensity_table,
     display_status,
-    check_temperature,
-    check_for_interrupt
+    console,
+    console_command
 )
+from ..scheduler import Scheduler
+from ..safety import SafetyMonitor
+from ..gc_monitor import gc_monitor
+from ..measurement import MeasurementRecorder
+from ..sweep import ChannelSweep, parse_levels
+
+CHANNEL_INDEX = {'v': 0, 'w': 1, 'c': 2, 'h': 4}  # Light command letters, setLEDs() order
+LIGHT_COMMANDS_HELP = ("Enter violet, white, cyan and halogen percentages (0-100) as 4 numbers, e.g. '20 30 10 50',\n"
+                       "or one channel as 'v 20', 'w 30', 'c 10' or 'h 50'. Type 'off' for all off.")
 
 class ManualMode:
     """
     Implements the Manual Mode functionality.
+    Each submode takes commands from the shared console line editor while the lights stay
+    under thermal supervision, so a command changes the lights within one input tick.
     """
-    def __init__(self, sim):
+    def __init__(self, sim, thermal_rate=20, input_rate=50, status_rate=1, measurement_samples=4096,
+                 sweep_rate=200):
         self.sim = sim
+        self.measurement_samples = measurement_samples  # Ring length of Measurement Mode, 8 bytes each
+        self.sweep_rate = sweep_rate  # Channel sweep photodiode samples per second during a dwell
+        self.thermal_rate = thermal_rate  # Thermal safety checks per second
+        self.input_rate = input_rate      # Console drains per second, the worst-case command latency
+        self.status_rate = status_rate    # Status lines per second
+        self.safety = SafetyMonitor(sim, rate=thermal_rate)
 
     def run(self):
         print("Entering Manual Mode")
@@ -26,12 +42,13 @@ class ManualMode:
         print("3. Wave Mode")
         print("4. Measurement Mode")
         print("5. Fine-Tuning Adjustment")
+        print("6. Channel Sweep")
         while True:
-            choice = input("Your choice (input 1, 2, 3, 4, or 5): ")
-            if choice in ["1", "2", "3", "4", "5"]:
+            choice = console.read_line("Your choice (input 1, 2, 3, 4, 5 or 6): ", self.safety.service)
+            if choice in ["1", "2", "3", "4", "5", "6"]:
                 break
             else:
-                print("Invalid input. Please enter 1, 2, 3, 4, or 5.")
+                print("Invalid input. Please enter 1, 2, 3, 4, 5 or 6.")
 
         if choice == '1':
             self.fixed_preset_mode()
@@ -43,144 +60,251 @@ class ManualMode:
             self.measurement_mode()
         elif choice == '5':
             self.fine_tuning_adjustment()
+        elif choice == '6':
+            self.channel_sweep()
 
     def fixed_preset_mode(self):
         """
-        Fixed Preset Mode
+        Fixed Preset Mode: each entered intensity (0 to 1) is applied through the intensity table.
         """
-        print("Enter an initial intensity value (0 to 1).")
+        print("Enter an intensity (0 to 1) at any time to set the lights.")
         print("Type 'exit' to return to the main menu.")
+        table = get_intensity_table()
 
-        while True:
-            user_input = input("Please enter initial intensity (default is 0.0): ").strip()
+        def command(line):
+            if line.lower() == 'exit':
+                return False
+            if not line or console_command(line):
+                return
+            try:
+                intensity = float(line)
+            except ValueError:
+                print("Invalid input. Please enter a numeric value.")
+                return
+            if not (0 <= intensity <= 1):
+                print("Invalid intensity. Please enter a value between 0 and 1.")
+                return
+            violet, white, cyan, uv, halogen = table.levels_for(intensity)
+            self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
+            print(f"Current intensity: {intensity:.2f}")
+
+        self._run_commands(command, "Intensity (0 to 1): ")
+
+    def manual_light_adjustment(self):
+        """
+        Manual Light Source Adjustment: set channels directly as percentages (0-100).
+        """
+        print(LIGHT_COMMANDS_HELP)
+        print("Type 'exit' to return to the main menu.")
+        percents = [0.0] * 5  # setLEDs() order, UV stays 0 (**abandon**)
 
-            if user_input.lower() == 'exit':
-                print("Exiting to the main menu.")
-                self.sim.setLEDs(0, 0, 0, 0, 0)
+        def command(line):
+            if line.lower() == 'exit':
+                return False
+            if not line or console_command(line):
                 return
+            self._light_command(line, percents)
 
-            if user_input == "":
-                intensity_input = 0.0
-                break
+        self._run_commands(command, "Light command: ")
+
+    def measurement_mode(self):
+        """
+        Measurement Mode: record the photodiode at the ADC's full rate, tagged with the setpoints,
+        and dump the recording over the data serial port.
+        """
+        recorder = MeasurementRecorder(self.sim, capacity=self.measurement_samples)
+        print(f"Recording the photodiode at {recorder.data_rate} samples/s into a {recorder.capacity} sample ring.")
+        print(LIGHT_COMMANDS_HELP)
+        print(f"Each light command keeps {recorder.post_trigger} samples after the change, then the ring freezes.")
+        print("Type 'dump' to send the ring to the data serial port, 'clear' to start over, 'exit' to return to the main menu.")
+        percents = [0.0] * 5  # setLEDs() order, UV stays 0 (**abandon**)
+
+        def command(line):
+            lower = line.lower()
+            if lower == 'exit':
+                return False
+            if not line or console_command(line):
+                return
+            if lower == 'dump':
+                if usb_cdc.data is None:
+                    print("The data serial port is not enabled (see boot.py).")
+                else:
+                    print(f"Sent {recorder.dump(usb_cdc.data)} bytes to the data serial port.")
+                return
+            if lower == 'clear':
+                recorder.clear()
+                return
+            levels = self._light_command(line, percents)
+            if levels is not None:
+                recorder.mark_setpoint(*levels)
+
+        def status():
+            display_status(self.sim)
+            print(recorder.report())
+
+        self._run_commands(command, "Measurement command: ", recorder, status)
+        print(f"measurement: {recorder.samples} samples, {recorder.missed} missed, "
+              f"{recorder.bus_ns / 1e6:.1f}ms reading the ADC")
+
+    def channel_sweep(self):
+        """
+        Channel Sweep: step channels through a list of levels on their own, averaging the
+        photodiode and thermistors at each level (see lib/sweep.py).
+        """
+        print("Type 'sweep <channels> <levels> [settle ms] [dwell ms]' to start a sweep, e.g.")
+        print("'sweep vwch 0:100:1 50 200' steps violet, white, cyan and halogen from 0 to 100% in 1% steps,")
+        print("or 'sweep w 0,25,50,100'. Settle defaults to 50ms and dwell to 200ms.")
+        print("Type 'stop' to end a sweep early, 'exit' to return to the main menu.")
+        if usb_cdc.data is None:
+            print("The data serial port is not enabled (see boot.py), results are printed here.")
+        sweep = [None]
+
+        def command(line):
+            lower = line.lower()
+            if lower == 'exit':
+                return False
+            if not line or console_command(line):
+                return
+            if lower == 'stop':
+                if sweep[0] is not None:
+                    sweep[0].stop()
+                return
+            fields = lower.split()
+            if fields[0] != 'sweep' or not 3 <= len(fields) <= 5:
+                print("Invalid input. Please enter 'sweep <channels> <levels> [settle ms] [dwell ms]'.")
+                return
+            if sweep[0] is not None and not sweep[0].done:
+                print("A sweep is running, type 'stop' first.")
+                return
+            try:
+                channels = [CHANNEL_INDEX[letter] for letter in fields[1]]
+                levels = parse_levels(fields[2])
+                timing = [float(field) / 1000 for field in fields[3:]]
+                sweep[0] = ChannelSweep(self.sim, channels, levels, *timing, output=usb_cdc.data)
+            except (KeyError, ValueError) as e:
+                print(f"Invalid sweep: {e}")
+                return
+            print(f"Sweeping {sweep[0].points} points, about {sweep[0].duration():.0f}s.")
+            sweep[0].start()
+
+        def step():
+            if sweep[0] is not None:
+                sweep[0].service()
+
+        def status():
+            display_status(self.sim)
+            if sweep[0] is not None:
+                print(sweep[0].report())
+
+        self._run_commands(command, "Sweep command: ", status=status,
+                           tasks=(("sweep", step, self.sweep_rate),))
+        if sweep[0] is not None:
+            sweep[0].stop()
+
+    def _light_command(self, line, percents):
+        """
+        Apply a light command (see LIGHT_COMMANDS_HELP) to `percents` and the lights.
+        Returns the setLEDs() values, or None if the command was invalid.
+        """
+        lower = line.lower()
+        fields = lower.split()
+        try:
+            if lower == 'off':
+                for i in range(len(percents)):
+                    percents[i] = 0.0
+            elif len(fields) == 2 and fields[0] in CHANNEL_INDEX:
+                percent = float(fields[1])
+                if not (0 <= percent <= 100):
+                    raise ValueError
+                percents[CHANNEL_INDEX[fields[0]]] = percent
+            elif len(fields) == 4:
+                values = [float(field) for field in fields]
+                for value in values:
+                    if not (0 <= value <= 100):
+                        raise ValueError
+                percents[0], percents[1], percents[2], percents[4] = values
             else:
-                try:
-                    intensity_input = float(user_input)
-                    if not (0 <= intensity_input <= 1):
-                        print("Invalid intensity. Please enter a value between 0 and 1.")
-                except ValueError:
-                    print("Invalid input. Please enter a numeric value.")
-
-            intensity_values = calculate_light_intensity(intensity_input)
-            violet = int(intensity_values["Violet"] * 655)
-            white = int(intensity_values["White"] * 655)
-            cyan = int(intensity_values["Cyan"] * 655)
-            halogen = int(intensity_values["Halogen"] * 655)
-            uv = int(intensity_values["UV"] * 655)  # (**abandon**)
-            self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
-            self.sim.current_light_settings = {
-                'v': violet,
-                'w': white,
-                'c': cyan,
-                'uv': uv,  # (**abandon**)
-                'h': halogen
-            }
-            print(f"\nCurrent intensity: {intensity_input:.2f}")
-            print("Press 'Enter' to reset your LEDs...")
-            print("Type 'exit' to return to the main menu.")
-            input_line = ""
-
-            while True:
-                check_for_interrupt()
-                check_temperature(self.sim)
+                raise ValueError
+        except ValueError:
+            print("Invalid input. Please enter values between 0 and 100.")
+            return None
+        levels = [int(percent / 100 * 65535) for percent in percents]
+        self.sim.setLEDs(v=levels[0], w=levels[1], c=levels[2], uv=levels[3], h=levels[4])
+        print(f"Lights set to VIOLET {percents[0]:.0f}%, WHITE {percents[1]:.0f}%, "
+              f"CYAN {percents[2]:.0f}%, HAL {percents[4]:.0f}%")
+        return levels
+
+    def _run_commands(self, command, prompt, recorder=None, status=None, tasks=()):
+        """
+        Hand console lines to `command` until it returns False or Ctrl-C, under thermal
+        supervision and with status lines, then turn the lights off. `tasks` are extra
+        (name, function, rate) scheduler tasks. With a recorder, its samples are taken between
+        the other tasks (see _record()).
+        """
+        def read_input():
+            gc_monitor.tick()
+            return console.poll()
+
+        def show_status():
+            if status is None:
                 display_status(self.sim)
+            else:
+                status()
+            console.show_prompt()
 
-                # Non-blocking user input detection
-                if supervisor.runtime.serial_bytes_available:
-                    c = sys.stdin.read(1)
-                    if c == '\n' or c == '\r':
-                        user_command = input_line.strip().lower()
-
-                        if user_command == 'exit':
-                            print("Exiting to the main menu.")
-                            self.sim.setLEDs(0, 0, 0, 0, 0)
-                            return
-                        else:
-                            print("Returning to light intensity input.")
-                            break
-                    else:
-                        input_line += c
-                time.sleep(1)
+        previous = console.handler, console.prompt
+        console.handler = command
+        console.prompt = prompt
+        console.clear()
+        console.show_prompt()
+        self.safety.reset()
+        scheduler = Scheduler()
+        scheduler.add("input", read_input, self.input_rate)
+        self.safety.attach(scheduler)
+        scheduler.add("status", show_status, self.status_rate)
+        for name, func, rate in tasks:
+            scheduler.add(name, func, rate)
+        try:
+            if recorder is None:
+                scheduler.run()
+            else:
+                self._record(recorder, scheduler)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            console.handler, console.prompt = previous
+            self.sim.setLEDs(0, 0, 0, 0, 0)
+        print("Exiting to the main menu.")
+        print(self.safety.report())
 
-    def manual_light_adjustment(self):
+    def _record(self, recorder, scheduler):
         """
-        Manual Light Source Adjustment
+        Run the scheduler's tasks on their deadlines with recorder samples in between. The
+        samples are due every few hundred microseconds, finer than the scheduler's sleeps, so
+        this loop checks every deadline itself instead of sleeping.
         """
+        safety = self.safety
+        deadlines = [monotonic_ns()] * len(scheduler.tasks)
+        recorder.arm()
+        frozen = recorder.frozen
         while True:
-            try:
-                print("Enter light intensities as percentages (0-100). Type 'exit' to return to the main menu.")
-                violet_input = input("Enter Violet light intensity (%): ")
-                if violet_input.lower() == 'exit':
-                    break
-                white_input = input("Enter White light intensity (%): ")
-                if white_input.lower() == 'exit':
-                    break
-                cyan_input = input("Enter Cyan light intensity (%): ")
-                if cyan_input.lower() == 'exit':
-                    break
-                halogen_input = input("Enter halogen light intensity (%): ")
-                if halogen_input.lower() == 'exit':
-                    break
-
-                violet_percent = float(violet_input)
-                white_percent = float(white_input)
-                cyan_percent = float(cyan_input)
-                uv_percent = 0
-                halogen_percent = float(halogen_input)
-
-                if not (0 <= violet_percent <= 100 and 0 <= white_percent <= 100 and
-                        0 <= cyan_percent <= 100 and 0 <= uv_percent <= 100 and
-                        0 <= halogen_percent <= 100):
-                    print("Invalid input. Please enter values between 0 and 100.")
+            now = monotonic_ns()
+            recorder.service(now)
+            for i in range(len(deadlines)):
+                if now < deadlines[i]:
                     continue
-
-                violet = int((violet_percent / 100) * 65535)
-                white = int((white_percent / 100) * 65535)
-                cyan = int((cyan_percent / 100) * 65535)
-                uv = int((uv_percent / 100) * 65535)  # (**abandon**)
-                halogen = int((halogen_percent / 100) * 65535)
-
-                self.sim.setLEDs(v=violet, w=white, c=cyan, uv=uv, h=halogen)
-                print("Lights set to the specified intensities.")
-                self.sim.current_light_settings = {
-                    'v': violet,
-                    'w': white,
-                    'c': cyan,
-                    'uv': uv,  # (**abandon**)
-                    'h': halogen
-                }
-                input_line = ""
-                print("Press 'Enter' to input new values, or 'exit' to return to the main menu.")
-
-                while True:
-                    check_for_interrupt()
-                    check_temperature(self.sim)
-                    display_status(self.sim)
-
-                    if supervisor.runtime.serial_bytes_available:
-                        c = sys.stdin.read(1)
-                        if c == '\n' or c == '\r':
-                            user_command = input_line.strip().lower()
-                            input_line = ""
-
-                            if user_command == 'exit':
-                                print("Exiting to the main menu.")
-                                self.sim.setLEDs(0, 0, 0, 0, 0)
-                                return
-                            else:
-                                print("Returning to light intensity input.")
-                                break
-                        else:
-                            input_line += c
-                    time.sleep(1)
-            except ValueError:
-                print("Invalid input. Please enter numeric values only.")
+                task = scheduler.tasks[i]
+                deadlines[i] = now + task.period_ns
+                checks = safety.checks
+                if task.func() is False:
+                    return
+                task.runs += 1
+                if safety.checks != checks:
+                    # The check read the thermistors, which took the ADC off the photodiode
+                    recorder.record_thermistors()
+                    recorder.arm()
+                break  # One task per pass, so the next sample is never more than one task late
+            if recorder.frozen and not frozen:
+                print("\nCapture complete, type 'dump' to send it.")
+                console.show_prompt()
+            frozen = recorder.frozen
@@ -0,0 +1,157 @@
+# lib/playback.py
+# Deadline-scheduled setpoint playback
+#
+# The host streams setpoints ahead of time, each tagged with a target time. They wait in a
+# preallocated ring buffer and are applied when their deadline passes, so USB and host
+# scheduling jitter does not reach the light output.
+
+from array import array
+from time import monotonic_ns
+
+SETPOINT_CHANNELS = 5  # v, w, c, uv, h
+US_WRAP = 1 << 32      # Stream times are sent as 32-bit microsecond counters
+
+
+class SetpointQueue:
+    """
+    Fixed-size FIFO of (deadline, setpoints) entries. Deadlines are monotonic_ns() values and
+    must be pushed in order. Stream times from the host are mapped onto the Pico clock with the
+    first entry of a stream landing `lead` seconds in the future.
+    """
+    def __init__(self, capacity: int = 128, lead: float = 0.1):
+        self.capacity = capacity
+        self.lead_ns = int(lead * 1e9)
+        self.times = array('q', [0] * capacity)
+        self.values = array('H', [0] * (capacity * SETPOINT_CHANNELS))
+        self.overflows = 0     # Entries rejected because the ring was full
+        self.rejected = 0      # Entries rejected because their deadline went backwards
+        self.start_stream()
+
+    def start_stream(self):
+        """
+        Forget queued entries and re-anchor the next stream time to the Pico clock.
+        """
+        self.head = 0          # Index of the oldest entry
+        self.count = 0
+        self._last_due = 0
+        self._epoch = None
+        self._last_us = 0
+        self._wraps = 0
+
+    def push(self, t_us: int, buf, offset: int) -> bool:
+        """
+        Queue big-endian setpoints from buf[offset:] due at stream time t_us (32-bit microseconds).
+        """
+        if t_us < self._last_us and self._last_us - t_us > US_WRAP // 2:
+            self._wraps += 1
+        self._last_us = t_us
+        stream_ns = (self._wraps * US_WRAP + t_us) * 1000
+        if self._epoch is None:
+            self._epoch = monotonic_ns() + self.lead_ns - stream_ns
+        slot = self._reserve(self._epoch + stream_ns)
+        if slot < 0:
+            return False
+        base = slot * SETPOINT_CHANNELS
+        for ch in range(SETPOINT_CHANNELS):
+            self.values[base + ch] = (buf[offset + 2 * ch] << 8) | buf[offset + 2 * ch + 1]
+        return True
+
+    def push_values(self, due_ns: int, v: int = 0, w: int = 0, c: int = 0, uv: int = 0, h: int = 0) -> bool:
+        """
+        Queue setpoints due at an absolute monotonic_ns() time.
+        """
+        slot = self._reserve(due_ns)
+        if slot < 0:
+            return False
+        base = slot * SETPOINT_CHANNELS
+        self.values[base] = v
+        self.values[base + 1] = w
+        self.values[base + 2] = c
+        self.values[base + 3] = uv
+        self.values[base + 4] = h
+        return True
+
+    def peek_time(self):
+        """
+        Deadline of the oldest entry, or None if the queue is empty.
+        """
+        return self.times[self.head] if self.count else None
+
+    def pop_into(self, out) -> int:
+        """
+        Copy the oldest entry's setpoints into out and return its deadline.
+        """
+        if not self.count:
+            raise IndexError("Setpoint queue is empty")
+        slot = self.head
+        base = slot * SETPOINT_CHANNELS
+        for ch in range(SETPOINT_CHANNELS):
+            out[ch] = self.values[base + ch]
+        self.head = (slot + 1) % self.capacity
+        self.count -= 1
+        return self.times[slot]
+
+    # Claims the next free slot for a deadline, or returns -1 if it cannot be queued
+    def _reserve(self, due_ns: int) -> int:
+        if due_ns < self._last_due:
+            self.rejected += 1
+            return -1
+        if self.count == self.capacity:
+            self.overflows += 1
+            return -1
+        slot = (self.head + self.count) % self.capacity
+        self.times[slot] = due_ns
+        self._last_due = due_ns
+        self.count += 1
+        return slot
+
+
+class ScheduledPlayback:
+    """
+    Applies queued setpoints to the simulator at their deadlines. Call service() as often as
+    possible; when several entries are due at once only the newest is applied and the older
+    ones are counted as dropped. Entries applied more than `late_tolerance` seconds after their
+    deadline are counted as late.
+    """
+    def __init__(self, sim, queue: SetpointQueue, late_tolerance: float = 0.002):
+        self.sim = sim
+        self.queue = queue
+        self.late_tolerance_ns = int(late_tolerance * 1e9)
+        self._out = array('H', [0] * SETPOINT_CHANNELS)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.applied = 0
+        self.late = 0
+        self.dropped = 0
+        self.max_lateness_ns = 0
+
+    def service(self) -> bool:
+        """
+        Apply the newest due entry. Returns True if the lights were updated.
+        """
+        queue = self.queue
+        now = monotonic_ns()
+        due = None
+        while queue.count and queue.times[queue.head] <= now:
+            if due is not None:
+                self.dropped += 1
+            due = queue.pop_into(self._out)
+        if due is None:
+            return False
+
+        out = self._out
+        self.sim.setLEDs(v=out[0], w=out[1], c=out[2], uv=out[3], h=out[4])
+        lateness = monotonic_ns() - due
+        if lateness > self.late_tolerance_ns:
+            self.late += 1
+        if lateness > self.max_lateness_ns:
+            self.max_lateness_ns = lateness
+        self.applied += 1
+        return True
+
+    def report(self) -> str:
+        queue = self.queue
+        return (f"applied={self.applied} late={self.late} dropped={self.dropped} "
+                f"max_late={self.max_lateness_ns / 1e6:.2f}ms queued={queue.count}/{queue.capacity} "
+                f"overflows={queue.overflows} rejected={queue.rejected}")
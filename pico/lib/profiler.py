@@ -0,0 +1,123 @@
+# lib/profiler.py
+# Lightweight loop profiler with fixed-bucket latency histograms
+#
+# Stages are registered once by name and timed with a reusable context manager:
+#     STAGE_DAC = profiler.stage("setLEDs")
+#     with profiler.time(STAGE_DAC):
+#         ...
+# All counters live in preallocated arrays, so timing a stage does not allocate.
+# The shared `profiler` is disabled until `profiler.enabled = True` (see PROFILE in code.py).
+
+from array import array
+from time import monotonic_ns
+
+# Upper bucket edges in microseconds; the last bucket holds everything slower
+BUCKET_EDGES_US = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+MAX_STAGES = 16
+
+
+class _StageTimer:
+    def __init__(self, profiler, stage: int):
+        self._profiler = profiler
+        self._stage = stage
+        self._start = 0
+
+    def __enter__(self):
+        self._start = monotonic_ns()
+        return self
+
+    def __exit__(self, *args):
+        self._profiler.record(self._stage, monotonic_ns() - self._start)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """
+    Keeps a latency histogram, count, total and max for each named stage.
+    """
+    def __init__(self, max_stages: int = MAX_STAGES, edges_us=BUCKET_EDGES_US):
+        self.enabled = False
+        self.edges_ns = array('L', [edge * 1000 for edge in edges_us])
+        self.edges_us = edges_us
+        self.buckets = len(edges_us) + 1
+        self.max_stages = max_stages
+        self.names = []
+        self._timers = []
+        self.counts = array('L', [0] * max_stages)
+        self.totals_us = array('Q', [0] * max_stages)
+        self.max_us = array('L', [0] * max_stages)
+        self.histogram = array('L', [0] * (max_stages * self.buckets))
+
+    def stage(self, name: str) -> int:
+        """
+        Register a stage (or find an existing one) and return its id.
+        """
+        if name in self.names:
+            return self.names.index(name)
+        if len(self.names) == self.max_stages:
+            raise ValueError("Too many profiler stages")
+        self.names.append(name)
+        self._timers.append(_StageTimer(self, len(self.names) - 1))
+        return len(self.names) - 1
+
+    def time(self, stage: int):
+        """
+        Context manager that records the time spent in its block. Not reentrant per stage.
+        """
+        return self._timers[stage] if self.enabled else _NULL_TIMER
+
+    def wrap(self, stage: int, func):
+        """
+        Return func timed as a stage, e.g. for scheduler tasks.
+        """
+        def timed(*args):
+            with self.time(stage):
+                return func(*args)
+        return timed
+
+    def record(self, stage: int, elapsed_ns: int):
+        edges = self.edges_ns
+        bucket = 0
+        while bucket < len(edges) and elapsed_ns > edges[bucket]:
+            bucket += 1
+        self.histogram[stage * self.buckets + bucket] += 1
+        elapsed_us = elapsed_ns // 1000
+        self.counts[stage] += 1
+        self.totals_us[stage] += elapsed_us
+        if elapsed_us > self.max_us[stage]:
+            self.max_us[stage] = elapsed_us
+
+    def reset(self):
+        for i in range(self.max_stages):
+            self.counts[i] = 0
+            self.totals_us[i] = 0
+            self.max_us[i] = 0
+        for i in range(len(self.histogram)):
+            self.histogram[i] = 0
+
+    def dump(self, write=print):
+        """
+        Print every stage's count, mean, max and histogram, one line each.
+        Pass another write function (e.g. for usb_cdc.data) to send it elsewhere.
+        """
+        header = "stage            count   mean_us    max_us |" + "".join(f" <={edge}" for edge in self.edges_us) + " >"
+        write(header)
+        for stage, name in enumerate(self.names):
+            count = self.counts[stage]
+            mean = self.totals_us[stage] // count if count else 0
+            base = stage * self.buckets
+            histogram = " ".join(str(self.histogram[base + bucket]) for bucket in range(self.buckets))
+            write(f"{name:<16} {count:>6} {mean:>9} {self.max_us[stage]:>9} | {histogram}")
+
+
+profiler = Profiler()
@@ -0,0 +1,141 @@
+# lib/safety.py
+# Deadline-driven safety monitor
+#
+# The monitor owns the periodic thermal check so it no longer depends on what a mode is doing.
+# Modes attach it to their scheduler, where it runs as its own task at a fixed rate; code that
+# waits for console input calls service(), which runs the check whenever its deadline has
+# passed. It also measures its own worst-case detection latency: a fault that appears just
+# after a thermistor sample is only seen when the next check completes, so the latency is
+# the longest time from the start of one check to the end of the next.
+#
+# attach() also adds the halogen ramp task, so the halogen's slew limit (see halogen.py) is
+# serviced in every mode that runs on a scheduler.
+#
+# With a setpoint timeout set, it doubles as a watchdog for streamed setpoints: when the host
+# stops feeding it for longer than the timeout every output is blanked through
+# sim.setpoints_stale, until the next feed().
+
+from time import monotonic_ns
+from .utils import check_temperature
+from .profiler import profiler
+
+STAGE_SAFETY = profiler.stage("safety check")
+
+
+class SafetyMonitor:
+    """
+    Runs the thermal safety check on a fixed deadline and blanks the outputs when streamed
+    setpoints go stale. All state is preallocated integers.
+    """
+    def __init__(self, sim, rate: float = 20, setpoint_timeout: float = 0, halogen_rate: float = 100):
+        self.sim = sim
+        self.rate = rate
+        self.halogen_rate = halogen_rate  # Halogen ramp steps per second while the slew limit holds it back
+        self.setpoint_timeout = setpoint_timeout
+        self.reset()
+
+    @property
+    def rate(self) -> float:
+        return 1e9 / self.period_ns
+
+    # Checks per second
+    @rate.setter
+    def rate(self, hz: float):
+        if hz <= 0:
+            raise ValueError("Safety check rate must be positive")
+        self.period_ns = int(1e9 / hz)
+
+    @property
+    def setpoint_timeout(self) -> float:
+        return self._timeout_ns / 1e9
+
+    # Seconds without a feed() before the outputs are blanked, 0 disables the watchdog
+    @setpoint_timeout.setter
+    def setpoint_timeout(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("Setpoint timeout cannot be negative")
+        self._timeout_ns = int(seconds * 1e9)
+
+    def reset(self):
+        self.checks = 0
+        self.worst_latency_ns = 0  # Longest start of one check to end of the next
+        self.watchdog_trips = 0
+        self._last_start_ns = 0
+        self._next_ns = 0
+        self._fed_ns = 0
+        self.sim.setpoints_stale = False  # A previous mode's watchdog trip does not carry over
+        if self.sim.thermal_alert is not None:
+            self.sim.thermal_alert.reset()
+
+    def attach(self, scheduler):
+        """
+        Add the check to a scheduler as its own task at the monitor's rate, and the halogen
+        ramp as another. Returns the check's task.
+        """
+        task = scheduler.add("safety", self.check, self.rate)
+        scheduler.add("halogen", self.sim.serviceHalogen, self.halogen_rate)
+        return task
+
+    def service(self) -> bool:
+        """
+        Run the check if its deadline has passed. Call this from anything that waits.
+        The comparator alert, if enabled, is polled and the halogen ramp moved on every call.
+        """
+        if self.sim.thermal_alert is not None:
+            self.sim.thermal_alert.poll()
+        self.sim.serviceHalogen()
+        if monotonic_ns() < self._next_ns:
+            return True
+        return self.check()
+
+    def check(self) -> bool:
+        """
+        Read the thermistors, apply derating and shutdown, and run the watchdog.
+        Returns False when the temperature sensors cannot be read.
+        """
+        start = monotonic_ns()
+        with profiler.time(STAGE_SAFETY):
+            if self.sim.thermal_alert is not None:
+                self.sim.thermal_alert.poll()
+            self.sim.getThermals(force=True)
+            ok = check_temperature(self.sim)
+            self._watchdog(start)
+            if self.sim.leds_pending:
+                self.sim.refreshLEDs()  # Setpoints a tight bus budget deferred
+        end = monotonic_ns()
+
+        if self._last_start_ns:
+            latency = end - self._last_start_ns
+            if latency > self.worst_latency_ns:
+                self.worst_latency_ns = latency
+        self._last_start_ns = start
+        self._next_ns = start + self.period_ns
+        self.checks += 1
+        return ok
+
+    def feed(self):
+        """
+        Record that a setpoint arrived from the host. Call it before applying the setpoint.
+        """
+        self._fed_ns = monotonic_ns()
+        if self.sim.setpoints_stale:
+            self.sim.setpoints_stale = False
+            print("Setpoints resumed.")
+
+    def report(self) -> str:
+        report = (f"safety: {self.checks} checks at {self.rate:.0f}Hz, worst detection latency "
+                  f"{self.worst_latency_ns / 1e6:.1f}ms, watchdog trips {self.watchdog_trips}")
+        if self.sim.thermal_alert is not None:
+            report += " | " + self.sim.thermal_alert.report()
+        return report
+
+    def _watchdog(self, now):
+        if not self._timeout_ns or self.sim.setpoints_stale:
+            return
+        if not self._fed_ns:
+            self._fed_ns = now  # The timeout starts with the first check
+        elif now - self._fed_ns > self._timeout_ns:
+            self.sim.setpoints_stale = True
+            self.sim.refreshLEDs()
+            self.watchdog_trips += 1
+            print(f"No setpoints for {self.setpoint_timeout}s, lights blanked.")
@@ -0,0 +1,93 @@
+# lib/scheduler.py
+# Cooperative periodic task scheduler built on CircuitPython asyncio
+# Requires the `asyncio` and `adafruit_ticks` libraries in /lib on the Pico (`circup install asyncio`)
+
+import asyncio
+from time import monotonic_ns
+
+
+class PeriodicTask:
+    """
+    Calls a function at a fixed rate on its own deadline. A call that returns False stops the
+    whole scheduler. Deadlines that are already missed when a call finishes count as overruns
+    and are skipped instead of being run back to back.
+    """
+    def __init__(self, scheduler, name: str, func, rate: float):
+        self.scheduler = scheduler
+        self.name = name
+        self.func = func
+        self.rate = rate
+        self.runs = 0
+        self.overruns = 0
+
+    @property
+    def rate(self) -> float:
+        return 1e9 / self.period_ns
+
+    # Calls per second
+    @rate.setter
+    def rate(self, hz: float):
+        if hz <= 0:
+            raise ValueError("Task rate must be positive")
+        self.period_ns = int(1e9 / hz)
+
+    async def run(self):
+        next_ns = monotonic_ns()
+        while self.scheduler.running:
+            if self.func() is False:
+                self.scheduler.stop()
+                break
+            self.runs += 1
+
+            next_ns += self.period_ns
+            delay = next_ns - monotonic_ns()
+            if delay < 0:
+                self.overruns += 1
+                next_ns = monotonic_ns()
+                await asyncio.sleep(0)  # Still let the other tasks run
+            else:
+                await asyncio.sleep(delay / 1e9)
+
+
+class Scheduler:
+    """
+    Runs a set of PeriodicTasks, each at its own rate, until one of them stops it.
+    """
+    def __init__(self):
+        self.tasks = []
+        self.running = False
+        self._handles = []
+
+    def add(self, name: str, func, rate: float) -> PeriodicTask:
+        task = PeriodicTask(self, name, func, rate)
+        self.tasks.append(task)
+        return task
+
+    def run(self):
+        """
+        Block until stop() is called or a task function returns False.
+        """
+        self.running = True
+        try:
+            asyncio.run(self._main())
+        finally:
+            self.running = False
+
+    # Stops every task, waking the ones that are sleeping until their next deadline
+    def stop(self):
+        self.running = False
+        for handle in self._handles:
+            handle.cancel()
+
+    def report(self) -> str:
+        return ", ".join(f"{task.name}: {task.rate:.0f}Hz runs={task.runs} overruns={task.overruns}"
+                         for task in self.tasks)
+
+    async def _main(self):
+        self._handles = [asyncio.create_task(task.run()) for task in self.tasks]
+        try:
+            await asyncio.gather(*self._handles)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._handles = []
@@ -0,0 +1,201 @@
+# lib/setpoint_link.py
+# Binary setpoint protocol for the usb_cdc data channel (enabled in boot.py)
+#
+# Frame layout, multi-byte fields big-endian:
+#   SYNC (0xA5) | TYPE | SEQ | payload | CRC16
+# TYPE_SETPOINT payload is five 16-bit setpoints in setLEDs() order: v, w, c, uv, h
+# TYPE_TIMED_SETPOINT payload is a 32-bit stream time in microseconds followed by the setpoints
+# TYPE_STREAM_START has no payload and re-anchors the stream time of the next timed setpoint
+# The CRC is CRC-16/CCITT-FALSE over TYPE, SEQ and the payload.
+# The encoders only need the standard library and lib/profiler.py (itself standard library
+# only, no hardware modules), so host scripts can use them too.
+
+from array import array
+
+from .profiler import profiler
+
+SYNC = 0xA5
+TYPE_SETPOINT = 0x01
+TYPE_TIMED_SETPOINT = 0x02
+TYPE_STREAM_START = 0x03
+SETPOINT_CHANNELS = 5
+HEADER_LEN = 3
+TIME_LEN = 4
+CRC_LEN = 2
+FRAME_LENGTHS = {
+    TYPE_SETPOINT: HEADER_LEN + 2 * SETPOINT_CHANNELS + CRC_LEN,
+    TYPE_TIMED_SETPOINT: HEADER_LEN + TIME_LEN + 2 * SETPOINT_CHANNELS + CRC_LEN,
+    TYPE_STREAM_START: HEADER_LEN + CRC_LEN,
+}
+MAX_FRAME_LEN = max(FRAME_LENGTHS.values())
+STAGE_LINK = profiler.stage("link.poll")
+
+
+def _make_crc_table():
+    table = array('H', [0] * 256)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _make_crc_table()
+
+
+def crc16(data, start=0, end=None):
+    """
+    CRC-16/CCITT-FALSE of data[start:end] without slicing the buffer.
+    """
+    if end is None:
+        end = len(data)
+    crc = 0xFFFF
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFFFF) ^ CRC_TABLE[(crc >> 8) ^ data[i]]
+    return crc
+
+
+def _encode(frame_type, seq, payload_offset, setpoints):
+    frame = bytearray(FRAME_LENGTHS[frame_type])
+    frame[0] = SYNC
+    frame[1] = frame_type
+    frame[2] = seq & 0xFF
+    for i, value in enumerate(setpoints):
+        if not 0 <= value <= 0xFFFF:
+            raise ValueError("Setpoints must be 16-bit integers.")
+        frame[payload_offset + 2 * i] = value >> 8
+        frame[payload_offset + 2 * i + 1] = value & 0xFF
+    return frame
+
+
+def _seal(frame):
+    crc = crc16(frame, 1, len(frame) - CRC_LEN)
+    frame[-2] = crc >> 8
+    frame[-1] = crc & 0xFF
+    return bytes(frame)
+
+
+def encode_setpoints(seq, v=0, w=0, c=0, uv=0, h=0):
+    """
+    Build a TYPE_SETPOINT frame, applied by the Pico as soon as it arrives.
+    """
+    return _seal(_encode(TYPE_SETPOINT, seq, HEADER_LEN, (v, w, c, uv, h)))
+
+
+def encode_timed_setpoints(seq, t_us, v=0, w=0, c=0, uv=0, h=0):
+    """
+    Build a TYPE_TIMED_SETPOINT frame, applied when the stream reaches t_us microseconds.
+    The stream time is sent as a wrapping 32-bit counter.
+    """
+    frame = _encode(TYPE_TIMED_SETPOINT, seq, HEADER_LEN + TIME_LEN, (v, w, c, uv, h))
+    t_us &= 0xFFFFFFFF
+    for i in range(TIME_LEN):
+        frame[HEADER_LEN + i] = (t_us >> (8 * (TIME_LEN - 1 - i))) & 0xFF
+    return _seal(frame)
+
+
+def encode_stream_start(seq):
+    """
+    Build a TYPE_STREAM_START frame. Send it before the first timed setpoint of a stream.
+    """
+    return _seal(_encode(TYPE_STREAM_START, seq, HEADER_LEN, ()))
+
+
+class SetpointLink:
+    """
+    Receives setpoint frames from a serial port with bulk, non-blocking reads into a
+    preallocated buffer. The latest immediate setpoints are kept in `setpoints`; timed
+    setpoints go to `queue` (a playback.SetpointQueue) and are ignored without one.
+    """
+    def __init__(self, serial, buffer_size=256, queue=None):
+        self.serial = serial
+        self.queue = queue
+        self.serial.timeout = 0  # readinto() returns immediately with whatever has arrived
+        if buffer_size <= MAX_FRAME_LEN:
+            raise ValueError(f"Link buffer must be longer than a frame ({MAX_FRAME_LEN} bytes)")
+        self._buf = bytearray(buffer_size)
+        view = memoryview(self._buf)
+        # The tail left after decoding is shorter than a frame, so a read only ever starts at
+        # one of these offsets; the views are made once instead of slicing on every poll
+        self._tails = tuple(view[i:] for i in range(MAX_FRAME_LEN))
+        self._len = 0
+        self.setpoints = array('H', [0] * SETPOINT_CHANNELS)
+        self.seq = -1            # Sequence number of the last valid frame, -1 before the first
+        self.frames = 0          # Valid frames received
+        self.crc_errors = 0      # Frames dropped because the CRC did not match
+        self.lost = 0            # Frames missing according to sequence number gaps
+
+    @classmethod
+    def open(cls, buffer_size=256, queue=None):
+        """
+        Create a link on usb_cdc.data, or return None if the data channel is not enabled.
+        """
+        from .hardware import usb_cdc
+        if usb_cdc.data is None:
+            return None
+        return cls(usb_cdc.data, buffer_size, queue)
+
+    def poll(self):
+        """
+        Read every waiting byte and decode the complete frames.
+        Returns the number of immediate setpoint frames decoded by this call.
+        """
+        decoded = 0
+        with profiler.time(STAGE_LINK):
+            while self.serial.in_waiting:
+                count = self.serial.readinto(self._tails[self._len])
+                if not count:
+                    break
+                self._len += count
+                decoded += self._decode()
+        return decoded
+
+    # Decodes the buffered frames, returning the number of immediate setpoint frames
+    def _decode(self):
+        buf = self._buf
+        decoded = 0
+        i = 0
+        while self._len - i >= HEADER_LEN:
+            if buf[i] != SYNC or buf[i + 1] not in FRAME_LENGTHS:
+                i += 1
+                continue
+            frame_len = FRAME_LENGTHS[buf[i + 1]]
+            if self._len - i < frame_len:
+                break  # Wait for the rest of the frame
+            end = i + frame_len
+            if crc16(buf, i + 1, end - CRC_LEN) != (buf[end - 2] << 8) | buf[end - 1]:
+                self.crc_errors += 1
+                i += 1  # Resynchronize on the next sync byte
+                continue
+            decoded += self._accept(buf, i)
+            i = end
+
+        # Move the unfinished tail (shorter than one frame) to the front of the buffer
+        remaining = self._len - i
+        for j in range(remaining):
+            buf[j] = buf[i + j]
+        self._len = remaining
+        return decoded
+
+    # Handles one valid frame, returning 1 if it updated `setpoints`
+    def _accept(self, buf, i):
+        seq = buf[i + 2]
+        if self.seq >= 0:
+            self.lost += (seq - self.seq - 1) & 0xFF
+        self.seq = seq
+        self.frames += 1
+
+        frame_type = buf[i + 1]
+        base = i + HEADER_LEN
+        if frame_type == TYPE_SETPOINT:
+            for ch in range(SETPOINT_CHANNELS):
+                self.setpoints[ch] = (buf[base + 2 * ch] << 8) | buf[base + 2 * ch + 1]
+            return 1
+        if self.queue is not None:
+            if frame_type == TYPE_TIMED_SETPOINT:
+                t_us = (buf[base] << 24) | (buf[base + 1] << 16) | (buf[base + 2] << 8) | buf[base + 3]
+                self.queue.push(t_us, buf, base + TIME_LEN)
+            elif frame_type == TYPE_STREAM_START:
+                self.queue.start_stream()
+        return 0
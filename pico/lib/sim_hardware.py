@@ -0,0 +1,436 @@
+# lib/sim_hardware.py
+# In-memory stand-ins for the Pico hardware so the control code runs under CPython
+#
+# The simulated I2C bus models the time each transaction would take at the configured clock
+# and records every write with a timestamp. With `realtime` set it also waits that long,
+# so loop and tick rates measured on a desktop track the real bus cost.
+
+import codecs
+import os
+import select
+import sys
+from time import monotonic_ns
+from .thermistor_helper import getVoltage
+
+I2C_OVERHEAD_BITS = 2  # Start and stop conditions
+ADS1015_DATA_RATES = (128, 250, 490, 920, 1600, 2400, 3300, 3300)  # By the config register's DR field
+ADS_FULL_SCALE = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+
+
+class board:
+    """
+    Pin names used by the simulator code.
+    """
+    GP4 = "GP4"
+    GP5 = "GP5"
+    GP18 = "GP18"
+    GP19 = "GP19"
+    GP20 = "GP20"
+    GP21 = "GP21"
+    GP22 = "GP22"
+    GP26 = "GP26"
+    GP27 = "GP27"
+    GP28 = "GP28"
+    LED = "LED"
+
+
+# Logic level of every driven pin (True = high) and the edge counters watching them
+_pin_levels = {}
+_counters = []
+
+
+# Drives a pin from a simulated device, counting the edge on any Counter for that pin
+def drive_pin(pin, level: bool):
+    previous = _pin_levels.get(pin, True)
+    _pin_levels[pin] = level
+    if previous != level:
+        for counter in _counters:
+            if counter.pin == pin:
+                counter._edge(level)
+
+
+class Edge:
+    RISE = 1
+    FALL = 2
+    RISE_AND_FALL = 3
+
+
+class Counter:
+    """
+    Simulated countio.Counter, counting the edges simulated devices drive on its pin.
+    """
+    def __init__(self, pin, *, edge: int = Edge.FALL, pull=None):
+        self.pin = pin
+        self.edge = edge
+        self.count = 0
+        _counters.append(self)
+
+    def _edge(self, level: bool):
+        if (level and self.edge & Edge.RISE) or (not level and self.edge & Edge.FALL):
+            self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+    def deinit(self):
+        if self in _counters:
+            _counters.remove(self)
+
+
+class I2C:
+    """
+    Simulated I2C bus. `log` holds (timestamp_ns, address, bytes) for every write.
+    """
+    def __init__(self, scl=None, sda=None, frequency: int = 100000, realtime: bool = True):
+        self.frequency = frequency
+        self.realtime = realtime
+        self.devices = {}
+        self.handlers = {}  # Write decoder of each device address
+        self.log = []
+        self.transactions = 0
+        self.busy_ns = 0  # Total modeled bus time
+
+    def try_lock(self) -> bool:
+        return True
+
+    def unlock(self):
+        pass
+
+    def scan(self) -> list:
+        return sorted(self.devices)
+
+    # Raw write to a device, as busio.I2C.writeto() with the bus locked
+    def writeto(self, address: int, buffer, *, start: int = 0, end=None):
+        if address not in self.handlers:
+            raise OSError(19, "No I2C device at address: 0x%x" % address)
+        data = bytes(buffer[start:end])
+        self.transaction(address, len(data), data)
+        self.handlers[address](data)
+
+    # Accounts for one transaction of `nbytes` data bytes plus the address byte
+    def transaction(self, address: int, nbytes: int, data=None):
+        duration = (9 * (nbytes + 1) + I2C_OVERHEAD_BITS) * 1000000000 // self.frequency
+        self.transactions += 1
+        self.busy_ns += duration
+        if data is not None:
+            self.log.append((monotonic_ns(), address, bytes(data)))
+        if self.realtime:
+            wait(duration)
+
+
+# Busy-waits so short waits are not rounded up to the OS scheduler tick
+def wait(duration_ns: int):
+    end = monotonic_ns() + duration_ns
+    while monotonic_ns() < end:
+        pass
+
+
+class _I2CDevice:
+    def __init__(self, i2c: I2C, address: int, on_write, on_read=None):
+        self.i2c = i2c
+        self.device_address = address
+        self._on_write = on_write
+        self._on_read = on_read
+        i2c.handlers[address] = on_write
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write(self, buf, *, start: int = 0, end=None):
+        data = bytes(buf[start:end])
+        self.i2c.transaction(self.device_address, len(data), data)
+        self._on_write(data)
+
+    def readinto(self, buf, *, start: int = 0, end=None):
+        if end is None:
+            end = len(buf)
+        self.i2c.transaction(self.device_address, end - start)
+        data = self._on_read(end - start)
+        for i in range(end - start):
+            buf[start + i] = data[i]
+
+    def write_then_readinto(self, out_buffer, in_buffer, *, out_start: int = 0, out_end=None,
+                            in_start: int = 0, in_end=None):
+        self.write(out_buffer, start=out_start, end=out_end)
+        self.readinto(in_buffer, start=in_start, end=in_end)
+
+
+class _DACChannel:
+    def __init__(self, mcp, index: int):
+        self._mcp = mcp
+        self._index = index
+
+    @property
+    def raw_value(self) -> int:
+        return self._mcp.codes[self._index]
+
+    @raw_value.setter
+    def raw_value(self, code: int):
+        # The driver sends a 3 byte multi-write for a single channel
+        self._mcp.i2c_device.write(bytes((0x40 | (self._index << 1), code >> 8, code & 0xFF)))
+
+    @property
+    def value(self) -> int:
+        return self.raw_value << 4
+
+    @value.setter
+    def value(self, value: int):
+        if not 0 <= value <= 65535:
+            raise AttributeError("`value` must be a 16-bit integer")
+        self.raw_value = value >> 4
+
+
+class MCP4728:
+    """
+    Simulated MCP4728 DAC. Decodes fast write and multi-write frames into `codes`.
+    """
+    def __init__(self, i2c: I2C, address: int = 0x60):
+        self.codes = [0, 0, 0, 0]
+        self.i2c_device = _I2CDevice(i2c, address, self._decode)
+        i2c.devices[address] = self
+        self.channel_a = _DACChannel(self, 0)
+        self.channel_b = _DACChannel(self, 1)
+        self.channel_c = _DACChannel(self, 2)
+        self.channel_d = _DACChannel(self, 3)
+
+    def _decode(self, data: bytes):
+        if data and data[0] & 0xF8 == 0x40:
+            # Multi-write: 3 bytes per channel, channel in bits 2-1 of the command byte
+            for i in range(0, len(data) - 2, 3):
+                self.codes[(data[i] >> 1) & 0x03] = ((data[i + 1] & 0x0F) << 8) | data[i + 2]
+        elif data and data[0] & 0xC0 == 0:
+            # Fast write: 2 bytes per channel starting at channel A
+            for ch in range(min(len(data) // 2, 4)):
+                self.codes[ch] = ((data[2 * ch] & 0x0F) << 8) | data[2 * ch + 1]
+
+
+class Mode:
+    CONTINUOUS = 0x0000
+    SINGLE = 0x0100
+
+
+class ADS1015:
+    """
+    Simulated ADS1015 ADC. Inputs default to the voltage of a thermistor at 25°C and can be
+    changed with set_voltage() or set_temperature(), or driven by a function of no arguments
+    returning volts with set_source() (e.g. a photodiode model that follows the DAC codes).
+
+    Register writes and reads through i2c_device are decoded. In continuous mode the conversion
+    register follows the selected input, with a new conversion every 1/data_rate seconds, and
+    the comparator is modeled: an input outside the thresholds pulls `alert_pin` low (active
+    low, latched until the next read). inject_alert() asserts it directly for testing.
+    """
+    bits = 12
+
+    def __init__(self, i2c: I2C, gain: float = 1, data_rate=None, mode: int = Mode.SINGLE, address: int = 0x48):
+        self.i2c = i2c
+        self.address = address
+        self.gain = gain
+        self.data_rate = 1600 if data_rate is None else data_rate
+        self.mode = mode
+        self.voltages = [getVoltage(25.0)] * 4
+        self.sources = [None] * 4
+        self.conversions = 0
+        # Conversion, config, Lo_thresh and Hi_thresh registers at their power-on values
+        self.registers = [0, 0x8583, 0x8000, 0x7FFF]
+        self.pointer = 0
+        self._conversion_ns = 0  # monotonic_ns() the latest continuous conversion finished
+        self.alert_pin = board.GP22  # GPIO the simulated ALERT/RDY line is wired to
+        self.alert_ns = 0  # monotonic_ns() of the last alert assertion
+        self.i2c_device = _I2CDevice(i2c, address, self._on_write, self._on_read)
+        i2c.devices[address] = self
+
+    def set_voltage(self, pin: int, volts: float):
+        self.voltages[pin] = volts
+        self._compare()
+
+    def set_temperature(self, pin: int, celsius: float):
+        self.voltages[pin] = getVoltage(celsius)
+        self._compare()
+
+    # Pulls the ALERT/RDY line low as if the comparator had tripped
+    def inject_alert(self):
+        self.alert_ns = monotonic_ns()
+        drive_pin(self.alert_pin, False)
+
+    def set_source(self, pin: int, source):
+        self.sources[pin] = source
+
+    def read(self, pin: int, is_differential: bool = False) -> int:
+        # Config write, conversion wait, pointer write and conversion read
+        self.i2c.transaction(self.address, 3)
+        if self.i2c.realtime:
+            wait(1000000000 // self.data_rate)
+        self.i2c.transaction(self.address, 1)
+        self.i2c.transaction(self.address, 2)
+        self.conversions += 1
+
+        # The driver's single-shot config disables the comparator, and the read clears the latch
+        self.registers[1] = 0x8103 | ((4 + pin) << 12)
+        drive_pin(self.alert_pin, True)
+        return self._value(pin)
+
+    # Left-justified 16-bit conversion value of an input
+    def _value(self, pin: int) -> int:
+        if self.sources[pin] is not None:
+            self.voltages[pin] = self.sources[pin]()
+        full_scale = ADS_FULL_SCALE[self.gain]
+        code = int(self.voltages[pin] / full_scale * 2047)
+        code = max(-2048, min(2047, code))
+        return code << 4
+
+    def _on_write(self, data: bytes):
+        if data and data[0] < 4:
+            self.pointer = data[0]
+        if len(data) == 3 and data[0] < 4:
+            self.registers[data[0]] = (data[1] << 8) | data[2]
+            if data[0] == 1:
+                self._conversion_ns = monotonic_ns()  # A written config starts a new conversion
+                self._compare()
+
+    def _on_read(self, nbytes: int) -> bytes:
+        if self.pointer == 0:
+            self._convert()
+        value = self.registers[self.pointer]
+        return bytes(((value >> 8) & 0xFF, value & 0xFF))[:nbytes]
+
+    # Updates the conversion register when a continuous conversion has finished since the last
+    def _convert(self):
+        config = self.registers[1]
+        mux = (config >> 12) & 0x07
+        if config & 0x0100 or mux < 4:
+            return
+        now = monotonic_ns()
+        period = 1000000000 // ADS1015_DATA_RATES[(config >> 5) & 0x07]
+        if now - self._conversion_ns < period:
+            return
+        self._conversion_ns += (now - self._conversion_ns) // period * period
+        self.registers[0] = self._value(mux - 4) & 0xFFFF
+        self.conversions += 1
+
+    # Evaluates the comparator against the input it is armed on (continuous mode, single-ended)
+    def _compare(self):
+        config = self.registers[1]
+        mux = (config >> 12) & 0x07
+        if config & 0x0003 == 0x0003 or config & 0x0100 or mux < 4:
+            return
+        value = self._value(mux - 4)
+        low = self.registers[2] - 0x10000 if self.registers[2] & 0x8000 else self.registers[2]
+        high = self.registers[3] - 0x10000 if self.registers[3] & 0x8000 else self.registers[3]
+        if config & 0x0010:  # Window mode
+            tripped = value < low or value > high
+        else:
+            tripped = value > high
+        if tripped and _pin_levels.get(self.alert_pin, True):
+            self.inject_alert()
+        elif not tripped and not config & 0x0004:  # Non-latching comparators release on their own
+            drive_pin(self.alert_pin, True)
+
+
+class AnalogIn:
+    def __init__(self, ads: ADS1015, positive_pin: int, negative_pin=None):
+        self._ads = ads
+        self._pin = positive_pin
+
+    @property
+    def value(self) -> int:
+        return self._ads.read(self._pin)
+
+    @property
+    def voltage(self) -> float:
+        return self.value * ADS_FULL_SCALE[self._ads.gain] / 32767
+
+
+class PWMOut:
+    """
+    Simulated PWM output. `log` holds (timestamp_ns, duty_cycle) for every change.
+    """
+    def __init__(self, pin, *, duty_cycle: int = 0, frequency: int = 500, variable_frequency: bool = False):
+        self.pin = pin
+        self.frequency = frequency
+        self.variable_frequency = variable_frequency
+        self._duty_cycle = duty_cycle
+        self.log = []
+
+    @property
+    def duty_cycle(self) -> int:
+        return self._duty_cycle
+
+    @duty_cycle.setter
+    def duty_cycle(self, value: int):
+        if not 0 <= value <= 65535:
+            raise ValueError("Duty cycle must be a 16-bit integer")
+        self._duty_cycle = value
+        self.log.append((monotonic_ns(), value))
+
+
+class _UnbufferedStdin:
+    """
+    sys.stdin replacement that reads straight from the file descriptor, so select() in
+    serial_bytes_available never misses characters already pulled into a Python buffer.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._fd = stream.fileno()
+        self._decoder = codecs.getincrementaldecoder(stream.encoding or "utf-8")(errors="replace")
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def read(self, size: int = -1) -> str:
+        text = ""
+        while size < 0 or len(text) < size:
+            data = os.read(self._fd, 1)
+            if not data:
+                break
+            text += self._decoder.decode(data)
+        return text
+
+    # Used by input() when stdin is not the interpreter's own
+    def readline(self) -> str:
+        line = ""
+        while not line.endswith("\n"):
+            c = self.read(1)
+            if not c:
+                break
+            line += c
+        return line
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+# Replaces sys.stdin with an _UnbufferedStdin for interactive console use. Called by the
+# desktop entry point (code.py), never on import, so host scripts keep their own stdin.
+def install_stdin():
+    if isinstance(sys.stdin, _UnbufferedStdin):
+        return
+    try:
+        sys.stdin = _UnbufferedStdin(sys.stdin)
+    except (AttributeError, OSError, ValueError):
+        pass  # No real stdin to wrap (e.g. captured by a test runner)
+
+
+class _Runtime:
+    @property
+    def serial_bytes_available(self) -> int:
+        readable, _, _ = select.select([sys.stdin], [], [], 0)
+        return 1 if readable else 0
+
+
+class supervisor:
+    """
+    Stand-in for the CircuitPython supervisor module, backed by the terminal's stdin.
+    """
+    runtime = _Runtime()
+
+
+class usb_cdc:
+    """
+    Stand-in for the usb_cdc module. Assign a serial-like object to `data` to use the binary link.
+    """
+    console = None
+    data = None
@@ -2,46 +2,89 @@ try:
     from ulab import numpy as np  # Use ulab when running on Pico
 except ImportError:
     import numpy as np  # Use numpy when running on PC
-import adafruit_mcp4728 as MCP  # 12-bit DAC
-import adafruit_ads1x15.ads1015 as ADS  # 4-channel ADC
-from adafruit_ads1x15.analog_in import AnalogIn
-import digitalio as dio
-from busio import I2C
-from pwmio import PWMOut
-import board
+from array import array
+from .hardware import board, I2C, PWMOut, MCP4728, ADS1015, AnalogIn
+from time import monotonic_ns, sleep
+from .thermistor_helper import TempTable, getTemp
+from .profiler import profiler
+from .derating import ThermalDerating
+from .thermal_alert import ThermalAlert
+from .bus_scheduler import BusScheduler
+from .boot_timeline import boot_timeline
+from .halogen import HalogenCurve, HalogenDriver, HALOGEN_STEP
 
 MAX_VALUE = 65535
+DAC_CHANNELS = 4  # MCP4728 channels A-D (violet, white, cyan, uv)
+THERM_CHANNELS = (0, 1, 2)  # ADS1015 inputs wired to the LED, heatsink and cell thermistors
+PHOTODIODE_CHANNEL = 3  # ADS1015 input wired to the photodiode
+ADS_DATA_RATES = (128, 250, 490, 920, 1600, 2400, 3300)  # ADS1015 samples per second
+ADS_FULL_SCALE = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}  # Volts per gain
+DERATE_ONE = 1024  # Output scale fixed point: setpoints are multiplied by scale/1024 (fits a small int)
+LIGHT_CHANNELS = ('v', 'w', 'c', 'uv', 'h')  # setLEDs() argument order, also the order of SolarSimulator.lights
+I2C_PINS = ((board.GP27, board.GP26),)  # (scl, sda) of each I2C bus, add (board.GP5, board.GP4) for I2C0
+
+STAGE_SET_LEDS = profiler.stage("setLEDs")
+STAGE_THERMISTORS = profiler.stage("thermistors")
+STAGE_PHOTODIODE = profiler.stage("photodiode")
 
 
 class SolarSimulator:
     # Initializes the Solar Simulator module
-    def __init__(self, pwm_freq: int = 5000, verbose: int = 0):
+    # `heads` lists a HeadConfig per light head (default: one head at the default addresses)
+    # and `i2c_pins` the (scl, sda) pins of each I2C bus the heads' `bus` indexes refer to
+    # Every bus runs at `i2c_frequency` with `bus_budget` of each `bus_tick` seconds for
+    # transactions, see bus_scheduler.py
+    def __init__(self, pwm_freq: int = 5000, verbose: int = 0, therm_data_rate: int = 1600,
+                 therm_max_age: float = 0.5, heads=None, i2c_pins=I2C_PINS, i2c_frequency: int = 100000,
+                 bus_tick: float = 0.01, bus_budget: float = 0.8):
         # Initialize constants
         if verbose: print("Initializing simulator...")
         self.PWM_FREQ = pwm_freq
         self.verbose = verbose
         self.peak = 0.3
-        self.i2c = I2C(board.GP27, board.GP26)
+        self.bus_schedulers = [BusScheduler(i2c_frequency, bus_tick, bus_budget) for _ in i2c_pins]
+        self.buses = [I2C(scl, sda, frequency=i2c_frequency) for scl, sda in i2c_pins]
+        self.i2c = self.buses[0]
         if self.verbose >= 2: print(f"I2C initialized, addresses found: {self.__portScan()}")
-        # Create ADS and MCP objects
-        self.ads = ADS.ADS1015(self.i2c)
-        self.mcp = MCP.MCP4728(self.i2c)
-        if verbose: print("Initialized I2C devices")
-
-        # Create the Halogen object
-        self.hal = PWMOut(board.GP28, frequency=self.PWM_FREQ, duty_cycle=0, variable_frequency=True)
-        if verbose: print(f"Initialized PWM at {self.PWM_FREQ}Hz")
+        # Create the ADS, MCP and halogen PWM of every head
+        configs = heads if heads else (HeadConfig(),)
+        for i in range(len(configs)):
+            for j in range(i):
+                if configs[i].bus == configs[j].bus and (
+                        configs[i].mcp_address == configs[j].mcp_address
+                        or configs[i].ads_address == configs[j].ads_address):
+                    raise ValueError(f"Heads {j} and {i} share a device address on bus {configs[i].bus}")
+                if configs[i].halogen_pin == configs[j].halogen_pin:
+                    raise ValueError(f"Heads {j} and {i} share halogen pin {configs[i].halogen_pin}, "
+                                     "give each HeadConfig its own halogen_pin")
+        # Setpoint to duty cycle table shared by every head's halogen, see halogen.py
+        self.halogen_curve = HalogenCurve()
+        self.heads = [Head(self.buses[config.bus], self.bus_schedulers[config.bus], config, pwm_freq,
+                           therm_data_rate, self.halogen_curve) for config in configs]
+        # Heads grouped by bus, so each bus gets its DAC frames in one locked burst
+        self._bus_heads = [[head for head in self.heads if head.i2c is bus] for bus in self.buses]
+        # Head 0's devices, the single-head API and the comparator alert use these
+        head = self.heads[0]
+        self.ads = head.ads
+        self.mcp = head.mcp
+        self.hal = head.hal
+        self.thermistors = head.thermistors
+        self.photodiode = head.photodiode
+        self.thermal_snapshot = ThermalSnapshot(len(THERM_CHANNELS), max_age=therm_max_age)
+        self._thermals = [None] * len(THERM_CHANNELS)  # Hottest reading of each thermistor across heads
+        self.photodiode_volts_per_sun = 1.0  # Photodiode volts at 1 AM0 sun, calibrate against a reference cell
+        if verbose: print(f"Initialized I2C devices and PWM at {self.PWM_FREQ}Hz for {len(self.heads)} head(s)")
 
         self.uv_safety = True
-        self.therm_safe = True
-        # Initialize current light settings to zero
-        self.current_light_settings = {
-            'v': 0,
-            'w': 0,
-            'c': 0,
-            'uv': 0,  # (**abandon**)
-            'h': 0
-        }
+        self.therm_safe = True  # Cleared by the thermal shutdown, every output stays off until it is set again
+        self.setpoints_stale = False  # Set by the setpoint watchdog, every output stays off until it is cleared
+        self.leds_pending = False  # Setpoints deferred by a bus budget, sent by the next refreshLEDs()
+        # Current light settings of head 0 in LIGHT_CHANNELS order, overwritten in place by setLEDs()
+        # These are the commanded values, before derating and the thermal shutdown are applied
+        self.lights = head.lights
+        self._derate = DERATE_ONE
+        self.derating = ThermalDerating(self)
+        self.thermal_alert = None  # ThermalAlert once enableThermalAlert() is called
         self.enable_therm_monitoring = True
         self.therm_led_shutdown = 100
         self.therm_heatsink_shutdown = 60
@@ -50,78 +93,404 @@ class SolarSimulator:
 
         if verbose: print("Solar Simulator initialized")
 
-    # Sets the LEDs and halogen brightness as a 16-bit integer value
+    # Sets the LEDs and halogen brightness of every head as a 16-bit integer value
+    # Only the DAC channels that changed since the last call are sent to each MCP4728
+    # The outputs are scaled by the derating factor, and held off during a thermal shutdown or
+    # while the setpoint watchdog has tripped
     def setLEDs(self, v: int = 0, w: int = 0, c: int = 0, uv: int = 0, h: int = 0):
-        self.mcp.channel_a.value = v
-        self.mcp.channel_b.value = w
-        self.mcp.channel_c.value = c
-        self.mcp.channel_d.value = uv * (not self.uv_safety)
-        self.hal.duty_cycle = h
-
-        # Update current settings
-        self.current_light_settings = {
-            'v': v,
-            'w': w,
-            'c': c,
-            'uv': uv if not self.uv_safety else 0,  # (**abandon**)
-            'h': h
-        }
+        boot_timeline.setpoint()
+        for i in range(len(self.heads)):
+            self.setHeadLEDs(i, v, w, c, uv, h)
+        self.refreshLEDs()
         if self.verbose >= 2:
-            print(
-                f"VIOLET: {self.mcp.channel_a.value}, WHITE: {self.mcp.channel_b.value}, CYAN: {self.mcp.channel_c.value}, UV: {self.mcp.channel_d.value}, HAL: {self.hal.duty_cycle}")
+            print(f"VIOLET: {v}, WHITE: {w}, CYAN: {c}, UV: {uv}, HAL: {h}")
         elif self.verbose >= 1:
-            print(
-                f"VIOLET: {self.mcp.channel_a.value // 655}%, WHITE: {self.mcp.channel_b.value // 655}%, CYAN: {self.mcp.channel_c.value // 655}%, UV: {self.mcp.channel_d.value // 655}%, HAL: {self.hal.duty_cycle // 655}%")
+            print(f"VIOLET: {v // 655}%, WHITE: {w // 655}%, CYAN: {c // 655}%, UV: {uv // 655}%, HAL: {h // 655}%")
+
+    # Stores one head's setpoints without touching the bus
+    # Stage every head, then call refreshLEDs() to send them all in one batch
+    def setHeadLEDs(self, index: int, v: int = 0, w: int = 0, c: int = 0, uv: int = 0, h: int = 0):
+        if not (0 <= v <= MAX_VALUE and 0 <= w <= MAX_VALUE and 0 <= c <= MAX_VALUE
+                and 0 <= uv <= MAX_VALUE and 0 <= h <= MAX_VALUE):
+            raise ValueError("Light values must be 16-bit integers")
+        lights = self.heads[index].lights
+        lights[0] = v
+        lights[1] = w
+        lights[2] = c
+        lights[3] = uv * (not self.uv_safety)  # (**abandon**)
+        lights[4] = h
+
+    # Returns the current light settings as a new dict keyed by channel name
+    # Loops should read `lights` instead, this allocates on every call
+    @property
+    def current_light_settings(self) -> dict:
+        return {name: self.lights[i] for i, name in enumerate(LIGHT_CHANNELS)}
+
+    # Scales every output by `scale` (0 to 1) from now on and re-applies the current settings
+    # The commanded values in `lights` are kept, so a scale of 1 restores them exactly
+    def setDerating(self, scale: float):
+        self._derate = int(min(max(scale, 0.0), 1.0) * DERATE_ONE + 0.5)
+        self.refreshLEDs()
+
+    # Writes every head's current light settings, e.g. after the derating, therm_safe or
+    # setpoints_stale changed, or after staging heads with setHeadLEDs()
+    # The changed DAC channels of all heads go out back to back, one locked burst per bus,
+    # followed by the halogen duty cycles, so the faces change together
+    # A burst that does not fit in its bus's budget stays staged and sets leds_pending;
+    # blanking writes (scale 0) are safety traffic and always go out
+    def refreshLEDs(self):
+        if self.thermal_alert is not None:
+            self.thermal_alert.poll()
+        scale = self.outputScale()
+        heads = self.heads
+        pending = False
+        with profiler.time(STAGE_SET_LEDS):
+            for head in heads:
+                lights = head.lights
+                if scale == DERATE_ONE:
+                    head.stageDAC(lights[0], lights[1], lights[2], lights[3])
+                else:
+                    head.stageDAC(lights[0] * scale >> 10, lights[1] * scale >> 10,
+                                  lights[2] * scale >> 10, lights[3] * scale >> 10)
+            for i in range(len(self.buses)):
+                if not self.__sendFrames(i, scale == 0):
+                    pending = True
+            for head in heads:
+                h = head.lights[4]
+                head.halogen.set(h if scale == DERATE_ONE else h * scale >> 10, scale == 0)
+        self.leds_pending = pending
+
+    # Moves every head's halogen duty cycle on toward its setpoint within the slew limit
+    # Call it regularly from a loop; SafetyMonitor.attach() adds it to mode schedulers
+    def serviceHalogen(self):
+        for head in self.heads:
+            head.halogen.service()
+
+    # Blocks until every head's halogen has reached its setpoint, at most 1/slew seconds
+    # For scripts without a scheduler, after a setLEDs() that raises the halogen
+    def settleHalogen(self):
+        while True:
+            self.serviceHalogen()
+            for head in self.heads:
+                if head.halogen.ramping:
+                    break
+            else:
+                return
+            sleep(HALOGEN_STEP)
+
+    # Replaces the halogen setpoint to duty cycle table of every head and re-applies the setpoints
+    # e.g. with HalogenCurve.from_response() from a measured halogen sweep
+    def setHalogenCurve(self, curve: HalogenCurve):
+        self.halogen_curve = curve
+        for head in self.heads:
+            head.halogen.curve = curve
+        self.refreshLEDs()
+
+    # Returns the factor (out of DERATE_ONE) applied to every commanded value right now
+    def outputScale(self) -> int:
+        return self._derate if self.therm_safe and not self.setpoints_stale else 0
+
+    # Returns the mean commanded output of all channels from 0 to 1, of the brightest head
+    def commandedDrive(self) -> float:
+        total = 0
+        for head in self.heads:
+            lights = head.lights
+            head_total = lights[0] + lights[1] + lights[2] + lights[3] + lights[4]
+            if head_total > total:
+                total = head_total
+        return total / (len(LIGHT_CHANNELS) * MAX_VALUE)
+
+    # Returns the mean output actually applied to all channels from 0 to 1
+    def appliedDrive(self) -> float:
+        return self.commandedDrive() * self.outputScale() / DERATE_ONE
+
+    # Arms the ADS1015 comparator at the shutdown temperatures, with its ALERT/RDY line on `pin`
+    # An alert blanks every output at the next setLEDs() or safety check, see thermal_alert.py
+    def enableThermalAlert(self, pin, channels=THERM_CHANNELS, queue: int = 1):
+        if self.thermal_alert is not None:
+            self.thermal_alert.deinit()
+        self.thermal_alert = ThermalAlert(self, pin, channels, queue)
+        self.thermal_alert.arm()
+        return self.thermal_alert
+
+    # Forgets the committed DAC values so the next setLEDs() rewrites every channel
+    # Use this if the MCP4728 may have been reset behind our back (brown-out, hot-plug)
+    def invalidateDAC(self):
+        for head in self.heads:
+            for i in range(DAC_CHANNELS):
+                head.dac_codes[i] = -1
 
     #65535，percentage just do that
     # Returns a list of thermal values per thermistor channel in Celsius
+    # With several heads each value is the hottest reading of that thermistor across the heads
+    # Always reads the thermistors and refreshes the thermal snapshot
+    # The list is the snapshot's own and is overwritten by the next read, copy it to keep it
     def checkThermals(self) -> list:
-        thermals = []
-        thermistors = self.__readThermistors()
-        for i, chan in zip(range(3), thermistors):
-            thermals.append(chan[2])
-            if self.verbose == 1: print(f"Channel[{i}]: {chan[2]}C")
-        return thermals
+        thermals = self.__readThermistors()
+        if self.thermal_alert is not None:
+            self.thermal_alert.arm()  # The driver's reads turn the comparator off
+        if self.verbose == 1:
+            for i in range(len(thermals)): print(f"Channel[{i}]: {thermals[i]}C")
+        self.thermal_snapshot.update(thermals)
+        return self.thermal_snapshot.temps
+
+    # Returns the thermal snapshot, only reading the thermistors when it is older than its max age
+    # Safety paths should pass force=True to always get a fresh reading
+    def getThermals(self, force: bool = False):
+        snapshot = self.thermal_snapshot
+        if force or snapshot.isStale():
+            self.checkThermals()
+        return snapshot
+
 
+    # Returns the photodiode voltage of a head from one ADS1015 conversion
+    def readPhotodiode(self, head: int = 0) -> float:
+        start = monotonic_ns()
+        with profiler.time(STAGE_PHOTODIODE):
+            volts = self.heads[head].photodiode.voltage
+        self.heads[head].scheduler.record(start)
+        if head == 0 and self.thermal_alert is not None:
+            self.thermal_alert.arm()
+        return volts
 
-    # Helper function that prints all available I2C devices
+    # Returns the irradiance at a head's photodiode in suns (1.0 = AM0, 1361 W/m^2)
+    # Uses the photodiode_volts_per_sun calibration
+    def readIrradiance(self, head: int = 0) -> float:
+        return self.readPhotodiode(head) / self.photodiode_volts_per_sun
+
+    # Returns the modeled and budgeted bus figures of every bus, one line each
+    def busReport(self) -> str:
+        return "\n".join(f"bus {i}: {self.bus_schedulers[i].report()}" for i in range(len(self.buses)))
+
+    # Helper function that sends the staged DAC frames of every head on one bus
+    # The bus is locked once for the whole burst, so no other transaction lands between heads
+    # Returns False if the burst was deferred by the bus budget (never for safety bursts)
+    def __sendFrames(self, index: int, safety: bool) -> bool:
+        heads = self._bus_heads[index]
+        scheduler = self.bus_schedulers[index]
+        cost = 0
+        for head in heads:
+            if head.frame_len:
+                cost += scheduler.transfer_ns(head.frame_len)
+        if not cost:
+            return True
+        if not safety and not scheduler.admit(cost):
+            return False
+        bus = self.buses[index]
+        start = monotonic_ns()
+        while not bus.try_lock():
+            pass
+        try:
+            for head in heads:
+                if head.frame_len:
+                    bus.writeto(head.mcp_address, head.dac_frame, end=head.frame_len)
+                    head.commitDAC()
+        finally:
+            bus.unlock()
+        scheduler.record(start)
+        return True
+
+    # Helper function that prints all available I2C devices on every bus
     def __portScan(self) -> list:
-        self.i2c.try_lock()
-        found = self.i2c.scan()
-        self.i2c.unlock()
-        return [hex(i) for i in found]
+        found = []
+        for bus in self.buses:
+            bus.try_lock()
+            found.append([hex(i) for i in bus.scan()])
+            bus.unlock()
+        return found
 
-    # Helper function that reads all of the thermistors and returns a list of lists of data for each channel
-    # Output: [[CHAN0 binary data, voltage, celsius temp], [CHAN1 binary data, voltage, celsius temp], [CHAN2 binary data, voltage, celsius temp]]
+    # Helper function that converts every thermistor of every head once and returns the list of
+    # Celsius temperatures, the hottest of each channel across heads; the raw codes, voltages and
+    # per-head temperatures stay on each head's thermistors
     def __readThermistors(self) -> list:
-        therm_values = []
-        for i in range(0, 3):
-            chan = AnalogIn(self.ads, i)
-            therm_values.append([chan.value >> 4, chan.voltage, calcTemp(chan.voltage)])
-            if self.verbose >= 2: print(f"Channel[{i}]: {chan.value >> 4}, {chan.voltage}v, {calcTemp(chan.voltage)}C")
-        return therm_values
+        temps = self._thermals
+        with profiler.time(STAGE_THERMISTORS):
+            for head in self.heads:
+                start = monotonic_ns()
+                head.thermistors.sample()
+                head.scheduler.record(start)
+        for i in range(len(temps)):
+            temps[i] = None
+        for h in range(len(self.heads)):
+            sampler = self.heads[h].thermistors
+            for i in range(len(temps)):
+                temp = sampler.temps[i]
+                if temp is not None and (temps[i] is None or temp > temps[i]):
+                    temps[i] = temp
+            if self.verbose >= 2:
+                for i in range(len(sampler.channels)):
+                    print(f"Head {h} channel[{i}]: {sampler.raw[i]}, {sampler.voltages[i]}v, {sampler.temps[i]}C")
+        return temps
 
 
+class HeadConfig:
+    """
+    Wiring of one light head: its MCP4728 and ADS1015 addresses, the GPIO driving its halogen
+    and the index of the I2C bus (in SolarSimulator's `i2c_pins`) its devices are on.
+    """
+    def __init__(self, mcp_address: int = 0x60, ads_address: int = 0x48, halogen_pin=board.GP28,
+                 bus: int = 0):
+        self.mcp_address = mcp_address
+        self.ads_address = ads_address
+        self.halogen_pin = halogen_pin
+        self.bus = bus
 
 
-import math
+class Head:
+    """
+    One light head: an MCP4728 for the LEDs, an ADS1015 for its thermistors and photodiode
+    and a PWM output for its halogen, run by a HalogenDriver. Holds the head's commanded setpoints and the DAC codes
+    last committed to it, so only the channels that changed go on the bus.
+    """
+    def __init__(self, i2c, scheduler: BusScheduler, config: HeadConfig, pwm_freq: int, therm_data_rate: int,
+                 halogen_curve: HalogenCurve):
+        self.i2c = i2c
+        self.scheduler = scheduler  # Budget of the bus the head is on
+        self.mcp_address = config.mcp_address
+        self.ads = ADS1015(i2c, address=config.ads_address)
+        self.mcp = MCP4728(i2c, address=config.mcp_address)
+        self.hal = PWMOut(config.halogen_pin, frequency=pwm_freq, duty_cycle=0, variable_frequency=True)
+        self.halogen = HalogenDriver(self.hal, halogen_curve, pwm_freq)
+        self.thermistors = ThermalSampler(self.ads, THERM_CHANNELS, data_rate=therm_data_rate)
+        self.photodiode = AnalogIn(self.ads, PHOTODIODE_CHANNEL)
+        # Commanded setpoints in LIGHT_CHANNELS order
+        self.lights = array('H', [0] * len(LIGHT_CHANNELS))
+        # Last 12-bit code committed to each DAC channel (-1 forces the first write) and the
+        # reusable fast write frame, 2 bytes per channel
+        self.dac_codes = [-1] * DAC_CHANNELS
+        self._dac_pending = [0] * DAC_CHANNELS
+        self.dac_frame = bytearray(2 * DAC_CHANNELS)
+        self.frame_len = 0  # Bytes of dac_frame staged for the bus, 0 if nothing changed
 
-def calcTemp(v_adc: float, vcc: float = 3.3, r_fixed: float = 10000.0) -> float | None:
+    # Builds the MCP4728 fast write frame for the channels that changed since the last commit
+    # Fast write always starts at channel A, so the frame is cut after the last changed channel
+    # Returns the number of channels staged (0 if nothing changed)
+    def stageDAC(self, a: int, b: int, c: int, d: int) -> int:
+        pending = self._dac_pending
+        pending[0] = a >> 4  # 16-bit input -> 12-bit DAC code
+        pending[1] = b >> 4
+        pending[2] = c >> 4
+        pending[3] = d >> 4
+
+        committed = self.dac_codes
+        last = -1
+        for i in range(DAC_CHANNELS):
+            if pending[i] != committed[i]:
+                last = i
+        if last < 0:
+            self.frame_len = 0
+            return 0
 
-    # Compute thermistor resistance
-    r_therm = r_fixed * v_adc / (vcc - v_adc)
+        # Fast write format per channel: [0 0 PD1 PD0 D11 D10 D9 D8] [D7 ... D0], PD = 00 (normal)
+        frame = self.dac_frame
+        for i in range(last + 1):
+            code = pending[i]
+            frame[2 * i] = code >> 8
+            frame[2 * i + 1] = code & 0xFF
+        self.frame_len = 2 * (last + 1)
+        return last + 1
 
-    # Compute temperature using beta equation
-    beta = 3977  # From datasheet (B25/85)
-    t0 = 298.15  # Reference temperature in Kelvin (25°C)
-    r0 = 10000.0  # Resistance at t0 (25°C)
+    # Records the staged frame as written, call it once the frame is on the bus
+    def commitDAC(self):
+        committed = self.dac_codes
+        pending = self._dac_pending
+        for i in range(self.frame_len // 2):
+            committed[i] = pending[i]
+        self.frame_len = 0
 
-    try:
-        temp_k = 1.0 / ((math.log(r_therm / r0) / beta) + (1.0 / t0))
-        temp_c = temp_k - 273.15
-        return temp_c
-    except ValueError:
-        return None  # math domain error if log input is negative
+
+class ThermalSnapshot:
+    """
+    The most recent thermistor temperatures (Celsius) and the monotonic time they were read at.
+    Several readers in one loop tick can share a snapshot instead of each reading the ADC.
+    """
+    def __init__(self, channels: int, max_age: float = 0.5):
+        self.temps = [None] * channels
+        self.timestamp = 0  # monotonic_ns() of the last update, 0 if never read
+        self.max_age = max_age
+
+    @property
+    def max_age(self) -> float:
+        return self._max_age_ns / 1e9
+
+    # Seconds a reading stays valid before readers trigger a new one
+    @max_age.setter
+    def max_age(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("Max age cannot be negative")
+        self._max_age_ns = int(seconds * 1e9)
+
+    # Seconds since the last update
+    def age(self) -> float:
+        return (monotonic_ns() - self.timestamp) / 1e9
+
+    def isStale(self) -> bool:
+        return self.timestamp == 0 or monotonic_ns() - self.timestamp > self._max_age_ns
+
+    def update(self, temps: list):
+        for i in range(len(self.temps)):
+            self.temps[i] = temps[i]
+        self.timestamp = monotonic_ns()
+
+
+# One TempTable per ADC full scale, shared by every head's sampler
+_temp_tables = {}
+
+
+# Returns the shared TempTable for a full scale, building it on first use
+def tempTable(full_scale: float) -> TempTable:
+    table = _temp_tables.get(full_scale)
+    if table is None:
+        table = TempTable(full_scale=full_scale)
+        _temp_tables[full_scale] = table
+    return table
+
+
+class ThermalSampler:
+    """
+    Reads a set of ADS1015 thermistor inputs with exactly one conversion per channel per cycle.
+    The AnalogIn objects are created once, and the raw code, voltage and temperature of each
+    channel are all derived from the same conversion.
+    """
+    def __init__(self, ads, pins=THERM_CHANNELS, data_rate: int = 1600):
+        self.ads = ads
+        self.data_rate = data_rate
+        self.channels = [AnalogIn(ads, pin) for pin in pins]
+        self.table = tempTable(ADS_FULL_SCALE[ads.gain])
+        self.raw = [0] * len(pins)          # 12-bit ADC codes
+        self.voltages = [0.0] * len(pins)   # Volts
+        self.temps = [None] * len(pins)     # Celsius, None if the channel reads 0v
+
+    @property
+    def data_rate(self) -> int:
+        return self.ads.data_rate
+
+    # Higher rates shorten each single-shot conversion at the cost of more noise
+    @data_rate.setter
+    def data_rate(self, rate: int):
+        if rate not in ADS_DATA_RATES:
+            raise ValueError(f"ADS1015 data rate must be one of {ADS_DATA_RATES}")
+        self.ads.data_rate = rate
+
+    # Converts every channel once and returns the list of temperatures in Celsius
+    def sample(self) -> list:
+        full_scale = ADS_FULL_SCALE[self.ads.gain]
+        if full_scale != self.table.full_scale:
+            self.table = tempTable(full_scale)  # Gain changed, codes map to new voltages
+        volts_per_count = full_scale / 32767
+        for i in range(len(self.channels)):
+            value = self.channels[i].value  # The only bus transaction for this channel
+            self.raw[i] = value >> 4
+            self.voltages[i] = value * volts_per_count
+            self.temps[i] = self.table.lookup(self.raw[i])
+        return self.temps
+
+
+
+
+# Takes a thermistor's voltage and returns it's temperature in Celsius, or None if it is invalid
+def calcTemp(v_adc: float, vcc: float = 3.3, r_fixed: float = 10000.0) -> float | None:
+    return getTemp(v_adc, vcc=vcc, r_fixed=r_fixed)
 
 
 
@@ -0,0 +1,271 @@
+# lib/sweep.py
+# On-device channel sweep
+#
+# A sweep steps each listed channel through a list of setpoints, one channel at a time with the
+# others off. At each point it waits `settle` seconds for the light to stabilize, then averages
+# the photodiode and the thermistors for `dwell` seconds, and sends the result. The sweep is a
+# scheduler task: every call reads the photodiode at most once, so the safety monitor and the
+# console keep running between samples, and the thermal alert stays armed.
+#
+# Results go to the usb_cdc data port as frames like the setpoint link's, big-endian:
+#   SYNC (0x5A) | TYPE | SEQ | payload | CRC16 (CRC-16/CCITT-FALSE over TYPE, SEQ and the payload)
+# TYPE_POINT payload: point index (uint16), channel in setLEDs() order (uint8), flags (uint8),
+#   setpoint (uint16), photodiode samples (uint16), mean, min and max photodiode voltage
+#   (uint16, 0.1mV) and the mean LED, heatsink and cell temperatures (int16, 0.01°C, NO_TEMP
+#   if unreadable or out of range)
+# TYPE_END payload: points sent (uint16), 1 if the sweep was stopped early (uint8)
+# Without a data port, each point is printed on the console instead.
+
+import struct
+from array import array
+from time import monotonic_ns
+from .setpoint_link import crc16
+
+SYNC = 0x5A
+TYPE_POINT = 0x11
+TYPE_END = 0x12
+POINT_PAYLOAD = ">HBBHHHHHhhh"
+END_PAYLOAD = ">HB"
+HEADER_LEN = 3
+CRC_LEN = 2
+FLAG_SHUTDOWN = 0x01  # The thermal shutdown had the lights off during the dwell
+FLAG_DERATED = 0x02   # The derating limited the drive during the dwell
+NO_TEMP = -32768      # Temperature field of a thermistor that could not be read
+CHANNEL_NAMES = ("VIOLET", "WHITE", "CYAN", "UV", "HAL")  # setLEDs() order
+
+
+class ChannelSweep:
+    """
+    Steps `channels` (indices in setLEDs() order) through `levels` (16-bit setpoints),
+    averaging the photodiode of `head` and the thermistors at each point. Call start(), then
+    service() from a scheduler task until `done`. `output` is a serial port for the result
+    frames, or None to print them.
+    """
+    def __init__(self, sim, channels, levels, settle: float = 0.05, dwell: float = 0.2,
+                 head: int = 0, output=None):
+        for channel in channels:
+            if not 0 <= channel < len(CHANNEL_NAMES):
+                raise ValueError(f"Sweep channels must be 0 to {len(CHANNEL_NAMES) - 1}")
+        for level in levels:
+            if not 0 <= level <= 0xFFFF:
+                raise ValueError("Sweep levels must be 16-bit integers.")
+        if settle < 0 or dwell <= 0:
+            raise ValueError("Settle time cannot be negative and dwell time must be positive")
+        self.sim = sim
+        self.channels = bytes(channels)
+        self.levels = array('H', levels)
+        self.settle_ns = int(settle * 1e9)
+        self.dwell_ns = int(dwell * 1e9)
+        self.head = head
+        self.output = output
+        self.points = len(self.channels) * len(self.levels)
+        self._setpoints = [0] * len(CHANNEL_NAMES)
+        self._temp_sums = [0.0] * 3
+        self._temps = [NO_TEMP] * 3
+        self._frame = bytearray(HEADER_LEN + struct.calcsize(POINT_PAYLOAD) + CRC_LEN)
+        self.point = 0
+        self.done = True
+        self.stopped = False
+
+    def duration(self) -> float:
+        """
+        Seconds the whole sweep takes, without the time spent in the samples themselves.
+        """
+        return self.points * (self.settle_ns + self.dwell_ns) / 1e9
+
+    def start(self):
+        self.point = 0
+        self.done = False
+        self.stopped = False
+        self._start_ns = monotonic_ns()
+        self._apply()
+
+    def stop(self):
+        """
+        End the sweep early with the lights off.
+        """
+        if not self.done:
+            self.stopped = True
+            self._finish()
+
+    def service(self):
+        """
+        Take the next photodiode sample, or move on to the next point once the dwell is over.
+        """
+        if self.done:
+            return
+        now = monotonic_ns()
+        if now < self._dwell_ns:
+            return  # Settling
+        if now < self._end_ns:
+            volts = self.sim.readPhotodiode(self.head)
+            self._samples += 1
+            self._sum += volts
+            if volts < self._min:
+                self._min = volts
+            if volts > self._max:
+                self._max = volts
+            self._take_thermals()
+            return
+        self._send_point()
+        self.point += 1
+        if self.point == self.points:
+            self._finish()
+        else:
+            self._apply()
+
+    def report(self) -> str:
+        if self.done:
+            state = "stopped" if self.stopped else "done"
+            return f"sweep: {state}, {self.point}/{self.points} points"
+        channel = self.channels[self.point // len(self.levels)]
+        level = self.levels[self.point % len(self.levels)]
+        remaining = (self.points - self.point) * (self.settle_ns + self.dwell_ns) / 1e9
+        return (f"sweep: point {self.point + 1}/{self.points}, {CHANNEL_NAMES[channel]} at "
+                f"{100 * level / 65535:.0f}%, about {remaining:.0f}s left")
+
+    # Sets the lights for the current point and starts its settle time
+    def _apply(self):
+        setpoints = self._setpoints
+        for i in range(len(setpoints)):
+            setpoints[i] = 0
+        setpoints[self.channels[self.point // len(self.levels)]] = self.levels[self.point % len(self.levels)]
+        self.sim.setLEDs(*setpoints)
+        now = monotonic_ns()
+        self._dwell_ns = now + self.settle_ns
+        self._end_ns = self._dwell_ns + self.dwell_ns
+        self._samples = 0
+        self._sum = 0.0
+        self._min = 1e9
+        self._max = -1e9
+        self._flags = 0
+        self._thermal_ns = self.sim.thermal_snapshot.timestamp
+        self._temp_count = 0
+        for i in range(3):
+            self._temp_sums[i] = 0.0
+
+    # Adds the thermal snapshot to the averages when a safety check has refreshed it
+    def _take_thermals(self):
+        sim = self.sim
+        if not sim.therm_safe:
+            self._flags |= FLAG_SHUTDOWN
+        if sim.derating.scale < 1:
+            self._flags |= FLAG_DERATED
+        snapshot = sim.thermal_snapshot
+        if snapshot.timestamp == self._thermal_ns:
+            return
+        self._thermal_ns = snapshot.timestamp
+        temps = snapshot.temps
+        for i in range(3):
+            if temps[i] is None:
+                return  # Averages only cover complete readings
+        for i in range(3):
+            self._temp_sums[i] += temps[i]
+        self._temp_count += 1
+
+    def _send_point(self):
+        if not self._temp_count:
+            # No safety check landed in the dwell, read the thermistors once
+            self.sim.getThermals(force=True)
+            self._thermal_ns = 0
+            self._take_thermals()
+        for i in range(3):
+            temp = int(self._temp_sums[i] / self._temp_count * 100) if self._temp_count else NO_TEMP
+            # A shorted or out-of-table thermistor does not fit the int16 field
+            self._temps[i] = temp if NO_TEMP < temp <= 32767 else NO_TEMP
+        samples = self._samples
+        mean = self._sum / samples if samples else 0.0
+        channel = self.channels[self.point // len(self.levels)]
+        level = self.levels[self.point % len(self.levels)]
+        if self.output is None:
+            temps = " ".join("--" if t == NO_TEMP else f"{t / 100:.1f}" for t in self._temps)
+            print(f"sweep {self.point}: {CHANNEL_NAMES[channel]} {level} -> {mean:.4f}V "
+                  f"(n={samples}, {self._min if samples else 0:.4f}-{self._max if samples else 0:.4f}V) "
+                  f"temps {temps} flags {self._flags}")
+            return
+        struct.pack_into(POINT_PAYLOAD, self._frame, HEADER_LEN, self.point, channel, self._flags,
+                         level, samples, _volts_code(mean), _volts_code(self._min if samples else 0),
+                         _volts_code(self._max if samples else 0), *self._temps)
+        self._seal(TYPE_POINT, self._frame)
+
+    def _finish(self):
+        self.done = True
+        self.sim.setLEDs(0, 0, 0, 0, 0)
+        if self.output is None:
+            print(f"sweep {'stopped' if self.stopped else 'done'}: {self.point} points in "
+                  f"{(monotonic_ns() - self._start_ns) / 1e9:.1f}s")
+            return
+        frame = bytearray(HEADER_LEN + struct.calcsize(END_PAYLOAD) + CRC_LEN)
+        struct.pack_into(END_PAYLOAD, frame, HEADER_LEN, self.point, 1 if self.stopped else 0)
+        self._seal(TYPE_END, frame)
+
+    def _seal(self, frame_type, frame):
+        frame[0] = SYNC
+        frame[1] = frame_type
+        frame[2] = self.point & 0xFF
+        crc = crc16(frame, 1, len(frame) - CRC_LEN)
+        frame[-2] = crc >> 8
+        frame[-1] = crc & 0xFF
+        self.output.write(frame)
+
+
+def _volts_code(volts: float) -> int:
+    return max(0, min(0xFFFF, int(volts * 10000 + 0.5)))
+
+
+def decode_results(data):
+    """
+    Decode the result frames in `data` into (points, end): points is a list of dicts, one per
+    point, and end is (points sent, stopped) from the end frame, or None if it has not arrived.
+    Frames with a bad CRC are skipped.
+    """
+    points = []
+    end = None
+    lengths = {TYPE_POINT: struct.calcsize(POINT_PAYLOAD), TYPE_END: struct.calcsize(END_PAYLOAD)}
+    i = 0
+    while i + HEADER_LEN <= len(data):
+        if data[i] != SYNC or data[i + 1] not in lengths:
+            i += 1
+            continue
+        frame_end = i + HEADER_LEN + lengths[data[i + 1]] + CRC_LEN
+        if frame_end > len(data):
+            break
+        if crc16(data, i + 1, frame_end - CRC_LEN) != (data[frame_end - 2] << 8) | data[frame_end - 1]:
+            i += 1
+            continue
+        if data[i + 1] == TYPE_POINT:
+            fields = struct.unpack_from(POINT_PAYLOAD, data, i + HEADER_LEN)
+            points.append({
+                "point": fields[0], "channel": fields[1], "flags": fields[2], "setpoint": fields[3],
+                "samples": fields[4], "volts": fields[5] / 10000, "min_volts": fields[6] / 10000,
+                "max_volts": fields[7] / 10000,
+                "temps": tuple(None if t == NO_TEMP else t / 100 for t in fields[8:11]),
+            })
+        else:
+            end = struct.unpack_from(END_PAYLOAD, data, i + HEADER_LEN)
+        i = frame_end
+    return points, end
+
+
+def parse_levels(text: str) -> list:
+    """
+    Turn a level spec in percent into 16-bit setpoints: 'start:stop:step' (stop included)
+    or a comma-separated list, e.g. '0:100:1' or '0,10,50,100'. Raises ValueError.
+    """
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        if step <= 0:
+            raise ValueError("Level step must be positive")
+        percents = []
+        i = 0
+        while start + i * step <= stop + 1e-9:
+            percents.append(start + i * step)
+            i += 1
+    else:
+        percents = [float(part) for part in text.split(',')]
+    if not percents:
+        raise ValueError("No levels")
+    for percent in percents:
+        if not 0 <= percent <= 100:
+            raise ValueError("Levels must be between 0 and 100")
+    return [int(percent / 100 * 65535) for percent in percents]
@@ -0,0 +1,135 @@
+# lib/thermal_alert.py
+# ADS1015 comparator over-temperature alert
+#
+# The ADS1015 is put in continuous mode on one thermistor input with its comparator in window
+# mode. The window runs from the shutdown temperature's voltage up to just below the divider
+# supply: the thermistors sit on the low side of their dividers, so their voltage falls as they
+# heat up, and a disconnected thermistor reads the supply and trips the alert too (a shorted one
+# reads 0v, below the window). The latched, active-low ALERT/RDY
+# pin is counted by countio, so even a pulse shorter than a loop tick is never missed.
+#
+# CircuitPython has no interrupts in Python code, so the blanking happens at the next poll().
+# SolarSimulator polls in every setLEDs() and the safety monitor polls while it waits, so the
+# gap between polls bounds the assert-to-detect time. The detect-to-blank time is measured
+# directly. The Adafruit driver's reads rewrite the config register with the comparator off,
+# so the simulator re-arms the alert after every thermistor or photodiode read; arm() steps
+# through `channels` so each guarded thermistor takes its turn on the comparator.
+
+from time import monotonic_ns
+from .hardware import Counter, Edge
+from .thermistor_helper import getVoltage, VCC
+
+# ADS1x15 registers and config fields
+REG_CONFIG = 0x01
+REG_LO_THRESH = 0x02
+REG_HI_THRESH = 0x03
+CONFIG_MUX_SINGLE = 0x4000  # Plus channel << 12
+CONFIG_COMP_WINDOW = 0x0010
+CONFIG_COMP_LATCH = 0x0004
+ADS_PGA = {2 / 3: 0x0000, 1: 0x0200, 2: 0x0400, 4: 0x0600, 8: 0x0800, 16: 0x0A00}
+ADS1015_DATA_RATE = {128: 0x0000, 250: 0x0020, 490: 0x0040, 920: 0x0060, 1600: 0x0080, 2400: 0x00A0, 3300: 0x00C0}
+COMP_QUEUE = {1: 0x0000, 2: 0x0001, 4: 0x0002}  # Conversions out of the window before ALERT asserts
+HI_THRESH_MAX = 0x7FF0
+OPEN_FRACTION = 0.97  # Hi_thresh as a fraction of VCC, an open thermistor reads VCC
+
+
+class ThermalAlert:
+    """
+    Arms the ADS1015 comparator at the shutdown temperatures and blanks every output when its
+    ALERT/RDY pin fires. `channels` are the thermistor inputs to guard, in turn.
+    """
+    def __init__(self, sim, pin, channels=(0,), queue: int = 1):
+        if queue not in COMP_QUEUE:
+            raise ValueError(f"Comparator queue must be one of {tuple(COMP_QUEUE)}")
+        self.sim = sim
+        self.channels = channels
+        self.queue = queue
+        self.counter = Counter(pin, edge=Edge.FALL)
+        self.armed_channel = -1
+        self._seen = self.counter.count
+        self._next = 0
+        self._frame = bytearray(3)
+        self._limits = None
+        self._thresholds = [0, 0, 0]
+        self._high = HI_THRESH_MAX
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the alert count and latency figures, e.g. when a mode starts.
+        """
+        self.alerts = 0
+        self.worst_blank_ns = 0  # Longest time from detecting an alert to the outputs being blank
+        self.worst_gap_ns = 0    # Longest time between polls, the bound on assert-to-detect
+        self._last_poll_ns = 0
+
+    def thresholds(self) -> list:
+        """
+        Return the Lo_thresh register value for each thermistor from the shutdown temperatures.
+        The shared Hi_thresh value, just below VCC, is updated with them.
+        """
+        sim = self.sim
+        limits = (sim.therm_led_shutdown, sim.therm_heatsink_shutdown, sim.therm_cell_shutdown)
+        if limits != self._limits:
+            full_scale = sim.thermistors.table.full_scale
+            for i in range(3):
+                # Same scaling as AnalogIn.voltage, the 12-bit code is left-justified
+                self._thresholds[i] = int(getVoltage(limits[i]) / full_scale * 32767) & 0xFFF0
+            self._high = min(HI_THRESH_MAX, int(OPEN_FRACTION * VCC / full_scale * 32767) & 0xFFF0)
+            self._limits = limits
+        return self._thresholds
+
+    def arm(self):
+        """
+        Program the thresholds and start continuous conversions of the next guarded channel.
+        """
+        channel = self.channels[self._next]
+        self._next = (self._next + 1) % len(self.channels)
+        ads = self.sim.ads
+        config = (CONFIG_MUX_SINGLE | (channel << 12) | ADS_PGA[ads.gain]
+                  | ADS1015_DATA_RATE[ads.data_rate] | CONFIG_COMP_WINDOW | CONFIG_COMP_LATCH
+                  | COMP_QUEUE[self.queue])
+        start = monotonic_ns()
+        self._write(REG_LO_THRESH, self.thresholds()[channel])
+        self._write(REG_HI_THRESH, self._high)
+        self._write(REG_CONFIG, config)
+        self.sim.heads[0].scheduler.record(start)  # Safety traffic, accounted but never deferred
+        self.armed_channel = channel
+
+    def poll(self) -> bool:
+        """
+        Blank the outputs if the alert pin fired since the last poll. Returns True if it did.
+        """
+        now = monotonic_ns()
+        if self._last_poll_ns and now - self._last_poll_ns > self.worst_gap_ns:
+            self.worst_gap_ns = now - self._last_poll_ns
+        self._last_poll_ns = now
+        count = self.counter.count
+        if count == self._seen:
+            return False
+        self._seen = count
+        self.alerts += 1
+        sim = self.sim
+        if sim.therm_safe:
+            sim.therm_safe = False  # Resumes through check_temperature() like any thermal shutdown
+            sim.refreshLEDs()
+            blank = monotonic_ns() - now
+            if blank > self.worst_blank_ns:
+                self.worst_blank_ns = blank
+            print(f"Thermistor {self.armed_channel} alert! Lights turned off for safety.")
+        return True
+
+    def report(self) -> str:
+        return (f"thermal alert: {self.alerts} alerts, worst detect-to-blank "
+                f"{self.worst_blank_ns // 1000}us, worst poll gap {self.worst_gap_ns / 1e6:.1f}ms")
+
+    def deinit(self):
+        self.counter.deinit()
+
+    def _write(self, register: int, value: int):
+        frame = self._frame
+        frame[0] = register
+        frame[1] = value >> 8
+        frame[2] = value & 0xFF
+        with self.sim.ads.i2c_device as i2c:
+            i2c.write(frame)
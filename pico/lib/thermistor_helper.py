@@ -1,9 +1,89 @@
 # Thermistor conversion helper
+# The divider and Beta equations live only here, see docs/thermistor.md for the math
 # TODO: Compile to `.mpy`
-import ulab.numpy as np
+import math
+try:
+    from ulab import numpy as np  # Use ulab when running on Pico
+except ImportError:
+    import numpy as np  # Use numpy when running on PC
+
+# Murata NXFT15XV103FEAB050 thermistor in a divider with a fixed resistor
+BETA = 3977        # From datasheet (B25/85)
+R0 = 10000.0       # Resistance at T0 (25°C)
+T0 = 298.15        # Reference temperature in Kelvin (25°C)
+R_FIXED = 10000.0  # Fixed divider resistor
+VCC = 3.3          # Divider supply voltage
+
+ADC_CODES = 2048         # ADS1015 single-ended codes (12-bit signed, 0 to 2047)
+ADC_FULL_SCALE = 4.096   # Volts at full scale for the ADS1015 default gain of 1
+NAN = float("nan")
+
+
+# Returns the thermistor resistance in ohms from the divider voltage
+# By default the voltage is measured across the thermistor (thermistor on the low side)
+def thermResistance(v_adc: float, vcc: float = VCC, r_fixed: float = R_FIXED, high_side: bool = False) -> float:
+    if high_side:
+        return r_fixed * (vcc - v_adc) / v_adc
+    return r_fixed * v_adc / (vcc - v_adc)
+
 
 # Takes a thermistor's voltage and returns it's temperature in Celsius
-def getTemp(adc: float) -> float:
-	rth = (10000) * (3.3 / adc) - 10000
-	therm = 1 / ((np.log(rth/10000) / 3977) + (1/298.15))
-	return therm - 273.15
\ No newline at end of file
+# Returns None when the voltage has no valid temperature (0v or at the supply rail)
+def getTemp(v_adc: float, beta: float = BETA, r0: float = R0, t0: float = T0,
+            vcc: float = VCC, r_fixed: float = R_FIXED, high_side: bool = False):
+    try:
+        r_therm = thermResistance(v_adc, vcc, r_fixed, high_side)
+        temp_k = 1.0 / ((math.log(r_therm / r0) / beta) + (1.0 / t0))
+        return temp_k - 273.15
+    except (ValueError, ZeroDivisionError):
+        return None  # math domain error if log input is not positive
+
+
+# Takes a temperature in Celsius and returns the divider voltage the thermistor would produce
+def getVoltage(temp_c: float, beta: float = BETA, r0: float = R0, t0: float = T0,
+               vcc: float = VCC, r_fixed: float = R_FIXED, high_side: bool = False) -> float:
+    r_therm = r0 * math.exp(beta * (1.0 / (temp_c + 273.15) - 1.0 / t0))
+    if high_side:
+        return vcc * r_fixed / (r_therm + r_fixed)
+    return vcc * r_therm / (r_therm + r_fixed)
+
+
+class TempTable:
+    """
+    getTemp() precomputed over the ADS1015 12-bit code space, so converting a sample is an
+    array index instead of a log(). Entries are stored every `step` codes to save memory;
+    codes between entries use linear interpolation when `interpolate` is set, otherwise the
+    entry below. Create a new table to use different Beta/R0 or divider values.
+    """
+    def __init__(self, full_scale: float = ADC_FULL_SCALE, step: int = 1, interpolate: bool = False,
+                 beta: float = BETA, r0: float = R0, t0: float = T0,
+                 vcc: float = VCC, r_fixed: float = R_FIXED, high_side: bool = False):
+        if step < 1:
+            raise ValueError("Table step must be at least 1 code")
+        self.full_scale = full_scale
+        self.step = step
+        self.interpolate = interpolate
+        # Same scaling as AnalogIn.voltage: the 12-bit code is left-justified in a 16-bit value
+        self.volts_per_code = full_scale * 16 / 32767
+
+        # One extra entry so the last code can always interpolate upward
+        size = (ADC_CODES - 1) // step + 2
+        self.table = np.zeros(size)
+        for i in range(size):
+            temp = getTemp(i * step * self.volts_per_code, beta, r0, t0, vcc, r_fixed, high_side)
+            self.table[i] = NAN if temp is None else temp
+
+    # Converts an ADC code (0 to 2047, may be fractional if averaged) to Celsius, or None if invalid
+    def lookup(self, code):
+        if not 0 <= code < ADC_CODES:
+            return None
+        if self.step == 1 and not self.interpolate:
+            temp = self.table[int(code)]
+        else:
+            i = int(code) // self.step
+            temp = self.table[i]
+            if self.interpolate:
+                frac = code - i * self.step
+                if frac:
+                    temp += (self.table[i + 1] - temp) * frac / self.step
+        return None if temp != temp else float(temp)  # NaN marks codes with no valid temperature
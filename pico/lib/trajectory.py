@@ -0,0 +1,121 @@
+# lib/trajectory.py
+# Packed binary trajectory files for long light profiles
+#
+# File layout, little-endian:
+#   magic    4 bytes  b"OSTJ"
+#   version  u8       FORMAT_VERSION
+#   type     u8       SAMPLE_UINT8 or SAMPLE_UINT16
+#   channels u8       values per frame
+#   reserved u8       0
+#   period   u32      microseconds between frames
+#   frames   u32      number of frames
+# followed by `frames` frames of `channels` interleaved samples.
+#
+# The reader streams frames from flash in fixed-size chunks into one reused buffer, so any
+# length of profile plays back in constant memory. write_trajectory() only uses the standard
+# library so the host can convert Basilisk output ahead of time.
+
+import struct
+from array import array
+
+MAGIC = b"OSTJ"
+FORMAT_VERSION = 1
+SAMPLE_UINT8 = 1
+SAMPLE_UINT16 = 2
+HEADER_FORMAT = "<4sBBBBII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+_TYPECODES = {SAMPLE_UINT8: 'B', SAMPLE_UINT16: 'H'}
+
+
+def write_trajectory(path, frames, period, sample_type=SAMPLE_UINT8):
+    """
+    Write a list of frames (each a sequence of channel values) sampled every `period` seconds.
+    """
+    if sample_type not in _TYPECODES:
+        raise ValueError("Sample type must be SAMPLE_UINT8 or SAMPLE_UINT16")
+    channels = len(frames[0]) if frames else 0
+    limit = 0xFF if sample_type == SAMPLE_UINT8 else 0xFFFF
+    payload = bytearray()
+    for frame in frames:
+        if len(frame) != channels:
+            raise ValueError("Every frame must have the same number of channels")
+        for value in frame:
+            if not 0 <= value <= limit:
+                raise ValueError(f"Sample {value} does not fit the sample type")
+            if sample_type == SAMPLE_UINT8:
+                payload.append(value)
+            else:
+                payload.append(value & 0xFF)
+                payload.append(value >> 8)
+    with open(path, "wb") as file:
+        file.write(struct.pack(HEADER_FORMAT, MAGIC, FORMAT_VERSION, sample_type, channels, 0,
+                               int(period * 1e6), len(frames)))
+        file.write(payload)
+
+
+class TrajectoryReader:
+    """
+    Streams the frames of a trajectory file. next_frame() returns the current frame as a
+    reused array of channel values, or None at the end (or rewinds if `loop` is set).
+    """
+    def __init__(self, path, chunk_frames: int = 64, loop: bool = False):
+        self._file = open(path, "rb")
+        header = bytearray(HEADER_SIZE)
+        if self._file.readinto(header) != HEADER_SIZE:
+            self.close()
+            raise ValueError("Trajectory file is too short for a header")
+        magic, version, sample_type, channels, _, period_us, frames = struct.unpack(HEADER_FORMAT, header)
+        if magic != MAGIC or version != FORMAT_VERSION or sample_type not in _TYPECODES:
+            self.close()
+            raise ValueError("Not a supported trajectory file")
+
+        self.sample_type = sample_type
+        self.channels = channels
+        self.period = period_us / 1e6  # Seconds between frames
+        self.period_us = period_us
+        self.frames = frames
+        self.loop = loop
+        self.frame_size = channels * sample_type  # The type code is also the sample size in bytes
+        self.values = array(_TYPECODES[sample_type], [0] * channels)
+        self._chunk = bytearray(chunk_frames * self.frame_size)
+        self.rewind()
+
+    def rewind(self):
+        self._file.seek(HEADER_SIZE)
+        self.index = 0          # Index of the next frame to return
+        self._offset = 0        # Byte offset of the next frame in the chunk
+        self._available = 0     # Bytes of whole frames currently in the chunk
+
+    def next_frame(self):
+        if self.index >= self.frames:
+            if not self.loop or not self.frames:
+                return None
+            self.rewind()
+        if self._offset >= self._available:
+            count = self._file.readinto(self._chunk)
+            self._available = count - count % self.frame_size
+            self._offset = 0
+            if not self._available:
+                raise ValueError("Trajectory file ended before its last frame")
+
+        chunk = self._chunk
+        offset = self._offset
+        values = self.values
+        if self.sample_type == SAMPLE_UINT8:
+            for ch in range(self.channels):
+                values[ch] = chunk[offset + ch]
+        else:
+            for ch in range(self.channels):
+                values[ch] = chunk[offset + 2 * ch] | (chunk[offset + 2 * ch + 1] << 8)
+        self._offset = offset + self.frame_size
+        self.index += 1
+        return values
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -1,60 +1,225 @@
-import time
 import sys
-import supervisor
-from .solar_simulator import SolarSimulator as sim
+from .hardware import SIMULATED
+try:
+    from ulab import numpy as np  # Use ulab when running on Pico
+except ImportError:
+    import numpy as np  # Use numpy when running on PC
+from .profiler import profiler
+from .line_editor import LineEditor
 
 # Constants and Configurations
+# Linear calibration per light source as (name, slope, offset): intensity = slope * factor + offset
+# Listed in setLEDs() channel order: v, w, c, uv, h
+LIGHT_COEFFICIENTS = (
+    ("Violet", -1.5066, 22.6663),
+    ("White", 32.3521, 16.3331),
+    ("Cyan", 10.2647, 20.9998),
+    ("UV", 16.7591, 22.0008),  # (**abandon**)
+    ("Halogen", 89.1446, 9.0003),
+)
+INTENSITY_LEVELS = 1001  # Table resolution, 0.1% per step
+_light_coefficients = LIGHT_COEFFICIENTS  # Replaced by the calibration in the config store
+STAGE_STATUS = profiler.stage("display_status")
+
+
 def calculate_light_intensity(factor):
     """
     Calculate the light intensity values for 5 types of lights.
     """
     if not (0 <= factor <= 1):
         raise ValueError("Scaling factor must be between 0 and 1.")
-    if factor == 0:
-        violet_intensity = 0
-        white_intensity = 0
-        cyan_intensity = 0
-        halogen_intensity = 0
-        uv_intensity = 0
-    elif 0 < factor <= 1:
-        violet_intensity = -1.5066 * factor + 22.6663
-        white_intensity = 32.3521 * factor + 16.3331
-        cyan_intensity = 10.2647 * factor + 20.9998
-        halogen_intensity = 89.1446 * factor + 9.0003
-        uv_intensity = 16.7591 * factor + 22.0008  # (**abandon**)
     # Storing the intensities in a dictionary
-    intensities = {
-        "Violet": violet_intensity,
-        "White": white_intensity,
-        "Cyan": cyan_intensity,
-        "Halogen": halogen_intensity,
-        "UV": uv_intensity  # (**abandon**)
-    }
+    intensities = {}
+    for name, slope, offset in _light_coefficients:
+        intensities[name] = slope * factor + offset if factor > 0 else 0
 
     return intensities
 
+
+class IntensityTable:
+    """
+    calculate_light_intensity() precomputed for every level and scaled to 16-bit setpoints.
+    The table is a flat uint16 array, one row of (v, w, c, uv, h) per level, so a lookup
+    is an index and never allocates. Pass a prebuilt `table` (e.g. from the config store) to
+    skip building it.
+    """
+    def __init__(self, levels=INTENSITY_LEVELS, coefficients=LIGHT_COEFFICIENTS, table=None):
+        self.levels = levels
+        self.width = len(coefficients)
+        self.coefficients = coefficients
+        self._out = [0] * self.width
+        if table is not None:
+            if len(table) != levels * self.width:
+                raise ValueError("Intensity table size does not match its levels")
+            self.table = table
+            return
+        self.table = np.zeros(levels * self.width, dtype=np.uint16)
+        # Level 0 stays all zeros, matching calculate_light_intensity(0)
+        for i in range(1, levels):
+            factor = i / (levels - 1)
+            for j in range(self.width):
+                _, slope, offset = coefficients[j]
+                self.table[i * self.width + j] = int((slope * factor + offset) * 655)
+
+    def levels_at(self, index):
+        """
+        Return the (v, w, c, uv, h) setpoints of a table row.
+        The returned list is reused by the next lookup.
+        """
+        if not (0 <= index < self.levels):
+            raise ValueError("Intensity level out of range.")
+        out = self._out
+        base = index * self.width
+        for j in range(self.width):
+            out[j] = int(self.table[base + j])
+        return out
+
+    def levels_for(self, fraction):
+        """
+        Return the (v, w, c, uv, h) setpoints for an intensity fraction between 0 and 1.
+        """
+        if not (0 <= fraction <= 1):
+            raise ValueError("Scaling factor must be between 0 and 1.")
+        return self.levels_at(int(fraction * (self.levels - 1) + 0.5))
+
+
+_intensity_table = None
+
+
+def get_intensity_table():
+    """
+    Return the shared IntensityTable, building it on first use.
+    """
+    global _intensity_table
+    if _intensity_table is None:
+        _intensity_table = IntensityTable(coefficients=_light_coefficients)
+    return _intensity_table
+
+
+def set_calibration(coefficients, table=None):
+    """
+    Replace the light calibration, as (name, slope, offset) per channel in LIGHT_COEFFICIENTS
+    order. `table` is an optional prebuilt IntensityTable for these coefficients.
+    """
+    global _light_coefficients, _intensity_table
+    if len(coefficients) != len(LIGHT_COEFFICIENTS):
+        raise ValueError(f"Calibration needs {len(LIGHT_COEFFICIENTS)} channels")
+    _light_coefficients = coefficients
+    _intensity_table = table
+
+
+class StatusLine:
+    """
+    The status line as a preallocated fixed-width byte buffer. Each update overwrites the
+    number fields in place and writes the whole buffer, so printing status builds no strings.
+    """
+    TEMPLATE = ("LED: ######°C, Heatsink: ######°C, Cell: ######°C | "
+                "VIOLET:###% WHITE:###% CYAN:###%  HAL:###%\n")
+
+    def __init__(self):
+        self.buf = bytearray(self.TEMPLATE.encode())
+        # (end, width) of every '#' field, 3 temperatures then 4 light percentages
+        self.fields = []
+        i = 0
+        while i < len(self.buf):
+            if self.buf[i] == ord('#'):
+                start = i
+                while self.buf[i] == ord('#'):
+                    i += 1
+                self.fields.append((i, i - start))
+            i += 1
+
+    LIGHT_INDEXES = (0, 1, 2, 4)  # Lights shown, in setLEDs() order (UV is not shown)
+
+    def update_temps(self, temps):
+        """
+        Fill in the temperatures in Celsius, '--' for channels without a valid reading.
+        """
+        for i in range(3):
+            end, width = self.fields[i]
+            temp = temps[i]
+            if temp is None:
+                self._fill(end, width, ord('-'))
+            else:
+                self._put_tenths(end, width, int(temp * 10 + (0.5 if temp >= 0 else -0.5)))
+
+    def update_lights(self, lights, scale=1024):
+        """
+        Fill in the light percentages from (v, w, c, uv, h) 16-bit setpoints, scaled by the
+        output scale out of 1024 so derated or blanked outputs show what is really applied.
+        """
+        for i in range(len(self.LIGHT_INDEXES)):
+            end, width = self.fields[3 + i]
+            self._put_int(end, width, (lights[self.LIGHT_INDEXES[i]] * scale >> 10) // 655, False)
+
+    def mark_unavailable(self):
+        for i in range(3):
+            end, width = self.fields[i]
+            self._fill(end, width, ord('?'))
+
+    def _fill(self, end, width, char):
+        for i in range(end - width, end):
+            self.buf[i] = char
+
+    # Writes a right-aligned integer in the `width` bytes before `end`, padded with spaces
+    def _put_int(self, end, width, value, negative):
+        buf = self.buf
+        start = end - width
+        i = end
+        while True:
+            i -= 1
+            buf[i] = 48 + value % 10
+            value //= 10
+            if not value or i == start:
+                break
+        if negative and i > start:
+            i -= 1
+            buf[i] = ord('-')
+        while i > start:
+            i -= 1
+            buf[i] = ord(' ')
+
+    # Writes a value given in tenths with one decimal, e.g. 251 -> " 25.1"
+    def _put_tenths(self, end, width, tenths):
+        negative = tenths < 0
+        if negative:
+            tenths = -tenths
+        self.buf[end - 1] = 48 + tenths % 10
+        self.buf[end - 2] = ord('.')
+        self._put_int(end - 2, width - 2, tenths // 10, negative)
+
+
+_status_line = StatusLine()
+
+
+def write_bytes(buf):
+    """
+    Write a bytes-like object to the console without decoding it.
+    """
+    if SIMULATED:
+        sys.stdout.flush()  # Keep the order with text already printed
+        sys.stdout.buffer.write(buf)
+        sys.stdout.buffer.flush()
+    else:
+        sys.stdout.write(buf)
+
+
 def display_status(sim):
     """
     Display the current thermal and light status.
     """
-    try:
-        thermals = sim.checkThermals()
-        if thermals:
-            led_temp, heatsink_temp, cell_temp = thermals
-            temp_info = "LED: {:.1f}°C, Heatsink: {:.1f}°C, Cell: {:.1f}°C".format(led_temp, heatsink_temp, cell_temp)
-        else:
-            temp_info = "Cannot read temperature data"
-    except Exception:
-        temp_info = "Temperature data unavailable"
+    with profiler.time(STAGE_STATUS):
+        _print_status(sim)
 
-    # Get current light settings
-    current_settings = sim.current_light_settings
+
+def _print_status(sim):
+    line = _status_line
     try:
-        light_info = f"VIOLET:{current_settings['v'] // 655}% WHITE:{current_settings['w'] // 655}% CYAN:{current_settings['c'] // 655}%  HAL:{current_settings['h'] // 655}%"
+        line.update_temps(sim.getThermals().temps)
     except Exception:
-        light_info = "Light data unavailable"
-
-    print(f"{temp_info} | {light_info}", end="\n")
+        line.mark_unavailable()  # Temperature data unavailable
+    line.update_lights(sim.lights, sim.outputScale())
+    write_bytes(line.buf)
 
 def input_with_default(prompt, default_value, valid_values=None, value_type=str):
     """
@@ -74,14 +239,17 @@ def input_with_default(prompt, default_value, valid_values=None, value_type=str)
         except Exception:
             print(f"Invalid input. Please enter a valid {value_type.__name__} value or press Enter for default.")
 
+
 def check_temperature(sim):
     """
-    Check the temperature and handle thermal shutdown and resume.
+    Check the temperature, derate the lights ahead of forecast limit crossings and handle
+    thermal shutdown and resume. Never blocks: during a shutdown the outputs are held off
+    through sim.therm_safe and the caller's loop keeps running.
     """
     if not sim.enable_therm_monitoring:
         return True
 
-    thermals = sim.checkThermals()
+    thermals = sim.getThermals().temps
     if not thermals:
         print("Cannot read the temperature sensors")
         return False
@@ -91,52 +259,59 @@ def check_temperature(sim):
     heatsink_temp = heatsink_temp or 0
     cell_temp = cell_temp or 0
 
+    # Hard shutdown, the backstop if derating could not keep the temperatures down
     if (
         led_temp > sim.therm_led_shutdown
         or heatsink_temp > sim.therm_heatsink_shutdown
         or cell_temp > sim.therm_cell_shutdown
     ):
-        previous_light_settings = sim.current_light_settings
-        sim.setLEDs(0, 0, 0, 0, 0)
-        print("Temperature too high! Turning off lights for safety.")
-
-        while (
-            led_temp > sim.therm_resume_temp
-            and heatsink_temp > sim.therm_resume_temp
-            and cell_temp > sim.therm_resume_temp
-        ):
-            time.sleep(1)
-            thermals = sim.checkThermals()
-            if thermals:
-                led_temp, heatsink_temp, cell_temp = thermals
-                led_temp = led_temp or 0
-                heatsink_temp = heatsink_temp or 0
-                cell_temp = cell_temp or 0
-                print(f"Cooling down... LED: {led_temp}°C, Heatsink: {heatsink_temp}°C, Cell: {cell_temp}°C")
-            else:
-                print("Cannot read the temperature sensors")
-                return False
-
+        if sim.therm_safe:
+            sim.therm_safe = False
+            sim.refreshLEDs()
+            print("Temperature too high! Turning off lights for safety.")
+    elif (
+        not sim.therm_safe
+        and led_temp <= sim.therm_resume_temp
+        and heatsink_temp <= sim.therm_resume_temp
+        and cell_temp <= sim.therm_resume_temp
+    ):
+        sim.therm_safe = True
+        sim.refreshLEDs()
         print("Temperature back to safe levels. Resuming operation.")
-        if previous_light_settings:
-            sim.setLEDs(
-                v=previous_light_settings['v'],
-                w=previous_light_settings['w'],
-                c=previous_light_settings['c'],
-                uv=previous_light_settings['uv'],  # (**abandon**)
-                h=previous_light_settings['h']
-            )
-        return True
 
+    # Keep fitting the thermal models during a shutdown, they learn the cool-down too
+    derating = sim.derating
+    was_limiting = derating.limiting
+    derating.update(thermals)
+    if derating.limiting != was_limiting:
+        print(derating.report())
     return True
 
-def check_for_interrupt():
+def console_command(line):
+    """
+    Handle the console commands every mode understands: 'p' dumps the profiler.
+    Returns True if the line was one of them.
+    """
+    if line == 'p' and profiler.enabled:
+        profiler.dump()
+        return True
+    return False
+
 
-    if supervisor.runtime.serial_bytes_available:
-        input_char = sys.stdin.read(1)
-        if input_char == '\x03': #Ctrl-C (ASCII 3)
-            print("\nCtrl-C detected. Turning off LEDs...")
-            sim.setLEDs(0, 0, 0, 0, 0)
-            raise KeyboardInterrupt
-        else:
-            print(f"Ignored input: {repr(input_char)}")
+def _default_command(line):
+    if line and not console_command(line):
+        print(f"Ignored input: {repr(line)}")
+
+
+# The one reader of the console, shared by every mode
+console = LineEditor(handler=_default_command)
+
+
+def check_for_interrupt():
+    """
+    Poll the console from a mode's input task. Ctrl-C raises KeyboardInterrupt, and the mode's
+    own handler turns the lights off. Each finished line goes to `console.handler`, by default
+    console_command(): a line of just 'p' dumps the profiler if it is enabled, any other
+    non-empty line is reported as ignored and an empty line does nothing.
+    """
+    return console.poll()
@@ -0,0 +1,133 @@
+# lib/waveform.py
+# Intensity waveforms for the automatic modes
+#
+# A waveform maps time to an intensity fraction (0-1) and repeats every `period` seconds.
+# Profiles are stored as a few keyframes and interpolated at whatever rate the caller ticks,
+# so a 100Hz output gets smooth ramps without a dense table. Times are kept in integer
+# milliseconds: on the Pico a float of seconds loses millisecond resolution after a few hours.
+
+import math
+from array import array
+from time import monotonic_ns
+
+
+class Waveform:
+    """
+    Base class with the period and timing. Not used on its own: each subclass defines
+    value_ms(t_ms), the intensity fraction at t_ms for 0 <= t_ms < period_ms, which
+    value_at() calls.
+    """
+    def __init__(self, period: float):
+        if period <= 0:
+            raise ValueError("Waveform period must be positive")
+        self.period_ms = int(period * 1000)
+        self._start_ns = monotonic_ns()
+
+    @property
+    def period(self) -> float:
+        return self.period_ms / 1000
+
+    def start(self, now_ns: int = None):
+        """
+        Restart the waveform at `now_ns` (monotonic_ns(), default now).
+        """
+        self._start_ns = monotonic_ns() if now_ns is None else now_ns
+
+    def value_at(self, now_ns: int) -> float:
+        """
+        Return the intensity fraction at monotonic time `now_ns`.
+        """
+        return self.value_ms((now_ns - self._start_ns) // 1000000 % self.period_ms)
+
+
+class Sine(Waveform):
+    """
+    One half-wave per period: 0 at the start, 1 at the middle and back to 0, like a pass
+    through sunlight. Computed directly, there is nothing to interpolate.
+    """
+    def value_ms(self, t_ms: int) -> float:
+        return math.sin(math.pi * t_ms / self.period_ms)
+
+
+class Keyframes(Waveform):
+    """
+    Piecewise-linear waveform through (seconds, fraction) keyframes, sorted by time.
+    The last keyframe ramps back to the first over the remaining period, so a profile that
+    ends where it starts loops without a step. The period defaults to the last keyframe's time.
+    """
+    def __init__(self, points, period: float = None):
+        if not points:
+            raise ValueError("A keyframe waveform needs at least one keyframe")
+        times = array('L', [int(t * 1000) for t, _ in points])
+        values = array('f', [v for _, v in points])
+        for i in range(len(points)):
+            if i and times[i] < times[i - 1]:
+                raise ValueError("Keyframes must be sorted by time")
+            if not (0 <= values[i] <= 1):
+                raise ValueError("Keyframe values must be between 0 and 1.")
+        if period is None:
+            period = max(times[-1] / 1000, 0.001)
+        super().__init__(period)
+        if times[-1] > self.period_ms:
+            raise ValueError("Keyframes must fall within the period")
+        self.times = times
+        self.values = values
+        self._index = 0  # Keyframe at or before the last lookup, time mostly moves forward
+
+    def value_ms(self, t_ms: int) -> float:
+        times = self.times
+        last = len(times) - 1
+        i = self._index
+        if t_ms < times[i]:
+            i = 0  # Wrapped into the next period
+        while i < last and times[i + 1] <= t_ms:
+            i += 1
+        self._index = i
+        if t_ms < times[0]:
+            # Before the first keyframe: the wrap ramp from the last one, a period earlier
+            t0 = times[last] - self.period_ms
+            return self._lerp(t0, self.values[last], times[0], self.values[0], t_ms)
+        if i == last:
+            return self._lerp(times[last], self.values[last],
+                              times[0] + self.period_ms, self.values[0], t_ms)
+        return self._lerp(times[i], self.values[i], times[i + 1], self.values[i + 1], t_ms)
+
+    @staticmethod
+    def _lerp(t0, v0, t1, v1, t):
+        if t1 <= t0:
+            return v1
+        return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+
+
+def trapezoid(rise: float, hold: float, fall: float, off: float = 0.0, peak: float = 1.0) -> Keyframes:
+    """
+    Eclipse-style profile: ramp up over `rise` seconds, hold `peak` for `hold`, ramp down over
+    `fall` and stay dark for `off` before repeating.
+    """
+    return Keyframes(((0, 0.0), (rise, peak), (rise + hold, peak), (rise + hold + fall, 0.0)),
+                     period=rise + hold + fall + off)
+
+
+def from_table(values, interval: float) -> Keyframes:
+    """
+    Waveform through evenly spaced samples, `interval` seconds apart, e.g. an uploaded table.
+    The period is one interval per sample, so the last sample ramps back to the first.
+    """
+    return Keyframes([(i * interval, value) for i, value in enumerate(values)],
+                     period=len(values) * interval)
+
+
+def load_keyframes(path: str, period: float = None) -> Keyframes:
+    """
+    Read a keyframe waveform from a text file of "seconds,fraction" lines.
+    Blank lines and lines starting with # are skipped.
+    """
+    points = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            t, value = line.split(",")
+            points.append((float(t), float(value)))
+    return Keyframes(points, period)
@@ -1,7 +1,7 @@
 # BBQ mode with thermal safety
 # Import dependencies
 from lib import solar_simulator as ss
-from ulab import numpy as np
+from lib.waveform import Sine
 from time import sleep, monotonic_ns
 import supervisor as sup
 
@@ -19,10 +19,11 @@ sim.uv_safety = True
 # Calculate LED interpolated brightness steps
 steps = ss.calcSteps()
 
-# Sine wave vars
-level = 0
+# Sine wave vars, one 18 second pass interpolated at every loop
+LOOP_MS = 50
+wave_ms = 0  # Time into the pass, only advances while the lights are on
 intensity = 0
-wave = np.sin(np.linspace(0, np.pi, 360))
+wave = Sine(18)
 
 # STATE MACHINE ITEMS
 NS_OFFSET = monotonic_ns()
@@ -44,7 +45,7 @@ sim.setLEDs()
 
 while True:
     # Calculate a 0-100 value from the wave
-    intensity = int(100*wave[level])
+    intensity = int(100*wave.value_ms(wave_ms))
 
     # Gets LED brightness values at the appropriate level
     red = steps[0][intensity]
@@ -83,11 +84,12 @@ while True:
         if not lights_en and cold: lights_en = True
         therm_timer = getCurrentTime()
     
-    if lights_en: sim.setLEDs(red, grn, blu, uv, hal)
+    if lights_en:
+        sim.setLEDs(red, grn, blu, uv, hal)
+        sim.settleHalogen()  # No scheduler here to run the halogen's slewed rise
 
-    if not sim.verbose and lights_en and SERIAL_LOG: print(f"Intensity: {intensity}, Level: {level}")
+    if not sim.verbose and lights_en and SERIAL_LOG: print(f"Intensity: {intensity}, Time: {wave_ms}ms")
 
-    # Increment and overflow the level every iteration
-    if lights_en: level += 1
-    if level > len(wave)-1: level = 0
-    sleep(0.05)
+    # Advance and wrap the pass every iteration
+    if lights_en: wave_ms = (wave_ms + LOOP_MS) % wave.period_ms
+    sleep(LOOP_MS / 1000)
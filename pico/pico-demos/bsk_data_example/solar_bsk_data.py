@@ -1,5 +1,6 @@
 # BBQ mode (to simulate a spinning satellite) NOW COLORIZED
-# REQUIRES : Basilisk coarse sun sensor sim data as 'out.json'
+# REQUIRES : Basilisk coarse sun sensor sim data as 'out.traj'
+#            (convert 'out.json' with host-demos/convert_trajectory.py)
 # Import dependencies
 from ulab import numpy as np
 import adafruit_mcp4728 as MCP  # 12-bit DAC
@@ -8,8 +9,8 @@ import digitalio as dio
 import pwmio
 import board
 import busio
-import json
 from lib import solar_simulator as ss
+from lib.trajectory import TrajectoryReader
 
 # Serial console logging settings
 SERIAL_LOG  = False
@@ -35,15 +36,14 @@ intensity = 0
 sim.setLEDs()
 led.value = False
 
-# Import basilisk data
-with open('out.json', 'r') as jsonfile:
-    bsk_dict = json.load(jsonfile)
-    
-bsk_data = np.array(bsk_dict['0'])
+# Stream basilisk data from flash a chunk at a time, looping at the end of the trace
+bsk_data = TrajectoryReader('out.traj', loop=True)
+FACE = 0  # Trajectory channel (satellite face) to play back
 
 while True:
-    # Calculate a 0-100 value from the wave
-    intensity = int(bsk_data[level])
+    # Get the 0-100 value of the next sample
+    intensity = bsk_data.next_frame()[FACE]
+    level = bsk_data.index
 
     print(intensity)
     # Gets LED brightness values at the appropriate level
@@ -66,10 +66,8 @@ while True:
     # Set LEDs and bulbs
     uv = 0 # Disable UV for safety
     sim.setLEDs(red,grn,blu,uv,hal)
+    sim.settleHalogen()  # Finish the halogen's slewed rise before the next sample
 
     if SERIAL_LOG: print(f"Intensity: {intensity}, Level: {level}")
 
-    # Increment and overflow the level every iteration
-    level += 1
-    if level > len(bsk_data)-1: level = 0
-    sleep(0.1)
+    sleep(bsk_data.period)
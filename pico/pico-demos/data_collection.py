@@ -95,8 +95,9 @@ while True:
 
     if SERIAL_LOG: print(f"red:{red},grn:{grn},blu:{blu},uv:{uv},hal:{hal},lim:{LIMITER},calc_time:{(calc_end-calc_start)/1000:0.3f}us")
 
-    # Set the LEDs and bulb
+    # Set the LEDs and bulb, waiting out the halogen's slewed rise
     sim.setLEDs(red,grn,blu,uv,hal)
+    sim.settleHalogen()
 
     if PRETTY: print()
     sleep(0.01)
@@ -33,6 +33,7 @@ while True:
 
     print("Setting halogen")
     sim.setLEDs(hal=MAX_VALUE//4)
+    sim.settleHalogen()  # Finish the halogen's slewed rise
     sleep(SPEED)
 
     print("Clearing lights")
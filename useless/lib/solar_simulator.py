@@ -1,14 +1,11 @@
 # solar_simulator.py
 
-try:
-    from ulab import numpy as np  # Use ulab when running on Pico
-except ImportError:
-    import numpy as np  # Use numpy when running on PC
 import adafruit_mcp4728 as MCP  # 12-bit DAC
 import adafruit_ads1x15.ads1015 as ADS  # 4-channel ADC
 from adafruit_ads1x15.analog_in import AnalogIn
 from pwmio import PWMOut
 import board
+from lib.thermistor_helper import getTemp
 
 MAX_VALUE = 65535
 
@@ -99,12 +96,9 @@ class SolarSimulator:
 def calc_temp(adc_voltage):
     """
     Calculates the temperature in Celsius from ADC voltage.
+    This board reads the thermistors on the high side of the divider.
 
     :param adc_voltage: Voltage read from ADC
-    :return: Temperature in Celsius
+    :return: Temperature in Celsius, or None if the voltage is invalid
     """
-    if adc_voltage == 0:
-        return None
-    rth = (10000) * (3.3 / adc_voltage) - 10000
-    therm = 1 / ((np.log(rth / 10000) / 3977) + (1 / 298.15))
-    return therm - 273.15
+    return getTemp(adc_voltage, high_side=True)
@@ -0,0 +1 @@
+../../pico/lib/thermistor_helper.py
\ No newline at end of file